@@ -0,0 +1,99 @@
+#!python
+
+import heapq
+import operator
+import os
+from itertools import islice
+
+from hashtable import HashTable
+
+# Items handed to the table per batch call. Each batch runs with the cyclic
+# garbage collector paused, so this also bounds how long it stays paused.
+CHUNK_SIZE = 4096
+# Characters (or bytes) read from a file at a time
+BLOCK_SIZE = 1 << 20
+
+
+def chunks(iterable, size=CHUNK_SIZE):
+    """Yield lists of up to size consecutive items from the given iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def count(items, table=None, chunk_size=CHUNK_SIZE):
+    """Count how many times each item of the given iterable occurs, adding
+    to the counts already in table if given. Return the table of counts.
+    Running time: O(n) with one bucket walk per item."""
+    if table is None:
+        table = HashTable()
+    for chunk in chunks(items, chunk_size):
+        table.increment_many(chunk)
+    return table
+
+
+def aggregate(pairs, function=operator.add, table=None,
+              chunk_size=CHUNK_SIZE):
+    """Reduce the values of each key of the given (key, value) pairs with
+    function, e.g. operator.add to sum them or max to keep the largest,
+    merging into table if given. Return the table."""
+    if table is None:
+        table = HashTable()
+    for chunk in chunks(pairs, chunk_size):
+        table.merge_many(chunk, function)
+    return table
+
+
+def read_words(source, block_size=BLOCK_SIZE):
+    """Yield lists of the whitespace separated words of source, which may be
+    a path, a text or binary file, or an iterable of lines. Files are read
+    block_size characters at a time and split in one call per block, rather
+    than line by line."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as file:
+            yield from read_words(file, block_size)
+        return
+    if not hasattr(source, 'read'):
+        for lines in chunks(source, CHUNK_SIZE):
+            yield [word for line in lines for word in line.split()]
+        return
+    tail = None
+    while True:
+        block = source.read(block_size)
+        if not block:
+            break
+        if tail:
+            block = tail + block
+        words = block.split()
+        # A word running to the end of the block may go on in the next one
+        tail = None
+        if words and not block[-1:].isspace():
+            tail = words.pop()
+        yield words
+    if tail:
+        yield [tail]
+
+
+def count_words(source, table=None, block_size=BLOCK_SIZE):
+    """Count the words of source, as read by read_words, adding to the
+    counts already in table if given. Return the table of counts."""
+    if table is None:
+        table = HashTable()
+    for words in read_words(source, block_size):
+        table.increment_many(words)
+    return table
+
+
+def top_k(table, k, key=None):
+    """Return the k (key, value) items of table with the largest values,
+    or the largest key(value) if key is given, largest first.
+    Running time: O(n log k)."""
+    if key is None:
+        rank = operator.itemgetter(1)
+    else:
+        def rank(item):
+            return key(item[1])
+    return heapq.nlargest(k, table.items(), key=rank)
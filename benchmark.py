@@ -0,0 +1,365 @@
+#!python
+
+"""Benchmark HashTable and its alternative backends against the builtin dict.
+
+Runs each workload for each backend, key type and size, then reports
+throughput, per-operation latency percentiles and peak memory. Results can be
+written as JSON and compared against an earlier run to catch regressions:
+
+    python benchmark.py --sizes 1000 100000 --output new.json
+    python benchmark.py --sizes 1000 100000 --baseline old.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from compacttable import CompactHashTable
+from hamt import TransientHashTable
+from hashtable import HashTable
+from robinhood import RobinHoodHashTable
+from unrolledlist import UnrolledLinkedList
+
+
+class Backend(object):
+    """A table implementation under test, with its operations as functions
+    taking the table as their first argument"""
+
+    def __init__(self, name, factory, set, get, contains, delete, items):
+        self.name = name
+        self.factory = factory
+        self.set = set
+        self.get = get
+        self.contains = contains
+        self.delete = delete
+        self.items = items
+
+
+BACKENDS = [
+    Backend('dict', dict, dict.__setitem__, dict.__getitem__,
+            dict.__contains__, dict.__delitem__, dict.items),
+    Backend('hashtable', HashTable, HashTable.set, HashTable.get,
+            HashTable.contains, HashTable.delete, HashTable.items),
+    Backend('hashtable-unrolled',
+            lambda: HashTable(bucket_type=UnrolledLinkedList),
+            HashTable.set, HashTable.get, HashTable.contains,
+            HashTable.delete, HashTable.items),
+    Backend('robinhood', RobinHoodHashTable, RobinHoodHashTable.set,
+            RobinHoodHashTable.get, RobinHoodHashTable.contains,
+            RobinHoodHashTable.delete, RobinHoodHashTable.items),
+    Backend('compact', CompactHashTable, CompactHashTable.set,
+            CompactHashTable.get, CompactHashTable.contains,
+            CompactHashTable.delete, CompactHashTable.items),
+    Backend('hamt', TransientHashTable, TransientHashTable.set,
+            TransientHashTable.get, TransientHashTable.contains,
+            TransientHashTable.delete, TransientHashTable.items),
+]
+
+
+def make_keys(key_type, count, rng):
+    """Return count distinct keys of the given type in random order"""
+    if key_type == 'int':
+        keys = rng.sample(range(count * 4), count)
+    elif key_type == 'str':
+        keys = ['user:{:x}:session'.format(n)
+                for n in rng.sample(range(count * 4), count)]
+    elif key_type == 'tuple':
+        # Long composite keys sharing most of their fields, which are slow
+        # to hash and to compare
+        keys = [('tenant:{}'.format(n % 7), 'region:eu-west-1', 'sessions',
+                 'user:{:x}'.format(n), n % 3, 'v2')
+                for n in rng.sample(range(count * 4), count)]
+    else:
+        raise ValueError('Unknown key type: {}'.format(key_type))
+    return keys
+
+
+def zipf_choices(keys, count, rng, exponent=1.1):
+    """Return count keys drawn with a Zipfian distribution over keys"""
+    weights = [1.0 / (rank ** exponent) for rank in range(1, len(keys) + 1)]
+    return rng.choices(keys, weights=weights, k=count)
+
+
+# Each workload takes (keys, extra_keys, rng), where extra_keys are absent
+# from the table, and returns the keys to prefill plus a list of operations
+# as (operation name, key) pairs.
+
+def insert_workload(keys, extra_keys, rng):
+    return [], [('set', key) for key in keys]
+
+
+def read_workload(keys, extra_keys, rng):
+    return keys, [('get', rng.choice(keys)) for _ in keys]
+
+
+def mixed_workload(keys, extra_keys, rng):
+    ops = []
+    for _ in keys:
+        roll = rng.random()
+        if roll < 0.7:
+            ops.append(('get', rng.choice(keys)))
+        elif roll < 0.9:
+            ops.append(('set', rng.choice(keys)))
+        else:
+            ops.append(('contains', rng.choice(extra_keys)))
+    return keys, ops
+
+
+def delete_churn_workload(keys, extra_keys, rng):
+    ops = []
+    for old_key, new_key in zip(keys, extra_keys):
+        ops.append(('delete', old_key))
+        ops.append(('set', new_key))
+    return keys, ops
+
+
+def miss_workload(keys, extra_keys, rng):
+    ops = []
+    for _ in keys:
+        if rng.random() < 0.9:
+            ops.append(('contains', rng.choice(extra_keys)))
+        else:
+            ops.append(('contains', rng.choice(keys)))
+    return keys, ops
+
+
+def zipf_workload(keys, extra_keys, rng):
+    return keys, [('get', key) for key in zipf_choices(keys, len(keys), rng)]
+
+
+WORKLOADS = {
+    'insert': insert_workload,
+    'read': read_workload,
+    'mixed': mixed_workload,
+    'delete-churn': delete_churn_workload,
+    'miss': miss_workload,
+    'zipf': zipf_workload,
+    # Iterates every item once after prefilling; handled by run_workload
+    'iterate': read_workload,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at the given fraction of the sorted values"""
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _bind(backend, ops):
+    """Return the operations as (function, name, key) triples"""
+    functions = {
+        'set': backend.set,
+        'get': backend.get,
+        'contains': backend.contains,
+        'delete': backend.delete,
+    }
+    return [(functions[name], name, key) for name, key in ops]
+
+
+def _prefilled(backend, keys):
+    table = backend.factory()
+    for key in keys:
+        backend.set(table, key, key)
+    return table
+
+
+def _run(table, calls):
+    """Run the calls and return the elapsed seconds"""
+    start = time.perf_counter()
+    for function, name, key in calls:
+        if name == 'set':
+            function(table, key, key)
+        else:
+            function(table, key)
+    return time.perf_counter() - start
+
+
+def _run_timed(table, calls):
+    """Run the calls timing each one, and return the sorted latencies in ns"""
+    clock = time.perf_counter_ns
+    latencies = []
+    for function, name, key in calls:
+        if name == 'set':
+            start = clock()
+            function(table, key, key)
+        else:
+            start = clock()
+            function(table, key)
+        latencies.append(clock() - start)
+    latencies.sort()
+    return latencies
+
+
+def _iterate(backend, table):
+    start = time.perf_counter()
+    for item in backend.items(table):
+        pass
+    return time.perf_counter() - start
+
+
+def run_workload(backend, workload, key_type, size, seed=0, memory=True):
+    """Run one workload for one backend and return its result as a dict"""
+    rng = random.Random(seed)
+    keys = make_keys(key_type, size * 2, rng)
+    keys, extra_keys = keys[:size], keys[size:]
+    prefill, ops = WORKLOADS[workload](keys, extra_keys, rng)
+    calls = _bind(backend, ops)
+
+    gc.collect()
+    if workload == 'iterate':
+        seconds = _iterate(backend, _prefilled(backend, prefill))
+        op_count = size
+        latencies = None
+    else:
+        seconds = _run(_prefilled(backend, prefill), calls)
+        op_count = len(calls)
+        # A second run on a fresh table, timing every operation separately
+        latencies = _run_timed(_prefilled(backend, prefill), calls)
+
+    result = {
+        'backend': backend.name,
+        'workload': workload,
+        'key_type': key_type,
+        'size': size,
+        'ops': op_count,
+        'seconds': seconds,
+        'ops_per_sec': op_count / seconds if seconds else float('inf'),
+    }
+    if latencies:
+        result['latency_ns'] = {
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'p999': percentile(latencies, 0.999),
+            'max': latencies[-1],
+        }
+    if memory:
+        result.update(measure_memory(backend, prefill or keys))
+    return result
+
+
+def measure_memory(backend, keys):
+    """Return the peak traced memory of building a table of the given keys"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        table = _prefilled(backend, keys)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del table
+    return {
+        'peak_memory_bytes': peak,
+        'memory_bytes': current,
+        'bytes_per_entry': current / len(keys) if keys else 0,
+    }
+
+
+def run_suite(backends, workloads, key_types, sizes, seed=0, memory=True,
+              report=None):
+    """Run every combination and return the results in a JSON-ready dict"""
+    results = []
+    for size in sizes:
+        for key_type in key_types:
+            for workload in workloads:
+                for backend in backends:
+                    result = run_workload(backend, workload, key_type, size,
+                                          seed=seed, memory=memory)
+                    results.append(result)
+                    if report is not None:
+                        report(result)
+    return {
+        'meta': {
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def result_key(result):
+    """Return what identifies a result when comparing two runs"""
+    return (result['backend'], result['workload'], result['key_type'],
+            result['size'])
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return (result key, baseline ops/sec, current ops/sec) for every result
+    whose throughput dropped by more than threshold against the baseline"""
+    previous = dict((result_key(result), result)
+                    for result in baseline['results'])
+    regressions = []
+    for result in current['results']:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        if result['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+            regressions.append((result_key(result), old['ops_per_sec'],
+                                result['ops_per_sec']))
+    return regressions
+
+
+def format_result(result):
+    """Return a one line summary of a result"""
+    line = '{:<20} {:<13} {:<4} {:>9} {:>12,.0f} ops/s'.format(
+        result['backend'], result['workload'], result['key_type'],
+        result['size'], result['ops_per_sec'])
+    if 'latency_ns' in result:
+        line += '  p50 {p50:>6}ns p99 {p99:>7}ns'.format(**result['latency_ns'])
+    if 'bytes_per_entry' in result:
+        line += '  {:>6.1f} B/entry'.format(result['bytes_per_entry'])
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS),
+                        default=sorted(WORKLOADS))
+    parser.add_argument('--key-types', nargs='+',
+                        choices=['int', 'str', 'tuple'],
+                        default=['int', 'str'])
+    parser.add_argument('--backends', nargs='+',
+                        choices=[backend.name for backend in BACKENDS],
+                        default=[backend.name for backend in BACKENDS])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the tracemalloc memory measurement')
+    parser.add_argument('--output', help='write the results as JSON here')
+    parser.add_argument('--baseline',
+                        help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='throughput drop that counts as a regression')
+    args = parser.parse_args(argv)
+
+    backends = [backend for backend in BACKENDS
+                if backend.name in args.backends]
+    results = run_suite(backends, args.workloads, args.key_types, args.sizes,
+                        seed=args.seed, memory=not args.no_memory,
+                        report=lambda result: print(format_result(result)))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(baseline, results, args.threshold)
+        for key, old, new in regressions:
+            print('REGRESSION {}: {:,.0f} -> {:,.0f} ops/s'.format(
+                ' '.join(str(part) for part in key), old, new))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!python
+
+import math
+
+# Multiplier spreading hash codes over all 64 bits before they are split in
+# two, since hash() of small ints is the int itself (2**64 / golden ratio)
+_MIX = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+# Counters stop at this value, and once there are never decremented, since
+# the number of keys sharing them is no longer known
+_SATURATED = 255
+
+
+class CountingBloomFilter(object):
+    """Counting Bloom filter over the hash codes of a set of keys.
+
+    Each hash code increments hash_count of the counters, picked by double
+    hashing (Kirsch and Mitzenmacher), so a key whose counters are not all
+    positive was never added: might_contain rejects it without a false
+    negative, and says maybe to keys that were not added with probability
+    about error_rate while at most capacity hash codes are held. Counters
+    rather than bits let hash codes be removed again.
+
+    Only hash codes are stored, so a HashTable can pass the full hash it
+    already computed and cached for each entry. The filter also counts the
+    lookups it rejected, and HashTable reports the maybes that turned out
+    to be misses as false_positives."""
+
+    __slots__ = ('capacity', 'error_rate', 'hash_count', 'counters', 'count',
+                 'checks', 'rejections', 'false_positives')
+
+    def __init__(self, capacity=8, error_rate=0.05, hash_codes=()):
+        """Initialize this filter sized for capacity hash codes at the given
+        false positive rate, and add the given hash codes"""
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate must be between 0 and 1')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Optimal sizing: m = -n ln p / (ln 2)^2 counters, k = m / n ln 2
+        size = int(math.ceil(-capacity * math.log(error_rate) /
+                             math.log(2) ** 2))
+        self.hash_count = max(1, int(round(size / capacity * math.log(2))))
+        self.counters = bytearray(size)
+        self.count = 0
+        self.checks = 0
+        self.rejections = 0
+        self.false_positives = 0
+        for hash_code in hash_codes:
+            self.add(hash_code)
+
+    def __repr__(self):
+        """Return a string representation of this filter"""
+        return 'CountingBloomFilter(capacity={}, error_rate={})'.format(
+            self.capacity, self.error_rate)
+
+    def __len__(self):
+        """Return the number of hash codes held"""
+        return self.count
+
+    def _positions(self, hash_code):
+        """Return the indexes of the counters of the given hash code"""
+        mixed = (hash_code * _MIX) & _MASK
+        first = mixed >> 32
+        step = (mixed & 0xFFFFFFFF) | 1
+        size = len(self.counters)
+        return [(first + i * step) % size for i in range(self.hash_count)]
+
+    def add(self, hash_code):
+        """Add the given hash code: O(k) for k hash functions"""
+        counters = self.counters
+        for position in self._positions(hash_code):
+            if counters[position] < _SATURATED:
+                counters[position] += 1
+        self.count += 1
+
+    def remove(self, hash_code):
+        """Remove a hash code that was added before: O(k). Removing one that
+        was not added may cause false negatives."""
+        counters = self.counters
+        for position in self._positions(hash_code):
+            if counters[position] < _SATURATED:
+                counters[position] -= 1
+        self.count -= 1
+
+    def might_contain(self, hash_code):
+        """Return False if the given hash code was certainly not added, or
+        True if it may have been: O(k)"""
+        self.checks += 1
+        counters = self.counters
+        mixed = (hash_code * _MIX) & _MASK
+        position = mixed >> 32
+        step = (mixed & 0xFFFFFFFF) | 1
+        size = len(counters)
+        for i in range(self.hash_count):
+            if not counters[position % size]:
+                self.rejections += 1
+                return False
+            position += step
+        return True
+
+    def clear(self):
+        """Remove every hash code, keeping the size and the counts of checks"""
+        self.counters = bytearray(len(self.counters))
+        self.count = 0
+
+    def expected_false_positive_rate(self):
+        """Return the false positive rate expected at the current count:
+        (1 - e^(-kn/m))^k"""
+        return (1 - math.exp(-self.hash_count * self.count /
+                             len(self.counters))) ** self.hash_count
+
+    def stats(self):
+        """Return the size of this filter and the outcomes of its checks as a
+        dict. The observed false positive rate is the fraction of lookups for
+        missing keys that the filter let through."""
+        negatives = self.rejections + self.false_positives
+        return {
+            'capacity': self.capacity,
+            'count': self.count,
+            'counters': len(self.counters),
+            'hash_count': self.hash_count,
+            'checks': self.checks,
+            'rejections': self.rejections,
+            'false_positives': self.false_positives,
+            'false_positive_rate':
+                self.false_positives / negatives if negatives else 0.0,
+            'expected_false_positive_rate':
+                self.expected_false_positive_rate(),
+        }
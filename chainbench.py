@@ -0,0 +1,126 @@
+#!python
+
+"""Compare the bucket chain lengths of HashTable under each hash strategy.
+
+Builds a table from each key set with each strategy and reports how long
+the chains get, which is what lookups pay for. The key sets include
+structured keys that defeat hash(key) modulo a power of two, and keys whose
+builtin hash() values are all equal:
+
+    python chainbench.py --sizes 1000 10000
+"""
+
+import argparse
+import random
+import sys
+
+from hashing import BuiltinHash, FibonacciHash, SipHash
+from hashtable import HashTable
+from sortedbucket import SortedBucket
+
+# The modulus CPython reduces int hashes by on 64-bit builds, so every
+# multiple of it has the same hash()
+HASH_MODULUS = sys.hash_info.modulus
+
+STRATEGIES = {
+    'builtin': BuiltinHash,
+    'fibonacci': FibonacciHash,
+    'siphash': lambda: SipHash(seed=0),
+}
+
+
+def sequential_keys(count, rng):
+    return list(range(count))
+
+
+def random_int_keys(count, rng):
+    return rng.sample(range(count * 1000), count)
+
+
+def random_str_keys(count, rng):
+    return ['user:{:x}'.format(n) for n in rng.sample(range(count * 1000),
+                                                       count)]
+
+
+def stride_keys(count, rng):
+    # e.g. aligned addresses or ids: all share their low 12 bits
+    return [n << 12 for n in range(count)]
+
+
+def equal_hash_keys(count, rng):
+    # Distinct ints whose hash() is 0: the classic hash-flooding attack
+    return [n * HASH_MODULUS for n in range(count)]
+
+
+KEY_SETS = {
+    'sequential': sequential_keys,
+    'random-int': random_int_keys,
+    'random-str': random_str_keys,
+    'stride': stride_keys,
+    'equal-hash': equal_hash_keys,
+}
+
+
+def chain_lengths(strategy, keys):
+    """Build a HashTable of keys with the given strategy and return its
+    chain length statistics as a dict"""
+    table = HashTable(hash_strategy=strategy)
+    table.set_many((key, None) for key in keys)
+    stats = table.stats()
+    histogram = stats['chain_length_histogram']
+    # A successful lookup of the i-th entry of a chain compares i keys.
+    # Treeified buckets are binary searched, so this overstates their cost.
+    probes = sum(count * length * (length + 1) // 2
+                 for length, count in histogram.items())
+    return {
+        'buckets': stats['buckets'],
+        'max_chain_length': stats['max_chain_length'],
+        'mean_chain_length': stats['mean_chain_length'],
+        'mean_successful_probes': probes / len(keys) if keys else 0.0,
+        'empty_buckets': histogram.get(0, 0),
+        'treeified_buckets': sum(type(bucket) is SortedBucket
+                                 for bucket in table.buckets),
+        'chain_length_histogram': histogram,
+    }
+
+
+def run(strategies, key_sets, sizes, seed=0, report=None):
+    """Measure every combination and return the results as a list of dicts"""
+    results = []
+    for size in sizes:
+        for key_set in key_sets:
+            keys = KEY_SETS[key_set](size, random.Random(seed))
+            for name in strategies:
+                result = {'strategy': name, 'key_set': key_set, 'size': size}
+                result.update(chain_lengths(STRATEGIES[name](), keys))
+                results.append(result)
+                if report is not None:
+                    report(result)
+    return results
+
+
+def format_result(result):
+    """Return a one line summary of a result"""
+    return ('{strategy:<10} {key_set:<11} {size:>7}  max {max_chain_length:>6}'
+            '  mean {mean_chain_length:>8.2f}'
+            '  probes {mean_successful_probes:>8.2f}'
+            '  empty {empty_buckets:>6}/{buckets}'
+            '  treeified {treeified_buckets}').format(**result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--strategies', nargs='+', choices=sorted(STRATEGIES),
+                        default=sorted(STRATEGIES))
+    parser.add_argument('--key-sets', nargs='+', choices=sorted(KEY_SETS),
+                        default=sorted(KEY_SETS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    run(args.strategies, args.key_sets, args.sizes, seed=args.seed,
+        report=lambda result: print(format_result(result)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!python
+
+from array import array
+from collections.abc import ItemsView, KeysView, MutableMapping, ValuesView
+
+# Index slot values marking a slot that was never used, and a slot whose
+# entry was deleted. Lookups continue past deleted slots but stop at empty ones.
+EMPTY = -1
+DUMMY = -2
+# Bits of the hash mixed into each further probe, as in CPython's dict
+PERTURB_SHIFT = 5
+MASK_64 = (1 << 64) - 1
+# Typecodes tried for the index array, narrowest first
+INDEX_TYPECODES = ('b', 'h', 'i', 'q')
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+# Stored in place of the key of a deleted entry until the next compaction
+_DELETED = object()
+
+
+def index_typecode(capacity):
+    """Return the narrowest array typecode able to index capacity entries"""
+    for typecode in INDEX_TYPECODES:
+        if capacity <= 1 << (array(typecode).itemsize * 8 - 1):
+            return typecode
+    raise OverflowError('capacity too large')
+
+
+class CompactValuesView(ValuesView):
+    """Live view of the values of a CompactHashTable"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the values in insertion order"""
+        for key, value in self._mapping._iter_entries():
+            yield value
+
+
+class CompactItemsView(ItemsView):
+    """Live view of the (key, value) items of a CompactHashTable"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the items in insertion order"""
+        return self._mapping._iter_entries()
+
+
+class CompactHashTable(MutableMapping):
+    """Hash table laid out like CPython's compact dict. A sparse index array
+    of small integers, 1, 2, 4 or 8 bytes wide depending on its size, points
+    into dense arrays of hashes, keys and values kept in insertion order.
+
+    Iteration walks the dense arrays in insertion order, and an entry costs
+    an 8-byte hash, a key and a value pointer and a few bytes of index,
+    instead of a node and a tuple. Deleting an entry leaves a hole in the
+    dense arrays that is reclaimed once holes outnumber the live entries,
+    or when the table resizes."""
+
+    def __init__(self, init_size=8):
+        """Initialize this hash table with room for init_size entries"""
+        if init_size < 1:
+            raise ValueError('init_size must be at least 1')
+        self.size = 0
+        self.deleted = 0
+        self.hashes = array('q')
+        self.entry_keys = []
+        self.entry_values = []
+        self._allocate(self._capacity_for(init_size))
+
+    def __str__(self):
+        """Return a formatted string representation of this hash table"""
+        items = ('{}: {}'.format(repr(k), repr(v)) for k, v in self.items())
+        return '{' + ', '.join(items) + '}'
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'CompactHashTable({})'.format(repr(list(self.items())))
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the keys of this hash table in insertion order"""
+        for key, value in self._iter_entries():
+            yield key
+
+    def _iter_entries(self):
+        """Iterate over the (key, value) entries in insertion order. Raise
+        RuntimeError if the table gains or loses entries meanwhile."""
+        size = self.size
+        entry_keys = self.entry_keys
+        for key, value in zip(entry_keys, self.entry_values):
+            if key is not _DELETED:
+                yield key, value
+                if self.size != size or self.entry_keys is not entry_keys:
+                    raise RuntimeError(
+                        'CompactHashTable changed size during iteration')
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self._lookup(key, hash(key))[1] >= 0
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    @staticmethod
+    def _capacity_for(count):
+        """Return the number of index slots for count entries: the smallest
+        power of two of which count is at most two thirds"""
+        capacity = 8
+        while capacity * 2 < count * 3:
+            capacity *= 2
+        return capacity
+
+    def _allocate(self, capacity):
+        """Replace the index array with capacity empty slots"""
+        self.indices = array(index_typecode(capacity), [EMPTY]) * capacity
+        self.usable = capacity * 2 // 3
+
+    def _lookup(self, key, key_hash):
+        """Return (slot, entry index) for the given key. If the key is
+        missing the entry index is -1 and slot is where it would go."""
+        indices = self.indices
+        mask = len(indices) - 1
+        hashes = self.hashes
+        entry_keys = self.entry_keys
+        slot = key_hash & mask
+        perturb = key_hash & MASK_64
+        free = -1
+        while True:
+            index = indices[slot]
+            if index == EMPTY:
+                return (slot if free < 0 else free), -1
+            if index == DUMMY:
+                if free < 0:
+                    free = slot
+            elif hashes[index] == key_hash and entry_keys[index] == key:
+                return slot, index
+            perturb >>= PERTURB_SHIFT
+            slot = (slot * 5 + perturb + 1) & mask
+
+    def _rebuild(self, capacity):
+        """Drop the holes left by deleted entries and rebuild the index with
+        capacity slots. Running time: O(n + m) for n entries and m slots."""
+        if self.deleted:
+            live = [index for index, key in enumerate(self.entry_keys)
+                    if key is not _DELETED]
+            self.hashes = array('q', [self.hashes[i] for i in live])
+            self.entry_keys = [self.entry_keys[i] for i in live]
+            self.entry_values = [self.entry_values[i] for i in live]
+            self.deleted = 0
+        self._allocate(capacity)
+        indices = self.indices
+        mask = capacity - 1
+        # Stored hashes mean no key is hashed again, and no key is compared
+        # since every entry is known to be distinct
+        for index, key_hash in enumerate(self.hashes):
+            slot = key_hash & mask
+            perturb = key_hash & MASK_64
+            while indices[slot] != EMPTY:
+                perturb >>= PERTURB_SHIFT
+                slot = (slot * 5 + perturb + 1) & mask
+            indices[slot] = index
+
+    def compact(self):
+        """Reclaim the holes left by deleted entries, and shrink the index
+        if the table has shrunk"""
+        self._rebuild(self._capacity_for(self.size))
+
+    def reserve(self, count):
+        """Grow this hash table so it can hold count entries without resizing"""
+        if count > self.usable:
+            self._rebuild(self._capacity_for(count))
+
+    def load_factor(self):
+        """Return the fraction of index slots that point to an entry"""
+        return self.size / len(self.indices)
+
+    def keys(self):
+        """Return a live view of the keys in insertion order"""
+        return KeysView(self)
+
+    def values(self):
+        """Return a live view of the values in insertion order"""
+        return CompactValuesView(self)
+
+    def items(self):
+        """Return a live view of the items in insertion order"""
+        return CompactItemsView(self)
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        index = self._lookup(key, hash(key))[1]
+        if index >= 0:
+            return self.entry_values[index]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def _append(self, slot, key_hash, key, value):
+        """Add a new entry, pointed to by the given free index slot"""
+        if len(self.entry_keys) >= self.usable:
+            # Out of room in the dense arrays: compact, growing if needed
+            self._rebuild(self._capacity_for(self.size + 1))
+            slot = self._lookup(key, key_hash)[0]
+        self.indices[slot] = len(self.entry_keys)
+        self.hashes.append(key_hash)
+        self.entry_keys.append(key)
+        self.entry_values.append(value)
+        self.size += 1
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value. A new
+        key goes to the end of the insertion order. Average case: O(1)."""
+        key_hash = hash(key)
+        slot, index = self._lookup(key, key_hash)
+        if index >= 0:
+            self.entry_values[index] = value
+        else:
+            self._append(slot, key_hash, key, value)
+
+    def setdefault(self, key, default=None):
+        """Return the value of the given key, inserting it with default first
+        if it is missing"""
+        key_hash = hash(key)
+        slot, index = self._lookup(key, key_hash)
+        if index >= 0:
+            return self.entry_values[index]
+        self._append(slot, key_hash, key, default)
+        return default
+
+    def pop(self, key, default=_MISSING):
+        """Remove the given key and return its value. If the key is missing,
+        return default if given, or raise KeyError"""
+        slot, index = self._lookup(key, hash(key))
+        if index < 0:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self.entry_values[index]
+        self.indices[slot] = DUMMY
+        self.hashes[index] = 0
+        self.entry_keys[index] = _DELETED
+        self.entry_values[index] = None
+        self.size -= 1
+        self.deleted += 1
+        # Amortized O(1): at least as many deletes as live entries happened
+        # since the last compaction
+        if self.deleted > self.size:
+            self.compact()
+        return value
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    def clear(self):
+        """Remove every entry"""
+        self.size = 0
+        self.deleted = 0
+        self.hashes = array('q')
+        self.entry_keys = []
+        self.entry_values = []
+        self._allocate(self._capacity_for(1))
@@ -0,0 +1,190 @@
+#!python
+
+import threading
+from collections.abc import MutableMapping
+
+from hashing import fibonacci_index
+from hashtable import HashTable
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+
+
+class Stripe(object):
+    """One lock stripe: a HashTable, the lock guarding its writes, and a
+    version that is odd while a write is in progress"""
+
+    __slots__ = ('table', 'lock', 'version')
+
+    def __init__(self, table):
+        self.table = table
+        self.lock = threading.Lock()
+        self.version = 0
+
+
+class ConcurrentHashTable(MutableMapping):
+    """Thread-safe hash table split into independently locked stripes.
+    Operations on keys in different stripes never wait for each other, and
+    each stripe grows and shrinks on its own, so a resize only ever blocks
+    the writers of one stripe.
+
+    Reads first try without the lock: they record the stripe version, read,
+    and only keep the result if no write started or finished meanwhile and
+    the read raised nothing, otherwise they retry under the lock. This relies on nothing but atomic
+    attribute reads, so it stays correct on free-threaded CPython builds."""
+
+    def __init__(self, stripes=16, init_size=8, **table_options):
+        """Initialize this hash table with the given number of lock stripes,
+        rounded up to a power of two. Other arguments are passed to the
+        HashTable of each stripe."""
+        count = 1
+        while count < stripes:
+            count *= 2
+        self.stripe_bits = count.bit_length() - 1
+        self.stripes = [Stripe(HashTable(init_size, **table_options))
+                        for i in range(count)]
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'ConcurrentHashTable({})'.format(repr(self.items()))
+
+    def _stripe(self, key):
+        """Return the stripe the given key belongs to"""
+        # Use the high bits of a multiplicative hash, so the stripe does not
+        # depend on the low bits the stripe's HashTable picks its bucket by
+        return self.stripes[fibonacci_index(hash(key), self.stripe_bits)]
+
+    def _read(self, stripe, key):
+        """Return the entry for the given key, or None"""
+        version = stripe.version
+        table = stripe.table
+        key_hash = table._hash(key)
+        # The optimistic path only works while the stripe is not resizing,
+        # since lookups during a resize move entries between buckets
+        if not version & 1 and table.old_buckets is None:
+            buckets = table.buckets
+            bucket = buckets[table._slot(key_hash, len(buckets))]
+            try:
+                entry = (None if bucket is None
+                         else bucket.find_entry(key, key_hash))
+            except Exception:
+                # A write tore the bucket under us, e.g. a SortedBucket's
+                # parallel lists changing length. A genuine error, such as
+                # from the key's __eq__, is raised again under the lock.
+                pass
+            else:
+                if stripe.version == version:
+                    return entry
+        with stripe.lock:
+            bucket = table._find_bucket(key_hash)
+            return None if bucket is None else bucket.find_entry(key, key_hash)
+
+    def _write(self, stripe, function, *args):
+        """Call function(table, *args) on the stripe's table under its lock"""
+        with stripe.lock:
+            stripe.version += 1
+            try:
+                return function(stripe.table, *args)
+            finally:
+                stripe.version += 1
+
+    def __len__(self):
+        """Return the number of entries. Writes running at the same time may
+        or may not be counted."""
+        return sum(stripe.table.size for stripe in self.stripes)
+
+    def __iter__(self):
+        """Iterate over the keys, copying one stripe at a time"""
+        for stripe in self.stripes:
+            with stripe.lock:
+                keys = list(stripe.table.keys())
+            for key in keys:
+                yield key
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self._read(self._stripe(key), key) is not None
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self._write(self._stripe(key), HashTable.set, key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self._write(self._stripe(key), HashTable.pop, key)
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        entry = self._read(self._stripe(key), key)
+        if entry is not None:
+            return entry[1]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self[key] = value
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        del self[key]
+
+    def pop(self, key, default=_MISSING):
+        """Remove the given key and return its value. If the key is missing,
+        return default if given, or raise KeyError"""
+        return self._write(self._stripe(key), HashTable.pop, key, default)
+
+    def setdefault(self, key, default=None):
+        """Atomically return the value of the given key, inserting it with
+        default first if it is missing"""
+        return self._write(self._stripe(key), HashTable.setdefault, key,
+                           default)
+
+    def compare_and_set(self, key, expected, value):
+        """Atomically set the given key to value only if it currently maps to
+        a value equal to expected. Return True if the value was replaced."""
+        return self._write(self._stripe(key), HashTable.compare_and_set, key,
+                           expected, value)
+
+    def increment(self, key, delta=1):
+        """Atomically add delta to the value of the given key, starting from
+        0 if it is missing, and return the new value"""
+        return self._write(self._stripe(key), HashTable.increment, key,
+                           delta)
+
+    def length(self):
+        """Return the number of entries in this hash table"""
+        return len(self)
+
+    def keys(self):
+        """Return a list of all keys, copied one stripe at a time"""
+        return list(self)
+
+    def values(self):
+        """Return a list of all values, copied one stripe at a time"""
+        return [value for key, value in self.items()]
+
+    def items(self):
+        """Return a list of all (key, value) pairs, copied one stripe at a
+        time. Each stripe is consistent, but writes to other stripes may
+        happen while the list is being built."""
+        all_items = []
+        for stripe in self.stripes:
+            with stripe.lock:
+                all_items.extend(stripe.table.items())
+        return all_items
+
+    def clear(self):
+        """Remove every entry, one stripe at a time"""
+        for stripe in self.stripes:
+            self._write(stripe, HashTable.clear)
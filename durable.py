@@ -0,0 +1,534 @@
+#!python
+
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+from collections.abc import MutableMapping
+
+from hashtable import HashTable
+from mmaptable import (PICKLE_PROTOCOL, MmapHashTable, save_table,
+                       serialize_key)
+
+# Log file layout, all integers little-endian:
+#   header   magic and version
+#   records  each a CRC-32 of the rest of the record, then an operation code,
+#            key length and value length, followed by the pickled key and
+#            value. A record that is cut short or fails its CRC marks the
+#            end of the log: it was being written when the process stopped.
+LOG_MAGIC = b'HTWL'
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct('<4sI')
+CHECKSUM = struct.Struct('<I')
+RECORD = struct.Struct('<BII')
+# Record operation codes
+SET = 1
+DELETE = 2
+CLEAR = 3
+
+# When records reach the disk: fsync before each write returns, fsync from a
+# background thread every fsync_interval seconds, or leave it to the OS.
+# Every policy writes records to the file before returning, so a crash of
+# the process alone never loses an acknowledged write.
+FSYNC_POLICIES = ('always', 'interval', 'never')
+# Log size past which a background compaction folds it into the snapshot
+MAX_LOG_BYTES = 64 << 20
+
+SNAPSHOT_NAME = 'snapshot.{:08d}'
+LOG_NAME = 'log.{:08d}'
+FILE_NAME = re.compile(r'(snapshot|log)\.(\d{8})$')
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+
+_fsync = getattr(os, 'fdatasync', os.fsync)
+
+
+def encode_record(operation, key_bytes=b'', value_bytes=b''):
+    """Return the log record of an operation on pickled key and value bytes"""
+    body = RECORD.pack(operation, len(key_bytes), len(value_bytes))
+    checksum = zlib.crc32(value_bytes, zlib.crc32(key_bytes, zlib.crc32(body)))
+    return b''.join((CHECKSUM.pack(checksum), body, key_bytes, value_bytes))
+
+
+def read_records(data, position=LOG_HEADER.size):
+    """Yield (operation, key bytes, value bytes, end offset) for each record
+    of the given log contents, up to the first cut short or corrupt one"""
+    view = memoryview(data)
+    size = len(data)
+    while position + CHECKSUM.size + RECORD.size <= size:
+        checksum, = CHECKSUM.unpack_from(data, position)
+        start = position + CHECKSUM.size
+        operation, key_length, value_length = RECORD.unpack_from(data, start)
+        key_start = start + RECORD.size
+        value_start = key_start + key_length
+        end = value_start + value_length
+        if end > size or zlib.crc32(view[start:end]) != checksum:
+            return
+        yield (operation, view[key_start:value_start],
+               view[value_start:end], end)
+        position = end
+
+
+def replay_log(table, path):
+    """Apply the records of the log file at path to table, in order. Return
+    the length of the intact part of the file, 0 if it has no header."""
+    with open(path, 'rb') as log:
+        data = log.read()
+    if len(data) < LOG_HEADER.size:
+        return 0
+    magic, version = LOG_HEADER.unpack_from(data, 0)
+    if magic != LOG_MAGIC:
+        raise ValueError('Not a HashTable log: {}'.format(path))
+    if version != LOG_VERSION:
+        raise ValueError('Unsupported log version: {}'.format(version))
+    end = LOG_HEADER.size
+    for operation, key_bytes, value_bytes, end in read_records(data):
+        if operation == SET:
+            table.set(pickle.loads(key_bytes), pickle.loads(value_bytes))
+        elif operation == DELETE:
+            table.pop(pickle.loads(key_bytes), None)
+        elif operation == CLEAR:
+            table.clear()
+        else:
+            raise ValueError('Unknown log operation: {}'.format(operation))
+    return end
+
+
+def _fsync_directory(directory):
+    """Make the creation, renaming and removal of files in the given
+    directory durable, where the platform allows it"""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+class DurableHashTable(MutableMapping):
+    """HashTable whose every change is appended to a write-ahead log in the
+    given directory, and replayed from it when the directory is opened again.
+
+    Changes from concurrent threads are group committed: whichever thread
+    gets to the log first writes, and fsyncs, the records of every thread
+    waiting behind it in one go. When the log grows past max_log_bytes it
+    is swapped for an empty one, and a background thread folds the old log
+    into a new snapshot file read straight from disk, so writers go on
+    while it runs. Opening the directory loads the latest snapshot and
+    replays the logs written since.
+
+    If writing or fsyncing the log fails, the error is raised to the thread
+    that wrote, and the table stops taking changes, since the log may end in
+    a torn record that recovery would stop at: later changes raise OSError,
+    and the last ones may be in memory without being in the log.
+
+    Keys and values must be picklable. Iterating while other threads write
+    is not safe, as with HashTable."""
+
+    def __init__(self, directory, fsync='always', fsync_interval=1.0,
+                 max_log_bytes=MAX_LOG_BYTES, **table_options):
+        """Open, or create, the durable hash table in the given directory.
+        fsync is one of FSYNC_POLICIES. Other arguments are passed to the
+        in-memory HashTable."""
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError('fsync must be one of {}'.format(
+                ', '.join(FSYNC_POLICIES)))
+        self.directory = directory
+        self.fsync = fsync
+        self.max_log_bytes = max_log_bytes
+        self.table_options = table_options
+        self.table = HashTable(**table_options)
+        # lock guards the table and the pending records; commit_lock is held
+        # by the one thread writing to the log, and is always taken first
+        self.lock = threading.Lock()
+        self.commit_lock = threading.Lock()
+        self.pending = []
+        self.sequence = 0
+        self.committed = 0
+        self.commits = 0
+        self.compactions = 0
+        self.compactor = None
+        self.closed = False
+        # The error a log write or fsync failed with, after which every
+        # change is refused
+        self.failure = None
+        self._recover()
+        self._stop = threading.Event()
+        self.flusher = None
+        if fsync == 'interval':
+            self.flusher = threading.Thread(
+                target=self._sync_periodically, args=(fsync_interval,),
+                name='DurableHashTable fsync', daemon=True)
+            self.flusher.start()
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'DurableHashTable({!r}, {} entries)'.format(self.directory,
+                                                            len(self))
+
+    def __enter__(self):
+        """Return this hash table for use in a with statement"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close this hash table at the end of a with statement"""
+        self.close()
+
+    def _path(self, name, generation):
+        return os.path.join(self.directory, name.format(generation))
+
+    def _recover(self):
+        """Load the latest snapshot, replay the logs written since, and open
+        the last log for appending, cutting off any torn record at its end"""
+        os.makedirs(self.directory, exist_ok=True)
+        generations = {'snapshot': [], 'log': []}
+        for name in os.listdir(self.directory):
+            match = FILE_NAME.match(name)
+            if match:
+                generations[match.group(1)].append(int(match.group(2)))
+            elif name.endswith('.tmp'):
+                # A snapshot that was still being written
+                os.remove(os.path.join(self.directory, name))
+        # A snapshot covers the logs up to its own generation
+        self.base = max(generations['snapshot'], default=0)
+        if self.base:
+            self._load_snapshot(self.table, self.base)
+        self._remove_files(
+            [generation for generation in generations['snapshot']
+             if generation < self.base],
+            [generation for generation in generations['log']
+             if generation <= self.base])
+        logs = sorted(generation for generation in generations['log']
+                      if generation > self.base)
+        length = 0
+        for generation in logs:
+            length = replay_log(self.table, self._path(LOG_NAME, generation))
+        self.generation = logs[-1] if logs else self.base + 1
+        self._open_log(length)
+
+    def _load_snapshot(self, table, generation):
+        """Insert the entries of the snapshot of the given generation"""
+        path = self._path(SNAPSHOT_NAME, generation)
+        with MmapHashTable(path) as snapshot:
+            table.reserve(len(snapshot))
+            table.set_many(snapshot.items())
+
+    def _remove_files(self, snapshots, logs):
+        """Remove the snapshots and logs of the given generations"""
+        for generation in snapshots:
+            os.remove(self._path(SNAPSHOT_NAME, generation))
+        for generation in logs:
+            os.remove(self._path(LOG_NAME, generation))
+        if snapshots or logs:
+            _fsync_directory(self.directory)
+
+    def _open_log(self, length=0):
+        """Open the log of the current generation for appending, keeping its
+        first length bytes, or starting it afresh if length is 0"""
+        path = self._path(LOG_NAME, self.generation)
+        created = not os.path.exists(path)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                             0o644)
+        os.ftruncate(descriptor, length)
+        if not length:
+            self._write(descriptor, LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+            length = LOG_HEADER.size
+        if self.fsync != 'never':
+            _fsync(descriptor)
+            if created:
+                _fsync_directory(self.directory)
+        self.descriptor = descriptor
+        self.log_bytes = length
+
+    @staticmethod
+    def _write(descriptor, data):
+        """Write all of data to the given file descriptor"""
+        view = memoryview(data)
+        while view:
+            view = view[os.write(descriptor, view):]
+
+    def _check_open(self):
+        """Raise ValueError if this hash table is closed, or OSError if its
+        log failed. Mutators call it with lock held before changing the
+        table, so a change that cannot be logged is never made."""
+        if self.closed:
+            raise ValueError('DurableHashTable is closed')
+        self._check_failed()
+
+    def _check_failed(self):
+        """Raise OSError if the log failed"""
+        if self.failure is not None:
+            raise OSError('DurableHashTable log failed: {}'.format(
+                self.failure))
+
+    def _fail(self, error):
+        """Refuse every change from now on, after the log failed with the
+        given error"""
+        with self.lock:
+            if self.failure is None:
+                self.failure = error
+
+    def _append(self, records):
+        """Queue records for the log and return the sequence number of the
+        last one. Called with lock held, right after changing the table, so
+        records queue in the order the changes were made."""
+        self.pending.extend(records)
+        self.sequence += len(records)
+        return self.sequence
+
+    def _flush(self):
+        """Write the pending records to the log. Called with commit_lock
+        held. Return the number of bytes written."""
+        with self.lock:
+            self._check_failed()
+            records = self.pending
+            self.pending = []
+            sequence = self.sequence
+        data = b''.join(records)
+        if data:
+            try:
+                self._write(self.descriptor, data)
+            except Exception as error:
+                # Part of the data may be in the log, so nothing can follow
+                self._fail(error)
+                raise
+            self.log_bytes += len(data)
+            self.commits += 1
+        self.committed = sequence
+        return len(data)
+
+    def _sync_log(self):
+        """fsync the log, refusing every change from now on if that fails,
+        since the kernel may have dropped the data it could not write"""
+        try:
+            _fsync(self.descriptor)
+        except OSError as error:
+            self._fail(error)
+            raise
+
+    def _commit(self, sequence):
+        """Return once the record with the given sequence number is in the
+        log, and on disk if the fsync policy is 'always'. The first thread
+        in writes the records queued by every thread waiting behind it."""
+        with self.commit_lock:
+            if self.committed >= sequence:
+                return
+            if self._flush() and self.fsync == 'always':
+                self._sync_log()
+            full = self.log_bytes > self.max_log_bytes
+        if full:
+            self.compact(wait=False)
+
+    def sync(self):
+        """Write every pending record to the log and fsync it"""
+        with self.commit_lock:
+            self._check_open()
+            self._flush()
+            self._sync_log()
+
+    def _sync_periodically(self, interval):
+        """Call sync every interval seconds until the table is closed, or
+        until the log fails: writers are told of that by their next change"""
+        while not self._stop.wait(interval):
+            try:
+                self.sync()
+            except OSError:
+                return
+
+    def compact(self, wait=True):
+        """Start a new log, and fold the old logs and snapshot into a new
+        snapshot in a background thread, unless one is already running.
+        If wait is True, return once it is done."""
+        with self.commit_lock:
+            self._check_open()
+            compactor = self.compactor
+            if compactor is None or not compactor.is_alive():
+                self._flush()
+                if self.fsync != 'never':
+                    self._sync_log()
+                os.close(self.descriptor)
+                self.generation += 1
+                self._open_log()
+                compactor = self.compactor = threading.Thread(
+                    target=self._compact, args=(self.generation - 1,),
+                    name='DurableHashTable compaction', daemon=True)
+                compactor.start()
+        if wait:
+            compactor.join()
+
+    def _compact(self, generation):
+        """Write the snapshot of the given generation from the previous one
+        and the logs since, then remove the files it replaces. Only reads
+        files no writer touches any more, so it takes no locks."""
+        table = HashTable(**self.table_options)
+        base = self.base
+        if base:
+            self._load_snapshot(table, base)
+        logs = [log for log in range(base + 1, generation + 1)
+                if os.path.exists(self._path(LOG_NAME, log))]
+        for log in logs:
+            replay_log(table, self._path(LOG_NAME, log))
+        save_table(table.items(), self._path(SNAPSHOT_NAME, generation))
+        _fsync_directory(self.directory)
+        # From here on the new snapshot is the one recovery loads, so the
+        # files it replaces can go
+        self.base = generation
+        self._remove_files([base] if base else [], logs)
+        self.compactions += 1
+
+    def close(self):
+        """Wait for any compaction, write and fsync the pending records and
+        close the log. If the log failed, it is closed as it is."""
+        if self.closed:
+            return
+        self._stop.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        if self.compactor is not None:
+            self.compactor.join()
+        with self.commit_lock:
+            with self.lock:
+                self.closed = True
+            try:
+                if self.failure is None:
+                    self._flush()
+                    if self.fsync != 'never':
+                        self._sync_log()
+            finally:
+                os.close(self.descriptor)
+
+    def stats(self):
+        """Return a dict of counters about the log"""
+        with self.commit_lock:
+            return {
+                'records': self.committed,
+                'commits': self.commits,
+                'records_per_commit': (self.committed / self.commits
+                                       if self.commits else 0.0),
+                'log_bytes': self.log_bytes,
+                'generation': self.generation,
+                'compactions': self.compactions,
+            }
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return len(self.table)
+
+    def __iter__(self):
+        """Iterate over the keys of this hash table"""
+        return iter(self.table)
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        with self.lock:
+            return self.table.contains(key)
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    def keys(self):
+        """Return a live view of the keys in this hash table"""
+        return self.table.keys()
+
+    def values(self):
+        """Return a live view of the values in this hash table"""
+        return self.table.values()
+
+    def items(self):
+        """Return a live view of the items (key-value pairs) in this hash table"""
+        return self.table.items()
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return len(self.table)
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        with self.lock:
+            value = self.table.get(key, _MISSING)
+        if value is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return value
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value, and
+        return once the change is logged"""
+        # Pickling happens before the table changes, so a value that cannot
+        # be pickled raises without changing anything
+        record = encode_record(SET, serialize_key(key),
+                               pickle.dumps(value, protocol=PICKLE_PROTOCOL))
+        with self.lock:
+            self._check_open()
+            self.table.set(key, value)
+            sequence = self._append((record,))
+        self._commit(sequence)
+
+    def pop(self, key, default=_MISSING):
+        """Remove the given key and return its value. If the key is missing,
+        return default if given, or raise KeyError"""
+        record = encode_record(DELETE, serialize_key(key))
+        with self.lock:
+            self._check_open()
+            value = self.table.pop(key, _MISSING)
+            if value is _MISSING:
+                if default is _MISSING:
+                    raise KeyError(key)
+                return default
+            sequence = self._append((record,))
+        self._commit(sequence)
+        return value
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    def set_many(self, pairs):
+        """Insert or update every (key, value) pair from the given iterable,
+        in order, logging them all in one commit"""
+        pairs = list(pairs)
+        records = [encode_record(SET, serialize_key(key),
+                                 pickle.dumps(value, protocol=PICKLE_PROTOCOL))
+                   for key, value in pairs]
+        with self.lock:
+            self._check_open()
+            self.table.set_many(pairs)
+            sequence = self._append(records)
+        self._commit(sequence)
+
+    def update(self, other=(), **kwargs):
+        """Insert or update every key-value pair from the given mapping or
+        iterable of pairs, and from keyword arguments, in one commit"""
+        if hasattr(other, 'keys'):
+            other = [(key, other[key]) for key in other.keys()]
+        self.set_many(list(other) + list(kwargs.items()))
+
+    def clear(self):
+        """Remove every entry"""
+        with self.lock:
+            self._check_open()
+            self.table.clear()
+            sequence = self._append((encode_record(CLEAR),))
+        self._commit(sequence)
@@ -0,0 +1,511 @@
+#!python
+
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+
+# Hash bits consumed per trie level, so each node has up to 32 children
+BITS = 5
+LEVEL_MASK = (1 << BITS) - 1
+MASK_64 = (1 << 64) - 1
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+
+
+class BitmapNode(object):
+    """Trie node holding up to 32 items, one per 5-bit chunk of the hash at
+    its level. Bit i of bitmap is set if chunk i is present, and its item
+    is items[number of set bits below bit i]: a (hash, key, value) leaf, or
+    a child node for the keys sharing that chunk.
+
+    Nodes are never changed once shared. edit is the token of the transient
+    table that created the node, if any: only that table, while it holds
+    the same token, may change the node in place."""
+
+    __slots__ = ('bitmap', 'items', 'edit')
+
+    def __init__(self, bitmap, items, edit=None):
+        self.bitmap = bitmap
+        self.items = items
+        self.edit = edit
+
+    def _editable(self, edit):
+        """Return this node if edit owns it, or a copy owned by edit"""
+        if edit is not None and self.edit is edit:
+            return self
+        return BitmapNode(self.bitmap, list(self.items), edit)
+
+    def assoc(self, edit, shift, key_hash, key, value, changed):
+        """Return this node, or a copy, with the given key set to value.
+        Set changed[0] to True if the key was added."""
+        bit = 1 << ((key_hash >> shift) & LEVEL_MASK)
+        position = (self.bitmap & (bit - 1)).bit_count()
+        if not self.bitmap & bit:
+            changed[0] = True
+            node = self._editable(edit)
+            node.items.insert(position, (key_hash, key, value))
+            node.bitmap |= bit
+            return node
+        item = self.items[position]
+        if type(item) is tuple:
+            if item[0] == key_hash and item[1] == key:
+                if item[2] is value:
+                    return self
+                new = (key_hash, item[1], value)
+            else:
+                changed[0] = True
+                new = _pair(edit, shift + BITS, item, (key_hash, key, value))
+        else:
+            new = item.assoc(edit, shift + BITS, key_hash, key, value, changed)
+            if new is item:
+                return self
+        node = self._editable(edit)
+        node.items[position] = new
+        return node
+
+    def without(self, edit, shift, key_hash, key, changed):
+        """Return this node, or a copy, without the given key, or None if
+        that leaves it empty. Set changed[0] to True if the key was removed."""
+        bit = 1 << ((key_hash >> shift) & LEVEL_MASK)
+        if not self.bitmap & bit:
+            return self
+        position = (self.bitmap & (bit - 1)).bit_count()
+        item = self.items[position]
+        if type(item) is tuple:
+            if item[0] != key_hash or item[1] != key:
+                return self
+            changed[0] = True
+            new = None
+        else:
+            new = item.without(edit, shift + BITS, key_hash, key, changed)
+            # A child left with a single leaf is replaced by the leaf, so
+            # lookups do not walk down chains of one-item nodes
+            if new is not None and len(new.items) == 1 and \
+                    type(new.items[0]) is tuple:
+                new = new.items[0]
+            elif new is item:
+                return self
+        if new is None:
+            if self.bitmap == bit:
+                return None
+            node = self._editable(edit)
+            del node.items[position]
+            node.bitmap ^= bit
+            return node
+        node = self._editable(edit)
+        node.items[position] = new
+        return node
+
+
+class CollisionNode(object):
+    """Trie node holding the (hash, key, value) leaves of distinct keys with
+    the same full hash, searched linearly"""
+
+    __slots__ = ('key_hash', 'items', 'edit')
+
+    def __init__(self, key_hash, items, edit=None):
+        self.key_hash = key_hash
+        self.items = items
+        self.edit = edit
+
+    def _editable(self, edit):
+        """Return this node if edit owns it, or a copy owned by edit"""
+        if edit is not None and self.edit is edit:
+            return self
+        return CollisionNode(self.key_hash, list(self.items), edit)
+
+    def assoc(self, edit, shift, key_hash, key, value, changed):
+        """Return this node, or a new one, with the given key set to value"""
+        if key_hash != self.key_hash:
+            # Another hash reached this node: push it one level down, under
+            # a bitmap node that tells the two hashes apart
+            bit = 1 << ((self.key_hash >> shift) & LEVEL_MASK)
+            node = BitmapNode(bit, [self], edit)
+            return node.assoc(edit, shift, key_hash, key, value, changed)
+        for position, item in enumerate(self.items):
+            if item[1] == key:
+                if item[2] is value:
+                    return self
+                node = self._editable(edit)
+                node.items[position] = (key_hash, item[1], value)
+                return node
+        changed[0] = True
+        node = self._editable(edit)
+        node.items.append((key_hash, key, value))
+        return node
+
+    def without(self, edit, shift, key_hash, key, changed):
+        """Return this node, or a copy, without the given key"""
+        if key_hash != self.key_hash:
+            return self
+        for position, item in enumerate(self.items):
+            if item[1] == key:
+                changed[0] = True
+                node = self._editable(edit)
+                del node.items[position]
+                return node
+        return self
+
+
+def _pair(edit, shift, first, second):
+    """Return a node holding two leaves with different keys, starting at the
+    level of the given shift"""
+    if first[0] == second[0]:
+        return CollisionNode(first[0], [first, second], edit)
+    first_chunk = (first[0] >> shift) & LEVEL_MASK
+    second_chunk = (second[0] >> shift) & LEVEL_MASK
+    if first_chunk == second_chunk:
+        child = _pair(edit, shift + BITS, first, second)
+        return BitmapNode(1 << first_chunk, [child], edit)
+    if first_chunk > second_chunk:
+        first, second = second, first
+    return BitmapNode((1 << first_chunk) | (1 << second_chunk),
+                      [first, second], edit)
+
+
+EMPTY_NODE = BitmapNode(0, [])
+
+
+def _find(root, key_hash, key):
+    """Return the (hash, key, value) leaf of the given key under root, or
+    None if missing. Running time: O(log32 n) nodes, at most 13."""
+    node = root
+    shift = 0
+    while True:
+        if type(node) is CollisionNode:
+            if node.key_hash == key_hash:
+                for item in node.items:
+                    if item[1] == key:
+                        return item
+            return None
+        bit = 1 << ((key_hash >> shift) & LEVEL_MASK)
+        bitmap = node.bitmap
+        if not bitmap & bit:
+            return None
+        item = node.items[(bitmap & (bit - 1)).bit_count()]
+        if type(item) is tuple:
+            if item[0] == key_hash and item[1] == key:
+                return item
+            return None
+        node = item
+        shift += BITS
+
+
+def _leaves(root):
+    """Iterate over the (hash, key, value) leaves under root"""
+    stack = [iter(root.items)]
+    while stack:
+        for item in stack[-1]:
+            if type(item) is tuple:
+                yield item
+            else:
+                stack.append(iter(item.items))
+                break
+        else:
+            stack.pop()
+
+
+def _hash(key):
+    """Return the hash of the given key as an unsigned 64-bit integer"""
+    return hash(key) & MASK_64
+
+
+class HAMTValuesView(ValuesView):
+    """View of the values of a persistent or transient hash table"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the values without looking each key up again"""
+        for key, value in self._mapping._iter_entries():
+            yield value
+
+
+class HAMTItemsView(ItemsView):
+    """View of the (key, value) items of a persistent or transient table"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the items without looking each key up again"""
+        return self._mapping._iter_entries()
+
+
+class PersistentHashTable(Mapping):
+    """Immutable hash table stored as a hash array mapped trie (HAMT). set and
+    delete return a new table that shares every node off the path to the
+    changed key with this one, so a new version costs O(log32 n) new nodes
+    rather than a copy, and old versions stay valid and unchanged.
+
+    For many changes at once, take a transient() copy, change it in place,
+    and turn it back with its snapshot() method. Both calls are O(1)."""
+
+    __slots__ = ('root', 'size')
+
+    def __init__(self, items=()):
+        """Initialize this table with a mapping or (key, value) pairs"""
+        table = TransientHashTable(items)
+        self.root = table.root
+        self.size = table.size
+        table.edit = None
+
+    @classmethod
+    def _make(cls, root, size):
+        """Return a table with the given root node and number of entries"""
+        table = cls.__new__(cls)
+        table.root = root
+        table.size = size
+        return table
+
+    def __str__(self):
+        """Return a formatted string representation of this hash table"""
+        items = ('{}: {}'.format(repr(k), repr(v)) for k, v in self.items())
+        return '{' + ', '.join(items) + '}'
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'PersistentHashTable({})'.format(repr(list(self.items())))
+
+    def __reduce__(self):
+        return type(self), (list(self.items()),)
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the keys of this hash table"""
+        for leaf in _leaves(self.root):
+            yield leaf[1]
+
+    def _iter_entries(self):
+        """Iterate over the (key, value) entries of this hash table"""
+        for leaf in _leaves(self.root):
+            yield leaf[1], leaf[2]
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return _find(self.root, _hash(key), key) is not None
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def values(self):
+        """Return a view of the values in this hash table"""
+        return HAMTValuesView(self)
+
+    def items(self):
+        """Return a view of the items (key-value pairs) in this hash table"""
+        return HAMTItemsView(self)
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        leaf = _find(self.root, _hash(key), key)
+        if leaf is not None:
+            return leaf[2]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def set(self, key, value):
+        """Return a new table with the given key set to value, or this table
+        if it already has that value. Running time: O(log32 n)."""
+        changed = [False]
+        root = self.root.assoc(None, 0, _hash(key), key, value, changed)
+        if root is self.root:
+            return self
+        return self._make(root, self.size + changed[0])
+
+    def delete(self, key):
+        """Return a new table without the given key, or raise KeyError.
+        Running time: O(log32 n)."""
+        changed = [False]
+        root = self.root.without(None, 0, _hash(key), key, changed)
+        if not changed[0]:
+            raise KeyError(key)
+        return self._make(root or EMPTY_NODE, self.size - 1)
+
+    def discard(self, key):
+        """Return a new table without the given key, or this table if the key
+        is missing"""
+        changed = [False]
+        root = self.root.without(None, 0, _hash(key), key, changed)
+        if not changed[0]:
+            return self
+        return self._make(root or EMPTY_NODE, self.size - 1)
+
+    def update(self, items):
+        """Return a new table with every key of the given mapping or
+        (key, value) pairs set, building it through a transient"""
+        table = self.transient()
+        table.update(items)
+        return table.snapshot()
+
+    def transient(self):
+        """Return a mutable TransientHashTable starting with the entries of
+        this table, which it never changes: O(1)"""
+        return TransientHashTable._make(self.root, self.size)
+
+
+class TransientHashTable(MutableMapping):
+    """Mutable hash table with the layout of PersistentHashTable, changed in
+    place. snapshot() returns its current contents as a PersistentHashTable
+    in O(1), after which nodes shared with the snapshot are copied before
+    being changed, so readers holding snapshots see a consistent version
+    while writers go on.
+
+    Changes allocate no new nodes once the path to a key has been copied
+    since the last snapshot, which makes this the fast way to build or
+    bulk edit a persistent table."""
+
+    def __init__(self, items=()):
+        """Initialize this table with a mapping or (key, value) pairs"""
+        self.root = EMPTY_NODE
+        self.size = 0
+        self.edit = object()
+        if items:
+            self.update(items)
+
+    @classmethod
+    def _make(cls, root, size):
+        """Return a table with the given root node and number of entries"""
+        table = cls()
+        table.root = root
+        table.size = size
+        return table
+
+    def __str__(self):
+        """Return a formatted string representation of this hash table"""
+        items = ('{}: {}'.format(repr(k), repr(v)) for k, v in self.items())
+        return '{' + ', '.join(items) + '}'
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'TransientHashTable({})'.format(repr(list(self.items())))
+
+    def __reduce__(self):
+        return type(self), (list(self.items()),)
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the keys of a snapshot of this hash table, so changes
+        made meanwhile do not affect the iteration"""
+        return iter(self.snapshot())
+
+    def _iter_entries(self):
+        """Iterate over the (key, value) entries of a snapshot of this table"""
+        return self.snapshot()._iter_entries()
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return _find(self.root, _hash(key), key) is not None
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.delete(key)
+
+    def values(self):
+        """Return a view of the values in this hash table"""
+        return HAMTValuesView(self)
+
+    def items(self):
+        """Return a view of the items (key-value pairs) in this hash table"""
+        return HAMTItemsView(self)
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        leaf = _find(self.root, _hash(key), key)
+        if leaf is not None:
+            return leaf[2]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value.
+        Running time: O(log32 n)."""
+        changed = [False]
+        self.root = self.root.assoc(self.edit, 0, _hash(key), key, value,
+                                    changed)
+        self.size += changed[0]
+
+    def pop(self, key, default=_MISSING):
+        """Remove the given key and return its value. If the key is missing,
+        return default if given, or raise KeyError"""
+        key_hash = _hash(key)
+        leaf = _find(self.root, key_hash, key)
+        if leaf is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self.delete(key)
+        return leaf[2]
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError.
+        Running time: O(log32 n)."""
+        changed = [False]
+        root = self.root.without(self.edit, 0, _hash(key), key, changed)
+        if not changed[0]:
+            raise KeyError(key)
+        self.root = root or EMPTY_NODE
+        self.size -= 1
+
+    def update(self, items=(), **extra):
+        """Set every key of the given mapping or (key, value) pairs"""
+        if hasattr(items, 'items'):
+            items = items.items()
+        edit = self.edit
+        root = self.root
+        changed = [False]
+        size = self.size
+        for key, value in items:
+            root = root.assoc(edit, 0, _hash(key), key, value, changed)
+            size += changed[0]
+            changed[0] = False
+        self.root = root
+        self.size = size
+        if extra:
+            self.update(extra)
+
+    def clear(self):
+        """Remove every entry: O(1), leaving snapshots unchanged"""
+        self.root = EMPTY_NODE
+        self.size = 0
+
+    def snapshot(self):
+        """Return the current contents of this table as a PersistentHashTable:
+        O(1). Later changes to this table do not affect it."""
+        # A new token stops this table changing the nodes it owned so far,
+        # which now belong to the snapshot too
+        self.edit = object()
+        return PersistentHashTable._make(self.root, self.size)
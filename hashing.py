@@ -0,0 +1,221 @@
+#!python
+
+import os
+import random
+import struct
+
+# Fibonacci hashing constant: 2**64 divided by the golden ratio
+GOLDEN_RATIO_64 = 0x9E3779B97F4A7C15
+MASK_64 = (1 << 64) - 1
+
+
+def fibonacci_index(hash_value, bits):
+    """Map hash_value to an index in range(2 ** bits) by multiplying with
+    the golden ratio and keeping the top bits of the 64-bit product.
+    Every input bit affects the result, so the index does not correlate with
+    the low bits a modulo-based table uses to pick a bucket."""
+    if not bits:
+        return 0
+    return ((hash_value * GOLDEN_RATIO_64) & MASK_64) >> (64 - bits)
+
+
+# Hash strategies for HashTable. Each one computes the full hash code of a
+# key with hash_code(key), which HashTable stores in the key's entry, and
+# maps a hash code to one of count buckets with slot(hash_code, count), so
+# a resize moves entries without hashing their keys again. index(key,
+# count) does both at once. table_size(count) rounds the bucket counts the
+# table asks for, for strategies that only work with some sizes.
+
+class BuiltinHash(object):
+    """hash(key) modulo the number of buckets, the HashTable default.
+    Fast, but keys whose hashes share low bits or are equal modulo the
+    bucket count, e.g. integers with a power-of-two stride, share buckets."""
+
+    def __repr__(self):
+        return 'BuiltinHash()'
+
+    def table_size(self, count):
+        return count
+
+    def hash_code(self, key):
+        return hash(key)
+
+    def slot(self, hash_code, count):
+        return hash_code % count
+
+    def index(self, key, count):
+        return hash(key) % count
+
+
+class FibonacciHash(object):
+    """Fibonacci hashing: multiply hash(key) by 2**64 / golden ratio and
+    keep the top bits, over power-of-two bucket counts. Every bit of the
+    hash affects the index, so strided keys spread out, at the cost of one
+    multiplication. Keys with equal hash() values still collide."""
+
+    def __repr__(self):
+        return 'FibonacciHash()'
+
+    def table_size(self, count):
+        """Round count up to a power of two"""
+        return 1 << (count - 1).bit_length()
+
+    def hash_code(self, key):
+        return hash(key)
+
+    def slot(self, hash_code, count):
+        return ((hash_code * GOLDEN_RATIO_64) & MASK_64) >> (
+            65 - count.bit_length())
+
+    def index(self, key, count):
+        return ((hash(key) * GOLDEN_RATIO_64) & MASK_64) >> (
+            65 - count.bit_length())
+
+
+class SipHash(object):
+    """Keyed SipHash-2-4 of the key's bytes, modulo the number of buckets.
+    Without the 128-bit seed, nobody can pick keys of the types below that
+    collide, not even keys whose hash() values are equal. Being pure Python
+    it is by far the slowest strategy, at several microseconds per key.
+
+    str, bytes, int, float and None keys are hashed by value, and so are
+    tuples and frozensets of them, item by item (see key_bytes). Other keys,
+    and other items within tuples and frozensets, e.g. user objects, go
+    through hash() first. Those keep any collisions their hash() has, and
+    numbers of other types, e.g. Decimal(1), do not find an equal int or
+    float key."""
+
+    def __init__(self, seed=None):
+        """Initialize this strategy with 16 bytes of seed, a seed for
+        random.Random to derive them from, or None for random ones"""
+        if seed is None:
+            seed = os.urandom(16)
+        elif not isinstance(seed, bytes):
+            seed = random.Random(seed).getrandbits(128).to_bytes(16, 'little')
+        if len(seed) != 16:
+            raise ValueError('SipHash seed must be 16 bytes')
+        self.seed = seed
+        self.k0, self.k1 = struct.unpack('<QQ', seed)
+
+    def __repr__(self):
+        return 'SipHash({!r})'.format(self.seed)
+
+    def table_size(self, count):
+        return count
+
+    def hash_code(self, key):
+        return siphash24(self.k0, self.k1, key_bytes(key))
+
+    def slot(self, hash_code, count):
+        return hash_code % count
+
+    def index(self, key, count):
+        return siphash24(self.k0, self.k1, key_bytes(key)) % count
+
+
+def key_bytes(key):
+    """Return bytes identifying the given key, equal for equal str, bytes,
+    int and float keys, and for equal tuples and frozensets, which are
+    encoded item by item with encode_key. Other keys, and other items of
+    tuples and frozensets, are identified by their hash()."""
+    if isinstance(key, str):
+        return key.encode('utf-8', 'surrogatepass')
+    if isinstance(key, bytes):
+        return key
+    if isinstance(key, float):
+        if not key.is_integer():
+            return struct.pack('<d', key)
+        key = int(key)
+    elif isinstance(key, (tuple, frozenset)):
+        return encode_key(key, _hash_bytes)
+    elif not isinstance(key, int):
+        key = hash(key)
+    return key.to_bytes(key.bit_length() // 8 + 1, 'little', signed=True)
+
+
+def _hash_bytes(key):
+    """Return bytes identifying a key by its hash(), for encode_key"""
+    key_hash = hash(key)
+    return b'h' + key_hash.to_bytes(key_hash.bit_length() // 8 + 1,
+                                    'little', signed=True)
+
+
+def encode_key(key, other=None):
+    """Return bytes encoding the given key by value, the same in every
+    process and equal for equal keys: None, bool, int, float, str and bytes
+    keys by value (so 1, 1.0 and True encode alike), and tuples and
+    frozensets item by item. Keys of other types, and items of other types
+    within tuples and frozensets, are encoded as other(key), or rejected
+    with TypeError if other is None."""
+    if isinstance(key, str):
+        return b's' + key.encode('utf-8', 'surrogatepass')
+    if isinstance(key, bytes):
+        return b'b' + key
+    if isinstance(key, float) and not key.is_integer():
+        return b'f' + struct.pack('<d', key)
+    if isinstance(key, (int, float)):
+        key = int(key)
+        return b'i' + key.to_bytes(key.bit_length() // 8 + 1, 'little',
+                                   signed=True)
+    if key is None:
+        return b'n'
+    if isinstance(key, (tuple, frozenset)):
+        items = [encode_key(item, other) for item in key]
+        if isinstance(key, frozenset):
+            # Sets are unordered, so equal ones may iterate differently
+            items.sort()
+            tag = b'z'
+        else:
+            tag = b't'
+        # Length prefixes keep ('ab', 'c') apart from ('a', 'bc')
+        return tag + b''.join(struct.pack('<I', len(item)) + item
+                              for item in items)
+    if other is None:
+        raise TypeError('Cannot encode a key of type {} by value'.format(
+            type(key).__name__))
+    return other(key)
+
+
+def _rotate(value, bits):
+    return ((value << bits) | (value >> (64 - bits))) & MASK_64
+
+
+def siphash24(k0, k1, data):
+    """Return the SipHash-2-4 of data under the 128-bit key (k0, k1), as a
+    64-bit integer"""
+    v0 = k0 ^ 0x736f6d6570736575
+    v1 = k1 ^ 0x646f72616e646f6d
+    v2 = k0 ^ 0x6c7967656e657261
+    v3 = k1 ^ 0x7465646279746573
+    length = len(data)
+    end = length - length % 8
+    # The last word holds the trailing bytes and the length in its top byte
+    words = struct.unpack_from('<{}Q'.format(end // 8), data) + (
+        int.from_bytes(data[end:], 'little') | ((length & 0xff) << 56),)
+    for word in words:
+        v3 ^= word
+        for i in range(2):
+            v0 = (v0 + v1) & MASK_64
+            v1 = _rotate(v1, 13) ^ v0
+            v0 = _rotate(v0, 32)
+            v2 = (v2 + v3) & MASK_64
+            v3 = _rotate(v3, 16) ^ v2
+            v0 = (v0 + v3) & MASK_64
+            v3 = _rotate(v3, 21) ^ v0
+            v2 = (v2 + v1) & MASK_64
+            v1 = _rotate(v1, 17) ^ v2
+            v2 = _rotate(v2, 32)
+        v0 ^= word
+    v2 ^= 0xff
+    for i in range(4):
+        v0 = (v0 + v1) & MASK_64
+        v1 = _rotate(v1, 13) ^ v0
+        v0 = _rotate(v0, 32)
+        v2 = (v2 + v3) & MASK_64
+        v3 = _rotate(v3, 16) ^ v2
+        v0 = (v0 + v3) & MASK_64
+        v3 = _rotate(v3, 21) ^ v0
+        v2 = (v2 + v1) & MASK_64
+        v1 = _rotate(v1, 17) ^ v2
+        v2 = _rotate(v2, 32)
+    return v0 ^ v1 ^ v2 ^ v3
@@ -0,0 +1,238 @@
+#!python
+
+"""Hash join and group by over record streams too large for memory.
+
+Both operators build a HashTable while its estimated size stays under a
+memory budget. Past the budget they fall back to a Grace hash join: every
+record is written to one of several temporary partition files by the hash
+of its key, so records with equal keys land in the same partition, and the
+partitions are then processed one at a time. A partition that is still too
+large is partitioned again, with a different hash, up to MAX_DEPTH times.
+Results are yielded as they are produced, in no particular order.
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+
+from hashtable import HashTable
+
+# Estimated bytes a build table may hold before spilling to disk
+MEMORY_BUDGET = 256 << 20
+# Partition files each spill splits its input across
+PARTITIONS = 16
+# Times a partition may be split again. Past this it is processed in memory
+# whatever its size, since a single key with many records cannot be split.
+MAX_DEPTH = 3
+# Records buffered per partition before being written out in one pickle
+SPILL_BATCH = 1024
+# Rough bytes a table entry costs on top of its key and value: the entry
+# tuple, its bucket node and its share of the bucket array
+ENTRY_OVERHEAD = 120
+
+
+def estimate_size(key, value):
+    """Return a rough estimate in bytes of the memory a table entry holding
+    key and value uses. Containers are measured shallowly, so records made
+    of many large objects are underestimated."""
+    return sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+
+
+class Partitions(object):
+    """Temporary files splitting (key, value) pairs by the hash of the key.
+
+    Pairs are buffered in memory SPILL_BATCH at a time per partition and
+    written as one pickle. Each file is removed when its partition is
+    discarded, or by close() at the latest."""
+
+    def __init__(self, count=PARTITIONS, depth=0, directory=None):
+        """Create count empty partition files in directory, or in the
+        system temporary directory, hashing keys for the given depth"""
+        self.depth = depth
+        self.files = []
+        self.buffers = []
+        try:
+            for index in range(count):
+                descriptor, path = tempfile.mkstemp(prefix='spill-',
+                                                    dir=directory)
+                self.files.append((os.fdopen(descriptor, 'w+b'), path))
+                self.buffers.append([])
+        except BaseException:
+            self.close()
+            raise
+
+    def index(self, key):
+        """Return the partition the given key belongs in"""
+        # Salting the hash with the depth splits a partition that came from
+        # an earlier level differently from how that level split its input
+        return hash((self.depth, key)) % len(self.files)
+
+    def add(self, key, value):
+        """Append the given pair to the partition of its key"""
+        index = self.index(key)
+        buffer = self.buffers[index]
+        buffer.append((key, value))
+        if len(buffer) >= SPILL_BATCH:
+            self._flush(index)
+
+    def _flush(self, index):
+        """Write out the pairs buffered for the given partition"""
+        buffer = self.buffers[index]
+        if buffer:
+            pickle.dump(buffer, self.files[index][0],
+                        pickle.HIGHEST_PROTOCOL)
+            del buffer[:]
+
+    def read(self, index):
+        """Yield the pairs of the given partition in the order added"""
+        self._flush(index)
+        file = self.files[index][0]
+        file.seek(0)
+        while True:
+            try:
+                batch = pickle.load(file)
+            except EOFError:
+                return
+            yield from batch
+
+    def discard(self, index):
+        """Close and remove the file of the given partition"""
+        file, path = self.files[index]
+        if not file.closed:
+            file.close()
+            os.remove(path)
+        self.buffers[index] = []
+
+    def close(self):
+        """Close and remove every partition file"""
+        for index in range(len(self.files)):
+            self.discard(index)
+
+
+def hash_join(build, probe, key, probe_key=None,
+              memory_budget=MEMORY_BUDGET, partitions=PARTITIONS,
+              directory=None):
+    """Yield a (build record, probe record) pair for each record of build
+    and record of probe whose keys are equal, where key(record) is the key
+    of a build record and probe_key(record), or key(record) if not given,
+    the key of a probe record. The build side is held in a HashTable; once
+    it grows past memory_budget bytes both sides are split across
+    partitions files in directory. Running time: O(n + m + matches), plus
+    writing and reading each record once more per level of spilling."""
+    if probe_key is None:
+        probe_key = key
+    return _join(((key(record), record) for record in build),
+                 ((probe_key(record), record) for record in probe),
+                 memory_budget, partitions, directory, 0)
+
+
+def _join(build, probe, memory_budget, partitions, directory, depth):
+    """Join the (key, record) pairs of build and probe, spilling to disk if
+    the build side does not fit"""
+    table = HashTable()
+    size = 0
+    build = iter(build)
+    for key, record in build:
+        table.setdefault(key, []).append(record)
+        size += estimate_size(key, record)
+        if size > memory_budget and depth < MAX_DEPTH:
+            break
+    else:
+        for key, record in probe:
+            matches = table.get(key, None)
+            if matches is not None:
+                for match in matches:
+                    yield match, record
+        return
+    build_partitions = Partitions(partitions, depth, directory)
+    try:
+        probe_partitions = Partitions(partitions, depth, directory)
+    except BaseException:
+        build_partitions.close()
+        raise
+    try:
+        for key, records in table.items():
+            for record in records:
+                build_partitions.add(key, record)
+        table.clear()
+        for key, record in build:
+            build_partitions.add(key, record)
+        for key, record in probe:
+            probe_partitions.add(key, record)
+        for index in range(partitions):
+            yield from _join(build_partitions.read(index),
+                             probe_partitions.read(index),
+                             memory_budget, partitions, directory, depth + 1)
+            build_partitions.discard(index)
+            probe_partitions.discard(index)
+    finally:
+        build_partitions.close()
+        probe_partitions.close()
+
+
+def _extend(values, more):
+    """Return the list values extended by the list more"""
+    values.extend(more)
+    return values
+
+
+def group_by(records, key, value=None, function=None,
+             memory_budget=MEMORY_BUDGET, partitions=PARTITIONS,
+             directory=None):
+    """Yield a (key, group) pair for each distinct key(record) of records.
+    Without function the group is the list of value(record), or of the
+    records themselves, with that key. With function the values are reduced
+    with it instead, e.g. operator.add to sum them; it must be associative,
+    since partial results are combined after spilling. Once the groups grow
+    past memory_budget bytes they are split across partitions files in
+    directory. Running time: O(n), plus writing and reading each record
+    once more per level of spilling."""
+    if value is None:
+        def value(record):
+            return record
+    if function is None:
+        pairs = ((key(record), [value(record)]) for record in records)
+        function = _extend
+        grouped = True
+    else:
+        pairs = ((key(record), value(record)) for record in records)
+        grouped = False
+    return _group(pairs, function, grouped, memory_budget, partitions,
+                  directory, 0)
+
+
+def _group(pairs, function, grouped, memory_budget, partitions, directory,
+           depth):
+    """Group the (key, partial group) pairs by key, spilling to disk if the
+    groups do not fit"""
+    table = HashTable()
+    size = 0
+    pairs = iter(pairs)
+    for key, partial in pairs:
+        length = table.size
+        table.merge(key, partial, function)
+        # Reductions only grow with new keys, lists with every record
+        if grouped:
+            size += estimate_size(key, partial[0]) * len(partial)
+        elif table.size != length:
+            size += estimate_size(key, partial)
+        if size > memory_budget and depth < MAX_DEPTH:
+            break
+    else:
+        yield from table.items()
+        return
+    spilled = Partitions(partitions, depth, directory)
+    try:
+        for key, partial in table.items():
+            spilled.add(key, partial)
+        table.clear()
+        for key, partial in pairs:
+            spilled.add(key, partial)
+        for index in range(partitions):
+            yield from _group(spilled.read(index), function, grouped,
+                              memory_budget, partitions, directory,
+                              depth + 1)
+            spilled.discard(index)
+    finally:
+        spilled.close()
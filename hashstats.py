@@ -0,0 +1,312 @@
+#!python
+
+import time
+
+from linkedlist import LinkedList
+from sortedbucket import SortedBucket, orderable
+from unrolledlist import UnrolledLinkedList
+
+# HashTable methods counted while stats are enabled. The buckets also record
+# how many entries each lookup compared to find (or miss) its key.
+LOOKUP_OPERATIONS = ('get', 'contains', 'set', 'setdefault', 'merge',
+                     'compare_and_set', 'pop')
+BATCH_OPERATIONS = ('set_many', 'merge_many', 'get_many', 'contains_many',
+                    'delete_many')
+INSTRUMENTED_OPERATIONS = LOOKUP_OPERATIONS + BATCH_OPERATIONS
+
+
+class HashTableStats(object):
+    """Operation counters collected while a HashTable is instrumented"""
+
+    def __init__(self, callback=None):
+        """Initialize empty counters. If given, callback is called as
+        callback(operation, key, seconds) after every counted operation."""
+        self.callback = callback
+        self.operations = dict.fromkeys(INSTRUMENTED_OPERATIONS, 0)
+        self.hits = 0
+        self.misses = 0
+        self.successful_probes = 0
+        self.failed_probes = 0
+        # The table's own bucket types, and the counting subclass of each,
+        # while it is instrumented
+        self.bucket_type = None
+        self.counting_types = {}
+
+    def __repr__(self):
+        """Return a string representation of these stats"""
+        return 'HashTableStats({})'.format(repr(self.as_dict()))
+
+    def record_probes(self, probes, found):
+        """Count one lookup that compared probes entries and found its key,
+        or missed it if found is False"""
+        if found:
+            self.hits += 1
+            self.successful_probes += probes
+        else:
+            self.misses += 1
+            self.failed_probes += probes
+
+    def as_dict(self):
+        """Return the counters and average probe lengths as a dict"""
+        return {
+            'operations': dict(self.operations),
+            'hits': self.hits,
+            'misses': self.misses,
+            'mean_successful_probes':
+                self.successful_probes / self.hits if self.hits else 0.0,
+            'mean_failed_probes':
+                self.failed_probes / self.misses if self.misses else 0.0,
+        }
+
+
+# Subclasses of the bucket types that count the entries each search
+# compares, during the search itself. While stats are enabled a table's
+# buckets are switched to these (the layouts match, so only __class__
+# changes), which leaves the plain bucket methods free of any counting.
+
+class CountingLinkedList(LinkedList):
+    """LinkedList bucket reporting the probes of every search to stats"""
+
+    __slots__ = ()
+    # Set on the subclass made for each instrumented table
+    stats = None
+
+    def _locate(self, key, key_hash):
+        """Return the node holding the entry with the given key, or None"""
+        probes = 0
+        current = self.head
+        while current is not None:
+            probes += 1
+            data = current.data
+            if data[2] == key_hash and data[0] == key:
+                break
+            current = current.next
+        self.stats.record_probes(probes, current is not None)
+        return current
+
+    def find_entry(self, key, key_hash):
+        node = self._locate(key, key_hash)
+        return None if node is None else node.data
+
+    def set_entry(self, key, key_hash, value):
+        node = self._locate(key, key_hash)
+        if node is None:
+            self.append((key, value, key_hash))
+            return None
+        data = node.data
+        node.data = (key, value, key_hash)
+        return data
+
+    def merge_entry(self, key, key_hash, value, function):
+        node = self._locate(key, key_hash)
+        if node is None:
+            self.append((key, value, key_hash))
+            return None
+        node.data = entry = (key, function(node.data[1], value), key_hash)
+        return entry
+
+    def replace_entry(self, key, key_hash, expected, value):
+        node = self._locate(key, key_hash)
+        if node is None or node.data[1] != expected:
+            return False
+        node.data = (key, value, key_hash)
+        return True
+
+    def pop_entry(self, key, key_hash):
+        node = self._locate(key, key_hash)
+        if node is None:
+            return None
+        self.remove_node(node)
+        return node.data
+
+
+class CountingUnrolledLinkedList(UnrolledLinkedList):
+    """UnrolledLinkedList bucket reporting the probes of every search to
+    stats"""
+
+    __slots__ = ()
+    stats = None
+
+    def _locate(self, key, key_hash):
+        """Return (previous node, node, index) of the entry with the given
+        key, or None"""
+        probes = 0
+        previous = None
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                entry = items[index]
+                if entry[2] == key_hash and entry[0] == key:
+                    self.stats.record_probes(probes + index + 1, True)
+                    return previous, current, index
+            probes += len(items)
+            previous = current
+            current = current.next
+        self.stats.record_probes(probes, False)
+        return None
+
+    def find_entry(self, key, key_hash):
+        found = self._locate(key, key_hash)
+        return None if found is None else found[1].items[found[2]]
+
+    def set_entry(self, key, key_hash, value):
+        found = self._locate(key, key_hash)
+        if found is None:
+            self.append((key, value, key_hash))
+            return None
+        previous, node, index = found
+        entry = node.items[index]
+        node.items[index] = (key, value, key_hash)
+        return entry
+
+    def merge_entry(self, key, key_hash, value, function):
+        found = self._locate(key, key_hash)
+        if found is None:
+            self.append((key, value, key_hash))
+            return None
+        previous, node, index = found
+        node.items[index] = entry = (
+            key, function(node.items[index][1], value), key_hash)
+        return entry
+
+    def replace_entry(self, key, key_hash, expected, value):
+        found = self._locate(key, key_hash)
+        if found is None:
+            return False
+        previous, node, index = found
+        if node.items[index][1] != expected:
+            return False
+        node.items[index] = (key, value, key_hash)
+        return True
+
+    def pop_entry(self, key, key_hash):
+        found = self._locate(key, key_hash)
+        if found is None:
+            return None
+        previous, node, index = found
+        return self._remove_at(node, previous, index)
+
+
+class CountingSortedBucket(SortedBucket):
+    """SortedBucket reporting the probes of every search to stats"""
+
+    __slots__ = ()
+    stats = None
+
+    def _find(self, key, key_hash):
+        index = SortedBucket._find(self, key, key_hash)
+        if self.ordered and orderable(key):
+            # The keys a binary search compares
+            probes = len(self.keys).bit_length()
+        elif index < 0:
+            probes = len(self.keys)
+        else:
+            probes = index + 1
+        self.stats.record_probes(probes, index >= 0)
+        return index
+
+
+COUNTING_BUCKETS = {
+    LinkedList: CountingLinkedList,
+    UnrolledLinkedList: CountingUnrolledLinkedList,
+    SortedBucket: CountingSortedBucket,
+}
+
+
+def instrument(table, stats):
+    """Shadow the counted methods of table with wrappers that update stats,
+    and switch its buckets to the counting bucket types. The wrappers are
+    instance attributes, so uninstrumented tables keep calling the plain
+    class methods and pay nothing for instrumentation. Probes are only
+    counted for the bucket types in COUNTING_BUCKETS."""
+    stats.bucket_type = table.bucket_type
+    for plain in (table.bucket_type, table.sorted_bucket_type):
+        counting = COUNTING_BUCKETS.get(plain)
+        if counting is not None:
+            stats.counting_types[plain] = type(
+                counting.__name__, (counting,),
+                {'__slots__': (), 'stats': stats})
+    table.bucket_type = stats.counting_types.get(table.bucket_type,
+                                                 table.bucket_type)
+    table.sorted_bucket_type = stats.counting_types[SortedBucket]
+    _switch_buckets(table, stats.counting_types)
+    for name in LOOKUP_OPERATIONS:
+        setattr(table, name, _lookup_wrapper(table, stats, name))
+    for name in BATCH_OPERATIONS:
+        setattr(table, name, _batch_wrapper(table, stats, name))
+
+
+def uninstrument(table, stats):
+    """Remove the wrappers and counting buckets installed by instrument"""
+    for name in INSTRUMENTED_OPERATIONS:
+        table.__dict__.pop(name, None)
+    table.bucket_type = stats.bucket_type
+    table.__dict__.pop('sorted_bucket_type', None)
+    _switch_buckets(table, {counting: plain for plain, counting
+                            in stats.counting_types.items()})
+
+
+def _switch_buckets(table, types):
+    """Change the class of every bucket of table whose type is a key of
+    types to the matching value"""
+    for buckets in (table.buckets, table.old_buckets or ()):
+        for bucket in buckets:
+            if bucket is not None and type(bucket) in types:
+                bucket.__class__ = types[type(bucket)]
+
+
+def _lookup_wrapper(table, stats, name):
+    method = getattr(type(table), name)
+    operations = stats.operations
+    # Whether every bucket of table records its probes
+    counting = stats.bucket_type in stats.counting_types
+
+    def wrapper(key, *args, **kwargs):
+        operations[name] += 1
+        lookups = stats.hits + stats.misses
+        start = time.perf_counter()
+        try:
+            return method(table, key, *args, **kwargs)
+        finally:
+            if counting and stats.hits + stats.misses == lookups:
+                # The key's bucket was empty, or the Bloom filter ruled the
+                # key out, so no entry was compared
+                stats.misses += 1
+            if stats.callback is not None:
+                stats.callback(name, key, time.perf_counter() - start)
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+def _batch_wrapper(table, stats, name):
+    method = getattr(type(table), name)
+    operations = stats.operations
+    # Whether every bucket of table records its probes
+    counting = stats.bucket_type in stats.counting_types
+
+    def wrapper(*args, **kwargs):
+        operations[name] += 1
+        hits, misses, size = stats.hits, stats.misses, table.size
+        start = time.perf_counter()
+        try:
+            result = method(table, *args, **kwargs)
+        finally:
+            if stats.callback is not None:
+                stats.callback(name, None, time.perf_counter() - start)
+        if counting:
+            # Keys whose bucket was empty compared no entry, so no bucket
+            # recorded them: count them as misses from what the batch did
+            searched = stats.hits - hits + stats.misses - misses
+            if name in ('get_many', 'contains_many'):
+                stats.misses += len(result) - searched
+            elif name in ('set_many', 'merge_many'):
+                # Every new key was a miss
+                stats.misses += table.size - size - (stats.misses - misses)
+            elif args and hasattr(args[0], '__len__'):
+                stats.misses += len(args[0]) - searched
+        return result
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
@@ -1,134 +1,914 @@
 #!python
 
+import gc
+import math
+import operator
+import random
+from collections.abc import ItemsView, KeysView, MutableMapping, ValuesView
+from contextlib import contextmanager
+from itertools import islice, repeat
+
+from bloomfilter import CountingBloomFilter
+from hashstats import (INSTRUMENTED_OPERATIONS, HashTableStats, instrument,
+                       uninstrument)
 from linkedlist import LinkedList
+from mmaptable import MmapHashTable, save_table
+from sampling import KeySampler
+from sortedbucket import SortedBucket
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+# Hashed when a table is pickled and again when it is loaded: if the results
+# differ, the loading process has another str hash seed (PYTHONHASHSEED), so
+# the stored hash codes and bucket positions have to be computed again
+_SEED_PROBE = 'hashtable seed probe'
+
+
+@contextmanager
+def gc_paused():
+    """Pause the cyclic garbage collector while building many bucket nodes.
+    The nodes never form reference cycles, but allocating them in bulk would
+    otherwise trigger collections that rescan the whole heap again and
+    again, which costs more than the build itself on large tables."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class HashTableValuesView(ValuesView):
+    """Live view of the values of a HashTable"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the values without looking each key up again"""
+        for entry in self._mapping._iter_entries():
+            yield entry[1]
+
+
+class HashTableItemsView(ItemsView):
+    """Live view of the (key, value) items of a HashTable"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the items without looking each key up again"""
+        for key, value, key_hash in self._mapping._iter_entries():
+            yield key, value
 
 
-class HashTable(object):
+class HashTable(MutableMapping):
 
-    def __init__(self, init_size=8):
-        """Initialize this hash table with the given initial size"""
-        self.buckets = [LinkedList() for i in range(init_size)]
+    # Number of old buckets moved across on each operation while a resize
+    # is in progress, and how many empty old buckets one step may skip over.
+    # Two buckets per step finish a doubling before the new table fills up.
+    REHASH_STEP = 2
+    REHASH_EMPTY_VISITS = 10
+    # A bucket holding more entries than TREEIFY_THRESHOLD is turned into a
+    # SortedBucket, searched in O(log l) instead of O(l), and turned back
+    # into a bucket_type once it drops below UNTREEIFY_THRESHOLD entries.
+    # The gap keeps a bucket from converting back and forth on every write.
+    TREEIFY_THRESHOLD = 8
+    UNTREEIFY_THRESHOLD = 6
+    # Type of the treeified buckets, replaced by a counting subclass on
+    # tables with stats enabled
+    sorted_bucket_type = SortedBucket
+
+    def __init__(self, init_size=8, max_load_factor=0.75, min_load_factor=0.1,
+                 bucket_type=LinkedList, hash_strategy=None):
+        """Initialize this hash table with the given initial size.
+        The table doubles once it holds more than max_load_factor entries per
+        bucket and halves (never below init_size) once it drops under
+        min_load_factor; pass min_load_factor=0 to never shrink.
+        Buckets are instances of bucket_type, e.g. LinkedList or
+        UnrolledLinkedList, which must provide the *_entry methods.
+        hash_strategy picks the bucket of each key, e.g. FibonacciHash() or
+        a seeded SipHash() from the hashing module to resist keys chosen to
+        collide; by default it is hash(key) modulo the number of buckets."""
+        if init_size < 1:
+            raise ValueError('init_size must be at least 1')
+        if max_load_factor <= 0:
+            raise ValueError('max_load_factor must be positive')
+        if not 0 <= min_load_factor < max_load_factor / 2:
+            raise ValueError('min_load_factor must be below max_load_factor / 2')
+        # Buckets are created lazily on first insert, so allocating a bigger
+        # table is a single C-level list allocation rather than n LinkedLists
+        self.bucket_type = bucket_type
+        self.hash_strategy = hash_strategy
+        init_size = self._table_size(init_size)
+        self.buckets = [None] * init_size
+        self.size = 0
+        self.min_size = init_size
+        self.max_load_factor = max_load_factor
+        self.min_load_factor = min_load_factor
+        # While a resize is in progress, the previous bucket array is kept in
+        # old_buckets and moved across a few buckets at a time (Redis-style).
+        # Already migrated slots are set to None, and rehash_index is the
+        # first slot that may still hold entries.
+        self.old_buckets = None
+        self.rehash_index = 0
+        self.resize_count = 0
+        # Operation counters, only collected after enable_stats()
+        self._stats = None
+        # Dense key index for O(1) random sampling, only kept up to date
+        # after enable_sampling()
+        self._sampler = None
+        # Counting Bloom filter of the stored hash codes, rejecting lookups
+        # for most missing keys before any bucket is searched, only kept up
+        # to date after enable_bloom_filter()
+        self._filter = None
 
     def __str__(self):
         """Return a formatted string representation of this hash table"""
-        items = ['{}: {}'.format(repr(k), repr(v)) for k, v in self.items()]
+        items = ('{}: {}'.format(repr(k), repr(v)) for k, v in self.items())
         return '{' + ', '.join(items) + '}'
 
     def __repr__(self):
         """Return a string representation of this hash table"""
-        return 'HashTable({})'.format(repr(self.items()))
+        return 'HashTable({})'.format(repr(list(self.items())))
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the keys of this hash table"""
+        for entry in self._iter_entries():
+            yield entry[0]
+
+    def _iter_entries(self):
+        """Iterate over the (key, value, hash) entries of this hash table
+        without copying them. Raise RuntimeError if the table gains or loses
+        entries or is resized while the iteration is suspended."""
+        # Any resize in progress is finished first, O(b) like the walk itself,
+        # so lookups made while iterating do not move entries around
+        self._finish_rehash()
+        buckets = self.buckets
+        size = self.size
+        for bucket in buckets:
+            if bucket is None:
+                continue
+            for entry in bucket:
+                yield entry
+                if self.size != size or self.buckets is not buckets:
+                    raise RuntimeError('HashTable changed size during iteration')
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self.contains(key)
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    def __getstate__(self):
+        """Return the state to pickle, with each bucket as a plain list of
+        entries rather than a chain of nodes, and without stats wrappers"""
+        self._finish_rehash()
+        state = dict(self.__dict__)
+        for name in INSTRUMENTED_OPERATIONS:
+            state.pop(name, None)
+        if self._stats is not None:
+            state['bucket_type'] = self._stats.bucket_type
+            state.pop('sorted_bucket_type', None)
+        state['_stats'] = None
+        state['buckets'] = [None if bucket is None else bucket.items()
+                            for bucket in self.buckets]
+        state['_seed_probe'] = hash(_SEED_PROBE)
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled hash table, rebuilding its buckets in place
+        without hashing any key again, unless it was pickled by a process
+        with another hash seed"""
+        probe = state.pop('_seed_probe', None)
+        self.__dict__.update(state)
+        buckets = state['buckets']
+        reseeded = probe != hash(_SEED_PROBE)
+        if reseeded:
+            buckets = self._reslot(buckets)
+        threshold = self.TREEIFY_THRESHOLD
+        with gc_paused():
+            self.buckets = [
+                None if entries is None
+                else self.sorted_bucket_type(entries)
+                if len(entries) > threshold
+                else self.bucket_type(entries)
+                for entries in buckets]
+        if reseeded and self._filter is not None:
+            # The filter was built from the hash codes of the old seed
+            self._rebuild_filter(self._filter.capacity)
+
+    def _reslot(self, buckets):
+        """Return the entries of the given lists of entries hashed again and
+        split into lists by their new bucket index: O(n)"""
+        count = len(buckets)
+        slots = [None] * count
+        for entries in buckets:
+            for key, value, old_hash in entries or ():
+                key_hash = self._hash(key)
+                index = self._slot(key_hash, count)
+                if slots[index] is None:
+                    slots[index] = []
+                slots[index].append((key, value, key_hash))
+        return slots
 
     def _bucket_index(self, key):
         """Return the bucket index where the given key would be stored"""
         # use the modular of hash with the size of the bucket 
-        return hash(key) % len(self.buckets)
+        if self.hash_strategy is None:
+            return hash(key) % len(self.buckets)
+        return self.hash_strategy.index(key, len(self.buckets))
 
-    def keys(self):
-        """Return a list of all keys in this hash table"""
-        # Collect all keys in each of the buckets
-        all_keys = [] # O(1)
-        for bucket in self.buckets: #O(b) for b number of iterations
-            for key, value in bucket.items(): #O(l), l iterations == n/b
-                all_keys.append(key) #O(1)
-        return all_keys # n keys
+    def _hash(self, key):
+        """Return the full hash code of the given key, which its entry
+        stores so probes and resizes need not compute it again"""
+        if self.hash_strategy is None:
+            return hash(key)
+        return self.hash_strategy.hash_code(key)
+
+    def _slot(self, key_hash, count):
+        """Return the index of the given hash code among count buckets"""
+        if self.hash_strategy is None:
+            return key_hash % count
+        return self.hash_strategy.slot(key_hash, count)
+
+    def _index(self, key, count):
+        """Return the index of the given key among count buckets"""
+        if self.hash_strategy is None:
+            return hash(key) % count
+        return self.hash_strategy.index(key, count)
+
+    def _table_size(self, count):
+        """Return the bucket count to use for at least count buckets"""
+        if self.hash_strategy is None:
+            return count
+        return self.hash_strategy.table_size(count)
+
+    def _find_bucket(self, key_hash):
+        """Return the bucket the key with the given hash code lives in, or
+        None if it is empty. While a resize is in progress this performs one
+        rehash step and makes sure the key's old bucket has been moved across
+        first, so only the new buckets ever need to be searched."""
+        if self.old_buckets is not None:
+            self._rehash_step()
+            if self.old_buckets is not None:
+                old_index = self._slot(key_hash, len(self.old_buckets))
+                if self.old_buckets[old_index] is not None:
+                    self._migrate(old_index)
+        if self.hash_strategy is None:
+            return self.buckets[key_hash % len(self.buckets)]
+        return self.buckets[self.hash_strategy.slot(key_hash,
+                                                    len(self.buckets))]
+
+    def _bucket_for_insert(self, key_hash):
+        """Return the bucket the key with the given hash code belongs in,
+        creating it if needed"""
+        bucket = self._find_bucket(key_hash)
+        if bucket is None:
+            bucket = self.bucket_type()
+            self.buckets[self._slot(key_hash, len(self.buckets))] = bucket
+        return bucket
+
+    def _migrate(self, old_index):
+        """Move every entry of the given old bucket into the new buckets"""
+        # O(l) for l entries in the old bucket, using the stored hash codes
+        # instead of hashing the keys again
+        buckets = self.buckets
+        count = len(buckets)
+        strategy = self.hash_strategy
+        for entry in self.old_buckets[old_index].items():
+            if strategy is None:
+                index = entry[2] % count
+            else:
+                index = strategy.slot(entry[2], count)
+            bucket = buckets[index]
+            if bucket is None:
+                bucket = buckets[index] = self.bucket_type()
+            bucket.append(entry)
+            if bucket.length() > self.TREEIFY_THRESHOLD:
+                self._treeify(index)
+        self.old_buckets[old_index] = None
+
+    def _treeify(self, index):
+        """Turn the bucket at the given index into a SortedBucket, unless it
+        already is one: O(l log l) for l entries"""
+        bucket = self.buckets[index]
+        if type(bucket) is not self.sorted_bucket_type:
+            self.buckets[index] = self.sorted_bucket_type(bucket)
+
+    def _untreeify(self, index):
+        """Turn the SortedBucket at the given index back into a bucket_type
+        if it holds fewer than UNTREEIFY_THRESHOLD entries"""
+        bucket = self.buckets[index]
+        if (type(bucket) is self.sorted_bucket_type and
+                bucket.length() < self.UNTREEIFY_THRESHOLD):
+            self.buckets[index] = self.bucket_type(bucket.entries)
+
+    def _rehash_step(self):
+        """Move up to REHASH_STEP non-empty old buckets into the new buckets,
+        visiting at most REHASH_EMPTY_VISITS empty ones along the way.
+        Finishes the resize once every old bucket has been moved."""
+        old_buckets = self.old_buckets
+        moved = 0
+        empty_visits = 0
+        index = self.rehash_index
+        while index < len(old_buckets) and moved < self.REHASH_STEP:
+            if old_buckets[index] is None:
+                empty_visits += 1
+                if empty_visits > self.REHASH_EMPTY_VISITS:
+                    break
+            else:
+                self._migrate(index)
+                moved += 1
+            index += 1
+        self.rehash_index = index
+        if index == len(old_buckets):
+            self.old_buckets = None
+            self.rehash_index = 0
+
+    def _finish_rehash(self):
+        """Complete any resize that is still in progress"""
+        while self.old_buckets is not None:
+            self._rehash_step()
+
+    def _start_rehash(self, new_size):
+        """Swap in new_size empty buckets and start moving entries across"""
+        self._finish_rehash()
+        self.resize_count += 1
+        self.old_buckets = self.buckets
+        self.rehash_index = 0
+        self.buckets = [None] * new_size
+        # Nothing to move, e.g. when resizing an empty table
+        if self.size == 0:
+            self.old_buckets = None
+
+    def _check_load(self):
+        """Start growing or shrinking the table if its load factor crossed
+        max_load_factor or min_load_factor. Waits for any resize in progress."""
+        if self.old_buckets is not None:
+            return
+        bucket_count = len(self.buckets)
+        if self.size > self.max_load_factor * bucket_count:
+            self._start_rehash(bucket_count * 2)
+        elif (bucket_count > self.min_size and
+                self.size < self.min_load_factor * bucket_count):
+            self._start_rehash(max(bucket_count // 2, self.min_size))
+
+    def load_factor(self):
+        """Return the average number of entries per bucket"""
+        return self.size / len(self.buckets)
+
+    def resize(self, new_size):
+        """Rebuild this hash table with new_size buckets right away.
+        Running time: O(n + b) for n entries and b new buckets."""
+        if new_size < 1:
+            raise ValueError('new_size must be at least 1')
+        new_size = self._table_size(new_size)
+        # Rebuild in one tight loop instead of stepping through a rehash
+        self.resize_count += 1
+        entries = self._iter_entries()
+        bucket_type = self.bucket_type
+        strategy = self.hash_strategy
+        buckets = [None] * new_size
+        with gc_paused():
+            for entry in entries:
+                if strategy is None:
+                    index = entry[2] % new_size
+                else:
+                    index = strategy.slot(entry[2], new_size)
+                bucket = buckets[index]
+                if bucket is None:
+                    bucket = buckets[index] = bucket_type()
+                bucket.append(entry)
+            self.buckets = buckets
+            # Keys that still collide after the resize get their buckets
+            # treeified again
+            threshold = self.TREEIFY_THRESHOLD
+            for index, bucket in enumerate(buckets):
+                if bucket is not None and bucket.length() > threshold:
+                    self._treeify(index)
 
+    def reserve(self, count):
+        """Grow this hash table so it can hold count entries without resizing,
+        e.g. before a known bulk load. The table will not shrink below this."""
+        needed = self._grow_for(count)
+        self.min_size = max(self.min_size, needed)
+
+    def _grow_for(self, count):
+        """Resize right away if count entries would not fit under the maximum
+        load factor, and return the number of buckets they need"""
+        needed = self._table_size(
+            max(int(math.ceil(count / self.max_load_factor)), 1))
+        if needed > len(self.buckets):
+            self.resize(needed)
+        return needed
+
+    def enable_stats(self, callback=None):
+        """Start counting operations and lookup probe lengths, replacing any
+        counters collected so far. If given, callback is called as
+        callback(operation, key, seconds) after every counted operation.
+        Probe lengths are counted by the buckets during their own search,
+        for LinkedList, UnrolledLinkedList and SortedBucket buckets.
+        Tables without stats enabled run the plain methods at no extra cost."""
+        self.disable_stats()
+        self._stats = HashTableStats(callback)
+        instrument(self, self._stats)
+
+    def disable_stats(self):
+        """Stop counting operations and drop the collected counters"""
+        if self._stats is not None:
+            uninstrument(self, self._stats)
+            self._stats = None
+
+    def stats(self):
+        """Return a dict describing the shape of this hash table: bucket
+        occupancy histogram, chain lengths, load factor and resize count,
+        plus the operation counters if enable_stats() was called.
+        Running time: O(b) for b buckets."""
+        self._finish_rehash()
+        histogram = {}
+        for bucket in self.buckets:
+            length = 0 if bucket is None else bucket.length()
+            histogram[length] = histogram.get(length, 0) + 1
+        used = len(self.buckets) - histogram.get(0, 0)
+        result = {
+            'size': self.size,
+            'buckets': len(self.buckets),
+            'load_factor': self.load_factor(),
+            'resize_count': self.resize_count,
+            'chain_length_histogram': histogram,
+            'max_chain_length': max(histogram),
+            'mean_chain_length': self.size / used if used else 0.0,
+        }
+        if self._stats is not None:
+            result.update(self._stats.as_dict())
+        if self._filter is not None:
+            result['bloom_filter'] = self._filter.stats()
+        return result
+
+    def save(self, path):
+        """Write this hash table to a compact binary snapshot file at path,
+        which open_mmap can serve without loading it. Keys and values are
+        stored pickled, so they must be picklable."""
+        save_table(self.items(), path)
+
+    @staticmethod
+    def open_mmap(path):
+        """Return a read-only MmapHashTable serving get, contains and
+        iteration straight from the snapshot file at path"""
+        return MmapHashTable(path)
+
+    def keys(self):
+        """Return a live view of the keys in this hash table.
+        Creating the view is O(1); iterating it walks the buckets in O(b + n)
+        without building a list."""
+        return KeysView(self)
 
     def values(self):
-        """Return a list of all values in this hash table"""
-        # Collect all values in each of the buckets
-        # O(n). See above.
-        all_values = [] # O(1)
-        for bucket in self.buckets: #O(b) for b number of iterations
-            for key, value in bucket.items(): #O(l), l iterations == n/b
-                all_values.append(value) #O(1)
-        return all_values # n values
+        """Return a live view of the values in this hash table"""
+        return HashTableValuesView(self)
 
     def items(self):
-        """Return a list of all items (key-value pairs) in this hash table"""
-        # Collect all pairs of key-value entries in each of the buckets
-        # O(n). See above again. it's about the same really.
-        all_items = []
-        for bucket in self.buckets:
-            all_items.extend(bucket.items())
-        return all_items
+        """Return a live view of the items (key-value pairs) in this hash table"""
+        return HashTableItemsView(self)
 
     def length(self):
-        """Return the length of this hash table by traversing its buckets"""
-        # Count number of key-value entries in each of the buckets
-        # Worst case: O(n^2) as we have 2 loop
-        # Length is O(n), and we're looping through.
-
-        count = 0
-        for bucket in self.buckets:
-            for key, value in bucket.items():
-                count += 1
-        return count
+        """Return the length of this hash table"""
+        # The entry count is kept up to date by every write: O(1)
+        return self.size
 
     def contains(self, key):
         """Return True if this hash table contains the given key, or False"""
-        # Check if the given key exists in a bucket
-        # Check bucket O(1), then do a find O(n). 
+        # Check bucket O(1), then walk it once comparing keys O(l).
         # Worst case scenario is O(n) if it's at the end of a bucket.
-        index = self._bucket_index(key)
-        bucket = self.buckets[index]
-        found = bucket.find(lambda item: item[0] == key)
+        key_hash = self._hash(key)
+        bloom = self._filter
+        if bloom is not None and not bloom.might_contain(key_hash):
+            return False
+        bucket = self._find_bucket(key_hash)
+        if bucket is not None and bucket.find_entry(key, key_hash) is not None:
+            return True
+        if bloom is not None:
+            bloom.false_positives += 1
+        return False
 
-        # return found is not None
-        return bool(found)
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        # average case running time == n/b (average size of linked list).
+        # Passing a default is the cheap way to look up keys that are often
+        # missing, since it builds no KeyError.
+        key_hash = self._hash(key)
+        bloom = self._filter
+        if bloom is None or bloom.might_contain(key_hash):
+            bucket = self._find_bucket(key_hash)
+            if bucket is not None:
+                entry = bucket.find_entry(key, key_hash)
+                if entry is not None:
+                    return entry[1]
+            if bloom is not None:
+                bloom.false_positives += 1
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
 
+    def set(self, key, value):
+        """Insert or update the given key with its associated value"""
+        # One walk of the bucket: the entry is replaced in place if the key is
+        # found, otherwise appended at the tail in O(1)
+        key_hash = self._hash(key)
+        bucket = self._bucket_for_insert(key_hash)
+        if bucket.set_entry(key, key_hash, value) is None:
+            self._entry_added(key, key_hash, bucket)
 
-    def get(self, key):
-        """Return the value associated with the given key, or raise KeyError"""
-        # TODO: Check if the given key exists and return its associated value
-        #  same as above. O(n) again.
-        # # average case running time == n/b (average size of linked list)
-        index = self._bucket_index(key)
-        bucket = self.buckets[index]
-        found = bucket.find(lambda item: item[0] == key)
+    def _entry_added(self, key, key_hash, bucket):
+        """Account for a new entry with the given key in the given bucket"""
+        self.size += 1
+        if bucket.length() > self.TREEIFY_THRESHOLD:
+            self._treeify(self._slot(key_hash, len(self.buckets)))
+        if self._sampler is not None:
+            self._sampler.add(key)
+        if self._filter is not None:
+            self._filter_added(key_hash)
+        self._check_load()
 
-        if found is not None:
-            return found[1]
-        raise KeyError("Key not longer exists in this hash table")
+    def _filter_added(self, key_hash):
+        """Add the hash code of a new entry to the Bloom filter, rebuilding
+        it twice as large once it holds more than it was sized for"""
+        bloom = self._filter
+        if bloom.count >= bloom.capacity:
+            self._rebuild_filter(2 * bloom.capacity)
+        else:
+            bloom.add(key_hash)
 
-    def set(self, key, value):
-        """Insert or update the given key with its associated value"""
-        # TODO: Insert or update the given key-value entry into a bucket
-        # 1. find if the given key is found inside the entry
-        # 2. bucket has access to the index of the _bucket_index 
-        # worst case is Constant. + append which is constant.
+    def _rebuild_filter(self, capacity):
+        """Replace the Bloom filter with one sized for capacity hash codes,
+        filled from the hash codes stored in the entries: O(n)"""
+        bloom = self._filter
+        self._filter = CountingBloomFilter(
+            max(capacity, self.size), bloom.error_rate,
+            (entry[2] for entry in self._iter_entries()))
+        # Keep counting checks across the rebuild
+        self._filter.checks = bloom.checks
+        self._filter.rejections = bloom.rejections
+        self._filter.false_positives = bloom.false_positives
 
-        index = self._bucket_index(key)
-        bucket = self.buckets[index]
+    def setdefault(self, key, default=None):
+        """Return the value of the given key, inserting it with default first
+        if it is missing"""
+        key_hash = self._hash(key)
+        bucket = self._bucket_for_insert(key_hash)
+        entry = bucket.setdefault_entry(key, key_hash, default)
+        if entry is not None:
+            return entry[1]
+        self._entry_added(key, key_hash, bucket)
+        return default
+
+    def merge(self, key, value, function):
+        """Set the given key to function(current value, value) if it is
+        present, or to value if it is missing, and return the new value.
+        Like set, this walks the bucket only once, where a get followed by a
+        set walks it twice."""
+        key_hash = self._hash(key)
+        bucket = self._bucket_for_insert(key_hash)
+        entry = bucket.merge_entry(key, key_hash, value, function)
+        if entry is not None:
+            return entry[1]
+        self._entry_added(key, key_hash, bucket)
+        return value
 
-        if self.contains(key):
-            self.delete(key)
-        self.buckets[index].append((key, value))
-     
+    def increment(self, key, delta=1):
+        """Add delta to the value of the given key, starting from delta if
+        it is missing, and return the new value"""
+        return self.merge(key, delta, operator.add)
+
+    def compare_and_set(self, key, expected, value):
+        """Set the given key to value only if it currently maps to a value
+        equal to expected. Return True if the value was replaced, or False."""
+        key_hash = self._hash(key)
+        bucket = self._find_bucket(key_hash)
+        return (bucket is not None and
+                bucket.replace_entry(key, key_hash, expected, value))
+
+    def pop(self, key, default=_MISSING):
+        """Remove the given key and return its value. If the key is missing,
+        return default if given, or raise KeyError"""
+        key_hash = self._hash(key)
+        entry = None
+        bloom = self._filter
+        if bloom is None or bloom.might_contain(key_hash):
+            bucket = self._find_bucket(key_hash)
+            if bucket is not None:
+                entry = bucket.pop_entry(key, key_hash)
+            if entry is None and bloom is not None:
+                bloom.false_positives += 1
+        if entry is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self.size -= 1
+        if type(bucket) is self.sorted_bucket_type:
+            self._untreeify(self._slot(key_hash, len(self.buckets)))
+        if self._sampler is not None:
+            self._sampler.remove(key)
+        if self._filter is not None:
+            self._filter.remove(key_hash)
+        self._check_load()
+        return entry[1]
 
     def delete(self, key):
         """Delete the given key from this hash table, or raise KeyError"""
-        # Break Down delete in Hash Table. 
-        # See "delete" function of linked list;
-        # 1. Find the given key and delete its entry if found
-        # 2. check if the key is inside the _bucket_index 
-        # use found as the lambda function to see if given key matches the key inside the bucket
-        # if the item is found, 
-        # delete the key inside the key linked list
-        # else raise the key error
-
+        # The bucket unlinks the entry during the same walk that finds it.
         # Worst case. O(n) (middle/end)
-        index = self._bucket_index(key)
-        bucket = self.buckets[index]
-        found = bucket.find(lambda item: item[0] == key)
-        if found is not None:
-            bucket.delete(found)
+        self.pop(key)
+
+    def update(self, other=(), **kwargs):
+        """Insert or update every key-value pair from the given mapping or
+        iterable of pairs, and from keyword arguments"""
+        if hasattr(other, 'keys'):
+            other = [(key, other[key]) for key in other.keys()]
+        elif not hasattr(other, '__len__'):
+            other = list(other)
+        # Make room up front so a big update does not resize repeatedly
+        self._grow_for(self.size + len(other) + len(kwargs))
+        for key, value in other:
+            self.set(key, value)
+        for key, value in kwargs.items():
+            self.set(key, value)
+
+    def clear(self):
+        """Remove every entry, going back to the initial number of buckets"""
+        self.buckets = [None] * self.min_size
+        self.old_buckets = None
+        self.rehash_index = 0
+        self.size = 0
+        if self._sampler is not None:
+            self._sampler.clear()
+        if self._filter is not None:
+            self._filter.clear()
+
+    # The *_many methods below run a whole batch inside one method call, with
+    # the bucket array and methods bound to locals and no per-key rehash step
+    # or load check. While a resize is in progress they fall back to the
+    # single-key methods, since keys may still sit in the old buckets.
+
+    def set_many(self, pairs):
+        """Insert or update every (key, value) pair from the given iterable,
+        in order, so a later pair for the same key wins. If pairs has a
+        length, the table is grown once up front to fit that many new keys."""
+        with gc_paused():
+            self._set_many(pairs)
+
+    def merge_many(self, pairs, function):
+        """Merge every (key, value) pair from the given iterable into this
+        hash table in order, as merge does"""
+        with gc_paused():
+            self._set_many(pairs, function)
+
+    def increment_many(self, keys, delta=1):
+        """Add delta to the value of every given key, once per occurrence,
+        e.g. to count the keys of a stream"""
+        self.merge_many(zip(keys, repeat(delta)), operator.add)
+
+    def _set_many(self, pairs, function=None):
+        # Keys are expected to repeat when merging, so only size the table
+        # up front for set_many
+        if function is None and hasattr(pairs, '__len__'):
+            self._grow_for(self.size + len(pairs))
+        if self.old_buckets is not None:
+            for key, value in pairs:
+                if function is None:
+                    self.set(key, value)
+                else:
+                    self.merge(key, value, function)
             return
-        else:
-            raise KeyError("Key not longer exists in this hash table")
+        bucket_type = self.bucket_type
+        buckets = self.buckets
+        count = len(buckets)
+        limit = self.max_load_factor * count
+        size = self.size
+        sampler = self._sampler
+        strategy = self.hash_strategy
+        threshold = self.TREEIFY_THRESHOLD
+        # Written back however the batch ends, as a key that cannot be
+        # hashed or compared, or the function, may raise partway
+        try:
+            for key, value in pairs:
+                if strategy is None:
+                    key_hash = hash(key)
+                    index = key_hash % count
+                else:
+                    key_hash = strategy.hash_code(key)
+                    index = strategy.slot(key_hash, count)
+                bucket = buckets[index]
+                if bucket is None:
+                    # An empty bucket cannot hold the key, so skip the search
+                    bucket = buckets[index] = bucket_type()
+                    bucket.append((key, value, key_hash))
+                else:
+                    if function is None:
+                        found = bucket.set_entry(key, key_hash, value)
+                    else:
+                        found = bucket.merge_entry(key, key_hash, value,
+                                                   function)
+                    if found is not None:
+                        continue
+                    if bucket.length() > threshold:
+                        self._treeify(index)
+                size += 1
+                if sampler is not None:
+                    sampler.add(key)
+                if self._filter is not None:
+                    self.size = size
+                    self._filter_added(key_hash)
+                if size > limit:
+                    # Grow right away; amortized O(1) over the batch
+                    self.size = size
+                    self.resize(count * 2)
+                    buckets = self.buckets
+                    count = len(buckets)
+                    limit = self.max_load_factor * count
+        finally:
+            self.size = size
+
+    def get_many(self, keys, default=_MISSING):
+        """Return a list of the values of the given keys, in input order.
+        Missing keys give default if given, or raise KeyError."""
+        if self.old_buckets is not None:
+            return [self.get(key, default) for key in keys]
+        buckets = self.buckets
+        count = len(buckets)
+        values = []
+        append = values.append
+        strategy = self.hash_strategy
+        bloom = self._filter
+        for key in keys:
+            if strategy is None:
+                key_hash = hash(key)
+                bucket = buckets[key_hash % count]
+            else:
+                key_hash = strategy.hash_code(key)
+                bucket = buckets[strategy.slot(key_hash, count)]
+            if bucket is None or (bloom is not None and
+                                  not bloom.might_contain(key_hash)):
+                entry = None
+            else:
+                entry = bucket.find_entry(key, key_hash)
+                if entry is None and bloom is not None:
+                    bloom.false_positives += 1
+            if entry is not None:
+                append(entry[1])
+            elif default is _MISSING:
+                raise KeyError(key)
+            else:
+                append(default)
+        return values
+
+    def contains_many(self, keys):
+        """Return a list of booleans telling whether each key is present"""
+        if self.old_buckets is not None:
+            return [self.contains(key) for key in keys]
+        buckets = self.buckets
+        count = len(buckets)
+        results = []
+        append = results.append
+        strategy = self.hash_strategy
+        bloom = self._filter
+        for key in keys:
+            if strategy is None:
+                key_hash = hash(key)
+                bucket = buckets[key_hash % count]
+            else:
+                key_hash = strategy.hash_code(key)
+                bucket = buckets[strategy.slot(key_hash, count)]
+            if bucket is None or (bloom is not None and
+                                  not bloom.might_contain(key_hash)):
+                append(False)
+            elif bucket.find_entry(key, key_hash) is not None:
+                append(True)
+            else:
+                if bloom is not None:
+                    bloom.false_positives += 1
+                append(False)
+        return results
+
+    def delete_many(self, keys):
+        """Delete every given key that is present, skipping missing ones.
+        Return the number of entries deleted."""
+        if self.old_buckets is not None:
+            before = self.size
+            for key in keys:
+                self.pop(key, None)
+            return before - self.size
+        buckets = self.buckets
+        count = len(buckets)
+        deleted = 0
+        sampler = self._sampler
+        bloom = self._filter
+        strategy = self.hash_strategy
+        sorted_type = self.sorted_bucket_type
+        try:
+            for key in keys:
+                if strategy is None:
+                    key_hash = hash(key)
+                    index = key_hash % count
+                else:
+                    key_hash = strategy.hash_code(key)
+                    index = strategy.slot(key_hash, count)
+                bucket = buckets[index]
+                if (bucket is not None and
+                        bucket.pop_entry(key, key_hash) is not None):
+                    deleted += 1
+                    if type(bucket) is sorted_type:
+                        self._untreeify(index)
+                    if sampler is not None:
+                        sampler.remove(key)
+                    if bloom is not None:
+                        bloom.remove(key_hash)
+        finally:
+            self.size -= deleted
+        self._check_load()
+        return deleted
+
+    def enable_sampling(self, seed=None):
+        """Start keeping a dense index of the keys, so random keys and items
+        can be drawn in O(1). Samples are drawn from a random number
+        generator seeded with seed, so runs can be reproduced.
+        Building the index is O(n), and every insert and delete then also
+        updates it in O(1)."""
+        self._sampler = KeySampler(self, seed)
+
+    def disable_sampling(self):
+        """Stop keeping the key index"""
+        self._sampler = None
+
+    def enable_bloom_filter(self, error_rate=0.05):
+        """Start keeping a counting Bloom filter of the stored hash codes,
+        so contains, get and pop reject most missing keys without searching
+        a bucket, and let through about error_rate of them. The filter is
+        built from the cached hash codes in O(n), updated in O(k) on every
+        insert and delete, and rebuilt twice as large whenever the table
+        outgrows it. stats() then also reports its observed false positive
+        rate. Lookups of present keys pay for all k counter checks, so it
+        pays off when missing keys are common and bucket searches are slow,
+        e.g. long chains or keys with a costly __eq__."""
+        self._filter = CountingBloomFilter(
+            max(2 * self.size, 8), error_rate,
+            (entry[2] for entry in self._iter_entries()))
+
+    def disable_bloom_filter(self):
+        """Stop keeping the Bloom filter"""
+        self._filter = None
+
+    def _key_at(self, position):
+        """Return the key at the given position in iteration order: O(n)"""
+        return next(islice(self, position, None))
 
     def get_random_key(self):
-        random_num = random.randint(0, int(self.length() - 1))
-        return self.keys()[random_num]
+        """Return a uniformly random key, or raise KeyError if this hash
+        table is empty. Running time: O(1) with sampling enabled, otherwise
+        O(n) to walk to the chosen key."""
+        if self.size == 0:
+            raise KeyError('get_random_key(): hash table is empty')
+        if self._sampler is not None:
+            return self._sampler.choice()
+        return self._key_at(random.randrange(self.size))
+
+    def random_item(self):
+        """Return a uniformly random (key, value) pair, or raise KeyError
+        if this hash table is empty"""
+        key = self.get_random_key()
+        return key, self.get(key)
+
+    def sample(self, count, replace=False):
+        """Return a list of count uniformly random keys, all distinct unless
+        replace is True. Running time: O(count) with sampling enabled,
+        otherwise O(n) to copy the keys first."""
+        if count < 0:
+            raise ValueError('count must not be negative')
+        if not replace and count > self.size:
+            raise ValueError('Sample larger than hash table without replacement')
+        if replace and count and self.size == 0:
+            raise KeyError('sample(): hash table is empty')
+        if self._sampler is not None:
+            return self._sampler.sample(count, replace)
+        keys = list(self)
+        if replace:
+            return random.choices(keys, k=count)
+        return random.sample(keys, count)
 
 
 
@@ -0,0 +1,462 @@
+#!python
+
+import operator
+from array import array
+from collections.abc import ItemsView, MutableMapping, ValuesView
+
+from hashing import GOLDEN_RATIO_64, fibonacci_index
+from hashtable import HashTable
+
+try:
+    import numpy
+except ImportError:
+    # Without NumPy the same layout is kept in array.array objects, and the
+    # *_many methods loop in Python instead of running vectorized
+    numpy = None
+
+# Slot states
+EMPTY = 0
+FULL = 1
+# NumPy dtypes of the array typecodes used for slots
+DTYPES = {'B': 'uint8', 'q': 'int64', 'd': 'float64'}
+INT64_MIN = -1 << 63
+INT64_MAX = (1 << 63) - 1
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+
+
+def _new_array(typecode, count):
+    """Return a zeroed NumPy array, or array.array, of count items"""
+    if numpy is not None:
+        return numpy.zeros(count, dtype=DTYPES[typecode])
+    return array(typecode, [0]) * count
+
+
+class IntValuesView(ValuesView):
+    """Live view of the values of an IntHashTable"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the values without looking each key up again"""
+        for key, value in self._mapping._iter_entries():
+            yield value
+
+
+class IntItemsView(ItemsView):
+    """Live view of the (key, value) items of an IntHashTable"""
+
+    __slots__ = ()
+
+    def __iter__(self):
+        """Iterate over the items without looking each key up again"""
+        return self._mapping._iter_entries()
+
+
+class IntHashTable(MutableMapping):
+    """Hash table from int64 keys to int64 or float64 values, stored unboxed
+    in flat NumPy arrays (or array.array objects if NumPy is missing).
+    Slots are found by Fibonacci hashing and linear probing, and deletes
+    shift the following entries back, so there are no tombstones.
+
+    An entry takes 17 bytes of slot arrays, against well over 100 bytes for
+    a HashTable node, its tuple and their boxed ints. get_many, set_many
+    and contains_many take and return NumPy arrays, and hash and probe
+    every key of a batch at once, one vectorized step per probe."""
+
+    def __init__(self, init_size=8, max_load_factor=0.7, value_type='q'):
+        """Initialize this hash table with room for init_size entries.
+        value_type is 'q' for int64 values or 'd' for float64 values."""
+        if init_size < 1:
+            raise ValueError('init_size must be at least 1')
+        if not 0 < max_load_factor < 1:
+            raise ValueError('max_load_factor must be between 0 and 1')
+        if value_type not in ('q', 'd'):
+            raise ValueError("value_type must be 'q' or 'd'")
+        self.max_load_factor = max_load_factor
+        self.value_type = value_type
+        self.size = 0
+        self._allocate(self._capacity_for(init_size))
+
+    def __str__(self):
+        """Return a formatted string representation of this hash table"""
+        items = ('{}: {}'.format(repr(k), repr(v)) for k, v in self.items())
+        return '{' + ', '.join(items) + '}'
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'IntHashTable({})'.format(repr(list(self.items())))
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the keys of this hash table"""
+        for key, value in self._iter_entries():
+            yield key
+
+    def _iter_entries(self):
+        """Iterate over the (key, value) entries in slot order. Raise
+        RuntimeError if the table gains or loses entries meanwhile."""
+        size = self.size
+        for state, key, value in zip(self.states.tolist(),
+                                     self.slot_keys.tolist(),
+                                     self.slot_values.tolist()):
+            if state == FULL:
+                yield key, value
+                if self.size != size:
+                    raise RuntimeError(
+                        'IntHashTable changed size during iteration')
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self.contains(key)
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    def _capacity_for(self, count):
+        """Return the smallest power of two number of slots, at least 8,
+        holding count entries under the maximum load factor"""
+        capacity = 8
+        while count > self.max_load_factor * capacity:
+            capacity *= 2
+        return capacity
+
+    def _allocate(self, capacity):
+        """Replace the slot arrays with capacity empty slots"""
+        self.states = _new_array('B', capacity)
+        self.slot_keys = _new_array('q', capacity)
+        self.slot_values = _new_array(self.value_type, capacity)
+        self.mask = capacity - 1
+        self.bits = capacity.bit_length() - 1
+
+    @staticmethod
+    def _key(key):
+        """Return the given key as a Python int, or raise TypeError if it is
+        not an integer or OverflowError if it does not fit in 64 bits"""
+        key = operator.index(key)
+        if not INT64_MIN <= key <= INT64_MAX:
+            raise OverflowError('IntHashTable keys must fit in 64 bits')
+        return key
+
+    def _value(self, value):
+        """Return the given value as the Python type stored for values"""
+        if self.value_type == 'q':
+            return operator.index(value)
+        return float(value)
+
+    def _probe(self, key):
+        """Return (slot, found): the slot holding the given key, or the
+        empty slot where it would be inserted"""
+        states = self.states
+        slot_keys = self.slot_keys
+        mask = self.mask
+        slot = fibonacci_index(key, self.bits)
+        while states[slot]:
+            if slot_keys[slot] == key:
+                return slot, True
+            slot = (slot + 1) & mask
+        return slot, False
+
+    def _resize(self, capacity):
+        """Move every entry into capacity new slots: O(n + m) for n entries
+        and m slots"""
+        if numpy is not None:
+            full = self.states == FULL
+            keys = self.slot_keys[full]
+            values = self.slot_values[full]
+            self._allocate(capacity)
+            self._insert_new(keys, values)
+            return
+        entries = list(self._iter_entries())
+        self._allocate(capacity)
+        states = self.states
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        for key, value in entries:
+            slot = self._probe(key)[0]
+            states[slot] = FULL
+            slot_keys[slot] = key
+            slot_values[slot] = value
+
+    def reserve(self, count):
+        """Grow this hash table so it can hold count entries without resizing"""
+        capacity = self._capacity_for(count)
+        if capacity > len(self.states):
+            self._resize(capacity)
+
+    def load_factor(self):
+        """Return the fraction of slots that hold an entry"""
+        return self.size / len(self.states)
+
+    def values(self):
+        """Return a live view of the values in this hash table"""
+        return IntValuesView(self)
+
+    def items(self):
+        """Return a live view of the (key, value) items in this hash table"""
+        return IntItemsView(self)
+
+    def keys_array(self):
+        """Return a new array of every key, in slot order"""
+        if numpy is not None:
+            return self.slot_keys[self.states == FULL]
+        return array('q', self)
+
+    def values_array(self):
+        """Return a new array of every value, in the order of keys_array"""
+        if numpy is not None:
+            return self.slot_values[self.states == FULL]
+        return array(self.value_type, self.values())
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        try:
+            key = self._key(key)
+        except (TypeError, OverflowError):
+            return False
+        return self._probe(key)[1]
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        slot, found = self._probe(self._key(key))
+        if found:
+            value = self.slot_values[slot]
+            return value if numpy is None else value.item()
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value"""
+        key = self._key(key)
+        value = self._value(value)
+        slot, found = self._probe(key)
+        if not found:
+            if self.size + 1 > self.max_load_factor * len(self.states):
+                self._resize(len(self.states) * 2)
+                slot = self._probe(key)[0]
+            self.states[slot] = FULL
+            self.slot_keys[slot] = key
+            self.size += 1
+        self.slot_values[slot] = value
+
+    def pop(self, key, default=_MISSING):
+        """Remove the given key and return its value. If the key is missing,
+        return default if given, or raise KeyError"""
+        slot, found = self._probe(self._key(key))
+        if not found:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self.slot_values[slot]
+        if numpy is not None:
+            value = value.item()
+        self._remove(slot)
+        return value
+
+    def _remove(self, slot):
+        """Empty the given slot, shifting back any following entry whose
+        probe passed over it so lookups never stop at the hole too early"""
+        states = self.states
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        mask = self.mask
+        bits = self.bits
+        following = (slot + 1) & mask
+        while states[following]:
+            home = fibonacci_index(int(slot_keys[following]), bits)
+            # The entry may move back if the hole lies between its home slot
+            # and the slot it is in
+            if (following - home) & mask >= (following - slot) & mask:
+                slot_keys[slot] = slot_keys[following]
+                slot_values[slot] = slot_values[following]
+                slot = following
+            following = (following + 1) & mask
+        states[slot] = EMPTY
+        slot_keys[slot] = 0
+        slot_values[slot] = 0
+        self.size -= 1
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self.pop(key)
+
+    def clear(self):
+        """Remove every entry, going back to the minimum number of slots"""
+        self.size = 0
+        self._allocate(self._capacity_for(0))
+
+    # The *_many methods below take sequences or NumPy arrays of keys and
+    # values. With NumPy they return arrays, and hash and probe the whole
+    # batch at once: each step of the loop advances every key still probing
+    # by one slot, so a batch takes as many steps as its longest probe.
+
+    def _homes(self, keys):
+        """Return the home slot of each key of an int64 array"""
+        product = keys.view(numpy.uint64) * numpy.uint64(GOLDEN_RATIO_64)
+        return (product >> numpy.uint64(64 - self.bits)).astype(numpy.intp)
+
+    def _locate(self, keys):
+        """Return the slot of each key of an int64 array, or -1 if missing"""
+        states = self.states
+        slot_keys = self.slot_keys
+        mask = self.mask
+        slots = self._homes(keys)
+        result = numpy.full(len(keys), -1, dtype=numpy.intp)
+        pending = numpy.arange(len(keys))
+        while pending.size:
+            current = slots[pending]
+            occupied = states[current] == FULL
+            hit = occupied & (slot_keys[current] == keys[pending])
+            result[pending[hit]] = current[hit]
+            probing = occupied & ~hit
+            pending = pending[probing]
+            slots[pending] = (current[probing] + 1) & mask
+        return result
+
+    def _insert_new(self, keys, values):
+        """Insert distinct keys that are all missing from this hash table,
+        given as arrays, without checking the load factor"""
+        states = self.states
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        mask = self.mask
+        slots = self._homes(keys)
+        placed = numpy.zeros(len(keys), dtype=bool)
+        pending = numpy.arange(len(keys))
+        while pending.size:
+            current = slots[pending]
+            free = states[current] == EMPTY
+            # When several keys reach the same empty slot the first one
+            # takes it, and the others probe on from there
+            targets, first = numpy.unique(current[free], return_index=True)
+            winners = pending[free][first]
+            states[targets] = FULL
+            slot_keys[targets] = keys[winners]
+            slot_values[targets] = values[winners]
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slots[pending] = (slots[pending] + 1) & mask
+
+    def _key_array(self, keys):
+        """Return the given keys as a contiguous int64 NumPy array"""
+        return numpy.ascontiguousarray(keys, dtype=numpy.int64)
+
+    def _value_array(self, values):
+        """Return the given values as a NumPy array of the value type, or
+        raise TypeError if that would change any of them, as set does"""
+        values = numpy.asarray(values)
+        dtype = DTYPES[self.value_type]
+        if values.size and not numpy.can_cast(values.dtype, dtype, 'safe'):
+            raise TypeError('IntHashTable values must be {}, not {}'.format(
+                dtype, values.dtype))
+        return values.astype(dtype, copy=False)
+
+    def get_many(self, keys, default=_MISSING):
+        """Return an array of the values of the given keys, in input order.
+        Missing keys give default if given, or raise KeyError. default must
+        be a value of the value type, since it is stored in the array."""
+        if default is not _MISSING:
+            try:
+                default = self._value(default)
+            except TypeError:
+                raise TypeError('get_many default must be {}, not {}'.format(
+                    DTYPES[self.value_type], type(default).__name__))
+        if numpy is None:
+            return array(self.value_type,
+                         [self.get(key, default) for key in keys])
+        keys = self._key_array(keys)
+        slots = self._locate(keys)
+        missing = slots < 0
+        if missing.any():
+            if default is _MISSING:
+                raise KeyError(keys[missing][0].item())
+            values = numpy.full(len(keys), default,
+                                dtype=DTYPES[self.value_type])
+            found = ~missing
+            values[found] = self.slot_values[slots[found]]
+            return values
+        return self.slot_values[slots]
+
+    def contains_many(self, keys):
+        """Return an array (a list without NumPy) of booleans telling whether
+        each key is present"""
+        if numpy is None:
+            return [self.contains(key) for key in keys]
+        return self._locate(self._key_array(keys)) >= 0
+
+    def set_many(self, keys, values):
+        """Insert or update every key with the value at the same position,
+        so a later pair for the same key wins"""
+        if numpy is None:
+            for key, value in zip(keys, values):
+                self.set(key, value)
+            return
+        keys = self._key_array(keys)
+        values = self._value_array(values)
+        if keys.shape != values.shape:
+            raise ValueError('keys and values must have the same length')
+        if len(keys) > 1:
+            # Keep only the last occurrence of each key
+            unique, first = numpy.unique(keys[::-1], return_index=True)
+            last = len(keys) - 1 - first
+            keys = keys[last]
+            values = values[last]
+        slots = self._locate(keys)
+        found = slots >= 0
+        self.slot_values[slots[found]] = values[found]
+        new = ~found
+        count = int(new.sum())
+        if count:
+            self.reserve(self.size + count)
+            self._insert_new(keys[new], values[new])
+            self.size += count
+
+    def delete_many(self, keys):
+        """Delete every given key that is present, skipping missing ones.
+        Return the number of entries deleted."""
+        if numpy is not None:
+            keys = self._key_array(keys).tolist()
+        before = self.size
+        # Shifting entries back is sequential, so deletes run one by one
+        for key in keys:
+            self.pop(key, None)
+        return before - self.size
+
+    @classmethod
+    def from_table(cls, table, **options):
+        """Return an IntHashTable holding the entries of a HashTable or any
+        other mapping with integer keys and numeric values"""
+        keys = []
+        values = []
+        for key, value in table.items():
+            keys.append(key)
+            values.append(value)
+        result = cls(len(keys) or 1, **options)
+        result.set_many(keys, values)
+        return result
+
+    def to_table(self, **table_options):
+        """Return a HashTable holding the entries of this hash table"""
+        table = HashTable(**table_options)
+        table.reserve(self.size)
+        table.set_many(list(self._iter_entries()))
+        return table
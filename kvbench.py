@@ -0,0 +1,126 @@
+#!python
+
+"""Measure the throughput and latency of a KeyValueServer.
+
+Runs concurrent client tasks sending a mix of GETs and SETs, optionally
+pipelined, against a running server or one started in this process:
+
+    python kvbench.py --port 6380 --concurrency 50 --pipeline 16
+    python kvbench.py --local --requests 100000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmark import percentile
+from kvclient import KeyValueClient
+from kvserver import DEFAULT_PORT, KeyValueServer
+
+
+async def run_load(client, requests=10000, concurrency=16, pipeline=1,
+                   keys=1000, value_size=32, read_ratio=0.8, seed=0):
+    """Send requests commands over client from concurrency tasks, each
+    sending pipeline commands per round trip, after setting every key once.
+    Return the throughput and round trip latency percentiles as a dict."""
+    rng = random.Random(seed)
+    names = [b'key:%d' % n for n in range(keys)]
+    value = b'x' * value_size
+    await client.mset((name, value) for name in names)
+
+    batches = []
+    for start in range(0, requests, pipeline):
+        batch = []
+        for i in range(min(pipeline, requests - start)):
+            if rng.random() < read_ratio:
+                batch.append((b'GET', rng.choice(names)))
+            else:
+                batch.append((b'SET', rng.choice(names), value))
+        batches.append(batch)
+    batches.reverse()
+    latencies = []
+
+    async def worker():
+        clock = time.perf_counter_ns
+        while batches:
+            batch = batches.pop()
+            start = clock()
+            await client.pipeline(batch)
+            latencies.append(clock() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for i in range(concurrency)])
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'pipeline': pipeline,
+        'seconds': seconds,
+        'requests_per_sec': requests / seconds if seconds else float('inf'),
+        'latency_ns': {
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'p999': percentile(latencies, 0.999),
+            'max': latencies[-1],
+        },
+    }
+
+
+def format_result(result):
+    """Return a one line summary of a result"""
+    return ('{requests} requests, concurrency {concurrency}, pipeline '
+            '{pipeline}: {requests_per_sec:,.0f} requests/s'.format(**result) +
+            '  round trip p50 {p50:,}ns p99 {p99:,}ns p999 {p999:,}ns '
+            'max {max:,}ns'.format(**result['latency_ns']))
+
+
+async def bench(args):
+    server = None
+    host, port, path = args.host, args.port, args.unix
+    if args.local:
+        # The server listens where the client will connect
+        server = KeyValueServer()
+        if path is None:
+            await server.start(host, 0)
+            host, port = server.address
+        else:
+            await server.start_unix(path)
+    client = KeyValueClient(host, port, path, pool_size=args.concurrency)
+    try:
+        result = await run_load(client, args.requests, args.concurrency,
+                                args.pipeline, args.keys, args.value_size,
+                                args.read_ratio, args.seed)
+    finally:
+        await client.close()
+        if server is not None:
+            await server.close()
+    print(format_result(result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='connect to this Unix socket instead, '
+                        'which --local serves on')
+    parser.add_argument('--local', action='store_true',
+                        help='start a server in this process and use it')
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--pipeline', type=int, default=1,
+                        help='commands sent per round trip')
+    parser.add_argument('--keys', type=int, default=10000)
+    parser.add_argument('--value-size', type=int, default=32)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(bench(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
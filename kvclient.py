@@ -0,0 +1,252 @@
+#!python
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from kvserver import DEFAULT_PORT, READ_SIZE, ProtocolError, encode_bulk
+
+# Returned by parse_reply when the buffer does not hold a whole reply yet
+_INCOMPLETE = object()
+
+
+class ResponseError(Exception):
+    """Error reply sent by the server, e.g. for an unknown command"""
+
+
+def encode_command(arguments):
+    """Return the RESP encoding of a command. Arguments may be bytes, str
+    (sent as UTF-8) or int."""
+    parts = [b'*%d\r\n' % len(arguments)]
+    for argument in arguments:
+        if isinstance(argument, str):
+            argument = argument.encode('utf-8')
+        elif isinstance(argument, int):
+            argument = b'%d' % argument
+        parts.append(encode_bulk(argument))
+    return b''.join(parts)
+
+
+def parse_reply(buffer, start=0):
+    """Parse the RESP reply starting at buffer[start:]. Return (reply, end),
+    or (_INCOMPLETE, start) if more bytes are needed. Error replies are
+    returned as ResponseError instances, not raised."""
+    line_end = buffer.find(b'\r\n', start)
+    if line_end < 0:
+        return _INCOMPLETE, start
+    kind = buffer[start:start + 1]
+    line = bytes(buffer[start + 1:line_end])
+    position = line_end + 2
+    if kind == b'+':
+        return line.decode('utf-8'), position
+    if kind == b'-':
+        return ResponseError(line.decode('utf-8', 'replace')), position
+    if kind == b':':
+        return int(line), position
+    if kind == b'$':
+        length = int(line)
+        if length < 0:
+            return None, position
+        if len(buffer) < position + length + 2:
+            return _INCOMPLETE, start
+        end = position + length
+        return bytes(buffer[position:end]), end + 2
+    if kind == b'*':
+        count = int(line)
+        if count < 0:
+            return None, position
+        items = []
+        for i in range(count):
+            item, position = parse_reply(buffer, position)
+            if item is _INCOMPLETE:
+                return _INCOMPLETE, start
+            items.append(item)
+        return items, position
+    raise ProtocolError('unexpected reply type {!r}'.format(kind))
+
+
+class Connection(object):
+    """One connection to a KeyValueServer"""
+
+    def __init__(self, reader, writer):
+        """Initialize this connection from an asyncio stream pair"""
+        self.reader = reader
+        self.writer = writer
+        self.buffer = bytearray()
+        self.closed = False
+
+    @classmethod
+    async def open(cls, host='127.0.0.1', port=DEFAULT_PORT, path=None):
+        """Connect to the server at the given TCP address, or at the Unix
+        socket at path if given"""
+        if path is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        else:
+            reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def execute(self, *arguments):
+        """Send one command and return its reply, raising ResponseError if
+        it is an error"""
+        reply, = await self.pipeline([arguments])
+        if isinstance(reply, ResponseError):
+            raise reply
+        return reply
+
+    async def pipeline(self, commands):
+        """Send every command in one write, then read their replies.
+        Return the replies in order, with errors as ResponseError instances.
+        Running time: one round trip, whatever the number of commands."""
+        self.writer.write(b''.join(encode_command(command)
+                                   for command in commands))
+        await self.writer.drain()
+        replies = []
+        buffer = self.buffer
+        position = 0
+        while len(replies) < len(commands):
+            reply, position = parse_reply(buffer, position)
+            if reply is _INCOMPLETE:
+                del buffer[:position]
+                position = 0
+                data = await self.reader.read(READ_SIZE)
+                if not data:
+                    self.close()
+                    raise ConnectionError('Server closed the connection')
+                buffer += data
+            else:
+                replies.append(reply)
+        del buffer[:position]
+        return replies
+
+    def close(self):
+        """Start closing this connection"""
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    async def wait_closed(self):
+        """Close this connection and wait until it is closed"""
+        self.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class ConnectionPool(object):
+    """Pool of at most size connections to one server, opened on demand and
+    reused, most recently returned first"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, path=None, size=8):
+        """Initialize an empty pool for the server at the given TCP address,
+        or at the Unix socket at path if given"""
+        self.host = host
+        self.port = port
+        self.path = path
+        self.size = size
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(size)
+
+    async def acquire(self):
+        """Return an idle connection, or open a new one, waiting while size
+        connections are in use"""
+        await self.semaphore.acquire()
+        try:
+            if self.idle:
+                return self.idle.pop()
+            return await Connection.open(self.host, self.port, self.path)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    def release(self, connection):
+        """Return a connection taken with acquire to the pool"""
+        if not connection.closed:
+            self.idle.append(connection)
+        self.semaphore.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Context manager lending a connection from the pool. A connection
+        interrupted mid-command is closed rather than reused, since replies
+        may still be on their way."""
+        connection = await self.acquire()
+        try:
+            yield connection
+        except ResponseError:
+            raise
+        except BaseException:
+            connection.close()
+            raise
+        finally:
+            self.release(connection)
+
+    async def close(self):
+        """Close every idle connection"""
+        while self.idle:
+            await self.idle.pop().wait_closed()
+
+
+class KeyValueClient(object):
+    """Async client for a KeyValueServer, sharing a ConnectionPool between
+    the tasks using it. Keys and values are returned as bytes."""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, path=None,
+                 pool_size=8):
+        """Initialize a client for the server at the given TCP address, or at
+        the Unix socket at path if given"""
+        self.pool = ConnectionPool(host, port, path, pool_size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def execute(self, *arguments):
+        """Send one command and return its reply"""
+        async with self.pool.connection() as connection:
+            return await connection.execute(*arguments)
+
+    async def pipeline(self, commands):
+        """Send several commands in one round trip and return their replies,
+        with errors as ResponseError instances"""
+        async with self.pool.connection() as connection:
+            return await connection.pipeline(commands)
+
+    async def get(self, key):
+        """Return the value of the given key, or None if it is missing"""
+        return await self.execute('GET', key)
+
+    async def set(self, key, value):
+        """Set the given key to value"""
+        await self.execute('SET', key, value)
+
+    async def delete(self, *keys):
+        """Delete the given keys and return how many were present"""
+        return await self.execute('DEL', *keys)
+
+    async def exists(self, *keys):
+        """Return how many of the given keys are present"""
+        return await self.execute('EXISTS', *keys)
+
+    async def mget(self, *keys):
+        """Return a list of the values of the given keys, None if missing"""
+        return await self.execute('MGET', *keys)
+
+    async def mset(self, pairs):
+        """Set every key to its value, from a mapping or (key, value) pairs"""
+        if hasattr(pairs, 'items'):
+            pairs = pairs.items()
+        arguments = ['MSET']
+        for key, value in pairs:
+            arguments.append(key)
+            arguments.append(value)
+        await self.execute(*arguments)
+
+    async def ping(self):
+        """Return 'PONG' if the server is up"""
+        return await self.execute('PING')
+
+    async def close(self):
+        """Close the pooled connections"""
+        await self.pool.close()
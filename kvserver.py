@@ -0,0 +1,312 @@
+#!python
+
+"""Serve a HashTable to other processes over TCP or a Unix socket.
+
+Speaks a subset of the Redis protocol (RESP), so redis-cli and Redis client
+libraries work against it, as do plain text commands like "GET key":
+
+    python kvserver.py --port 6380
+    python kvserver.py --unix /tmp/hashtable.sock
+"""
+
+import argparse
+import asyncio
+import sys
+
+from hashtable import HashTable
+
+DEFAULT_PORT = 6380
+# Longest bulk string accepted, as in Redis
+MAX_BULK_LENGTH = 512 * 1024 * 1024
+# Longest inline command, or RESP header line, accepted, as in Redis. The
+# line is buffered until its end arrives, so this bounds that buffer.
+MAX_INLINE_LENGTH = 64 * 1024
+# Bytes read from a connection at a time
+READ_SIZE = 64 * 1024
+
+OK = b'+OK\r\n'
+PONG = b'+PONG\r\n'
+NULL = b'$-1\r\n'
+
+
+class ProtocolError(Exception):
+    """Raised when a client sends bytes that are not a valid command"""
+
+
+def parse_command(buffer, start=0):
+    """Parse the command starting at buffer[start:], either a RESP array of
+    bulk strings or an inline line of space separated words, which may end
+    with a bare newline as well as CRLF.
+    Return (arguments, end), or (None, start) if the command is incomplete."""
+    if start >= len(buffer):
+        return None, start
+    if buffer[start] != ord('*'):
+        line_end = _find_line(buffer, start, b'\n')
+        if line_end < 0:
+            return None, start
+        # split() also drops the \r of a \r\n
+        return bytes(buffer[start:line_end]).split(), line_end + 1
+    line_end = _find_line(buffer, start, b'\r\n')
+    if line_end < 0:
+        return None, start
+    count = _parse_length(buffer, start + 1, line_end)
+    position = line_end + 2
+    arguments = []
+    for i in range(count):
+        line_end = _find_line(buffer, position, b'\r\n')
+        if line_end < 0:
+            return None, start
+        if buffer[position] != ord('$'):
+            raise ProtocolError('expected a bulk string')
+        length = _parse_length(buffer, position + 1, line_end)
+        position = line_end + 2
+        if len(buffer) < position + length + 2:
+            return None, start
+        arguments.append(bytes(buffer[position:position + length]))
+        position += length + 2
+    return arguments, position
+
+
+def _find_line(buffer, start, terminator):
+    """Return the index of the terminator ending the line at start, or -1 if
+    it has not arrived yet. Raise ProtocolError once the line is longer than
+    MAX_INLINE_LENGTH."""
+    # Leaving room for a CRLF after the line
+    end = buffer.find(terminator, start, start + MAX_INLINE_LENGTH + 2)
+    if end < 0 and len(buffer) - start > MAX_INLINE_LENGTH:
+        raise ProtocolError('too big inline request')
+    return end
+
+
+def _parse_length(buffer, start, end):
+    try:
+        length = int(buffer[start:end])
+    except ValueError:
+        raise ProtocolError('invalid length')
+    if not 0 <= length <= MAX_BULK_LENGTH:
+        raise ProtocolError('invalid length')
+    return length
+
+
+def encode_bulk(value):
+    """Return the RESP encoding of a bulk string, or of null for None"""
+    if value is None:
+        return NULL
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def encode_integer(value):
+    """Return the RESP encoding of an integer"""
+    return b':%d\r\n' % value
+
+
+def encode_array(values):
+    """Return the RESP encoding of an array of bulk strings or nulls"""
+    return b'*%d\r\n' % len(values) + b''.join(encode_bulk(value)
+                                                for value in values)
+
+
+def encode_error(message):
+    """Return the RESP encoding of an error"""
+    return b'-ERR ' + message.encode('utf-8') + b'\r\n'
+
+
+class KeyValueServer(object):
+    """Asyncio server exposing a HashTable of bytes keys and values.
+    Commands that a client pipelines, i.e. sends without waiting for the
+    replies, are parsed from one read and answered with one write. Within
+    such a batch, runs of GETs and of SETs go to the table as a single
+    get_many or set_many call."""
+
+    def __init__(self, table=None):
+        """Initialize this server to serve the given table, or a new
+        HashTable"""
+        self.table = HashTable() if table is None else table
+        self.server = None
+        self.commands = 0
+        # Handler task of each open connection, and its writer
+        self.connections = {}
+        self.handlers = {
+            b'GET': self._get,
+            b'SET': self._set,
+            b'DEL': self._delete,
+            b'EXISTS': self._exists,
+            b'MGET': self._mget,
+            b'MSET': self._mset,
+            b'PING': self._ping,
+        }
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start listening on the given TCP address. With port 0 a free port
+        is picked; the address is then in self.address."""
+        self.server = await asyncio.start_server(self._serve, host, port)
+        self.address = self.server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path):
+        """Start listening on the Unix socket at path"""
+        self.server = await asyncio.start_unix_server(self._serve, path)
+        self.address = path
+
+    async def serve_forever(self):
+        """Serve connections until cancelled"""
+        await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening, close every connection and wait for their
+        handlers to finish"""
+        self.server.close()
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*self.connections)
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        """Answer the commands of one connection until it is closed"""
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        buffer = bytearray()
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                buffer += data
+                commands = []
+                position = 0
+                try:
+                    while True:
+                        command, position = parse_command(buffer, position)
+                        if command is None:
+                            break
+                        if command:
+                            commands.append(command)
+                except ProtocolError as error:
+                    # Answer what was parsed, then hang up like Redis does
+                    message = 'Protocol error: {}'.format(error)
+                    writer.write(self.execute_batch(commands) +
+                                 encode_error(message))
+                    break
+                del buffer[:position]
+                if commands:
+                    writer.write(self.execute_batch(commands))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.connections[task]
+            writer.close()
+
+    def execute(self, command):
+        """Run one command, given as a list of bytes, and return its
+        RESP-encoded reply"""
+        return self.execute_batch([command])
+
+    def execute_batch(self, commands):
+        """Run the given commands in order and return their concatenated
+        RESP-encoded replies"""
+        self.commands += len(commands)
+        replies = []
+        index = 0
+        while index < len(commands):
+            name = commands[index][0].upper()
+            # Gather a run of well-formed GETs or SETs into one batch call
+            end = index
+            if name == b'GET':
+                while (end < len(commands) and len(commands[end]) == 2 and
+                       commands[end][0].upper() == b'GET'):
+                    end += 1
+            elif name == b'SET':
+                while (end < len(commands) and len(commands[end]) == 3 and
+                       commands[end][0].upper() == b'SET'):
+                    end += 1
+            if end - index > 1:
+                if name == b'GET':
+                    values = self.table.get_many(
+                        [command[1] for command in commands[index:end]], None)
+                    replies.extend(encode_bulk(value) for value in values)
+                else:
+                    self.table.set_many([(command[1], command[2])
+                                         for command in commands[index:end]])
+                    replies.extend([OK] * (end - index))
+                index = end
+                continue
+            handler = self.handlers.get(name)
+            if handler is None:
+                replies.append(encode_error("unknown command '{}'".format(
+                    name.decode('utf-8', 'replace'))))
+            else:
+                try:
+                    replies.append(handler(commands[index][1:]))
+                except ValueError:
+                    replies.append(encode_error(
+                        "wrong number of arguments for '{}' command".format(
+                            name.decode('utf-8', 'replace').lower())))
+            index += 1
+        return b''.join(replies)
+
+    # Each handler takes the command's arguments and returns its reply. A
+    # wrong number of arguments raises ValueError.
+
+    def _get(self, arguments):
+        key, = arguments
+        return encode_bulk(self.table.get(key, None))
+
+    def _set(self, arguments):
+        key, value = arguments
+        self.table.set(key, value)
+        return OK
+
+    def _delete(self, arguments):
+        if not arguments:
+            raise ValueError
+        return encode_integer(self.table.delete_many(arguments))
+
+    def _exists(self, arguments):
+        if not arguments:
+            raise ValueError
+        return encode_integer(sum(self.table.contains_many(arguments)))
+
+    def _mget(self, arguments):
+        if not arguments:
+            raise ValueError
+        return encode_array(self.table.get_many(arguments, None))
+
+    def _mset(self, arguments):
+        if not arguments or len(arguments) % 2:
+            raise ValueError
+        self.table.set_many(list(zip(arguments[::2], arguments[1::2])))
+        return OK
+
+    def _ping(self, arguments):
+        if not arguments:
+            return PONG
+        message, = arguments
+        return encode_bulk(message)
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, path=None, table=None):
+    """Serve the given table, or a new HashTable, until cancelled"""
+    server = KeyValueServer(table)
+    if path is None:
+        await server.start(host, port)
+    else:
+        await server.start_unix(path)
+    print('Serving on {}'.format(server.address))
+    await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='listen on this Unix socket instead')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,8 @@
 
 class Node(object):
 
+    __slots__ = ('data', 'next', 'previous')
+
     def __init__(self, data):
         """Initialize this node with the given data"""
         self.data = data
@@ -18,6 +20,8 @@ class Node(object):
 
 class LinkedList(object):
 
+    __slots__ = ('head', 'tail', 'nodeCount')
+
     def __init__(self, iterable=None):
         """Initialize this linked list; append the given items, if any"""
         self.head = None
@@ -31,6 +35,13 @@ class LinkedList(object):
         """Return a string representation of this linked list"""
         return 'LinkedList({})'.format(repr(self.items()))
 
+    def __iter__(self):
+        """Iterate over the items of this linked list without copying them"""
+        current = self.head
+        while current is not None:
+            yield current.data
+            current = current.next
+
     def items(self):
         """Return a list of all items in this linked list.
         Best case is O(n) and worst case running time: O(n) for n items in the list
@@ -71,42 +82,62 @@ class LinkedList(object):
         return self.nodeCount
 
     def append(self, item):
-        """Insert the given item at the tail of this linked list
-        Worst case running time: O(1) if item is near the tail of the list """        
+        """Insert the given item at the tail of this linked list and return
+        its node. Worst case running time: O(1)"""
         new_node = Node(item)
         self.nodeCount += 1
-        # Check if this linked list is empty
-        if self.tail == None and self.head == None:
-            self.tail = new_node
+        # Check if this linked list is empty, then assign head to new node
+        if self.tail is None:
             self.head = new_node
-        # Assign head to new node
-        # Check if this linked list is the last node
-        elif self.tail == self.head:
-            self.tail = new_node
-            self.head.next = new_node
         # Otherwise insert new node after tail
-        # Update tail to new node regardless
         else:
             self.tail.next = new_node
-            self.tail = new_node
+            new_node.previous = self.tail
+        # Update tail to new node regardless
+        self.tail = new_node
+        return new_node
 
     def prepend(self, item):
-        """Insert the given item at the head of this linked list"""
+        """Insert the given item at the head of this linked list and return
+        its node. Worst case running time: O(1)"""
         # Create a new node to hold the given item
         new_node = Node(item)
-        # Check if the linked list is None when head and tail is none
-        # Update head to new node 
-        if self.head == None and self.tail == None:
+        self.nodeCount += 1
+        # Check if the linked list is empty, then assign tail to new node
+        if self.head is None:
             self.tail = new_node
-            self.head = new_node
-        elif self.head == self.tail:  
-            self.head = new_node
-            self.head.next = self.tail
+        # Otherwise insert new node before head
         else:
-           # Otherwise insert new node before head
-        # Update head to new node regardless
+            self.head.previous = new_node
             new_node.next = self.head
-            self.head = new_node
+        # Update head to new node regardless
+        self.head = new_node
+        return new_node
+
+    def remove_node(self, node):
+        """Unlink the given node of this linked list.
+        Running time: O(1), since the node knows both of its neighbours."""
+        if node.previous is None:
+            self.head = node.next
+        else:
+            node.previous.next = node.next
+        if node.next is None:
+            self.tail = node.previous
+        else:
+            node.next.previous = node.previous
+        node.next = None
+        node.previous = None
+        self.nodeCount -= 1
+
+    def move_to_front(self, node):
+        """Move the given node of this linked list to the head: O(1)"""
+        if node is self.head:
+            return
+        self.remove_node(node)
+        node.next = self.head
+        self.head.previous = node
+        self.head = node
+        self.nodeCount += 1
 
     def delete(self, item):
         """Delete the given item from this linked list, or raise ValueError"""
@@ -115,30 +146,13 @@ class LinkedList(object):
         not present and we need to loop through all n nodes in the list."""
         # Start at the head node
         current = self.head
-        # Keep track of the node before the one containing the given tiem
-        previous = None
         # Loop until we have found the given item or the current node is None
         while current is not None:
             # Check if the current node's data matches the given item
             if current.data == item:
-            # If we found data matching the given item check for the following 3 cases
-                # Check if we found a node in the middle of this linked list
-                if current is not self.head and current is not self.tail:
-                    previous.next = current.next
-                    current.next = None
-                    break
-                # Check if we found a node at the head
-                if current is self.head:
-                    self.head = current.next
-                    current.next = None
-                # Check if we found a node at the tail
-                if current is self.tail:
-                    if previous is not None:
-                        previous.next = None
-                    self.tail = previous
+                # Both neighbours are known, so unlinking it is O(1)
+                self.remove_node(current)
                 return
-            # Update tail to the previous node regardless
-            previous = current
             current = current.next
         # Otherwise raise an error to tell the user that delete has failed
         raise ValueError('Item not found: {}'.format(item))
@@ -163,6 +177,87 @@ class LinkedList(object):
         # We never found data satisfying quality, but have to return something
         return None  # Constant time to return None
 
+    # The *_entry methods below treat every item as a (key, value, hash)
+    # entry, which is how HashTable stores its buckets. Each of them walks
+    # the list once and compares keys directly, so no quality function is
+    # allocated per call. Nodes whose stored hash differs from key_hash are
+    # skipped with one int comparison, without calling the key's __eq__.
+
+    def find_entry(self, key, key_hash):
+        """Return the (key, value, hash) entry with the given key, or None.
+        Worst case running time: O(n) if the key is near the tail or missing."""
+        current = self.head
+        while current is not None:
+            data = current.data
+            if data[2] == key_hash and data[0] == key:
+                return data
+            current = current.next
+        return None
+
+    def set_entry(self, key, key_hash, value):
+        """Replace the value of the entry with the given key in place, or
+        append a new entry. Return the replaced entry, or None if appended.
+        Running time: O(n) for the single traversal, the append is O(1)."""
+        current = self.head
+        while current is not None:
+            data = current.data
+            if data[2] == key_hash and data[0] == key:
+                current.data = (key, value, key_hash)
+                return data
+            current = current.next
+        self.append((key, value, key_hash))
+        return None
+
+    def merge_entry(self, key, key_hash, value, function):
+        """Replace the value of the entry with the given key by
+        function(old value, value) in place, or append (key, value, hash)
+        if there is no such entry. Return the updated entry, or None if
+        appended."""
+        current = self.head
+        while current is not None:
+            data = current.data
+            if data[2] == key_hash and data[0] == key:
+                current.data = entry = (key, function(data[1], value),
+                                        key_hash)
+                return entry
+            current = current.next
+        self.append((key, value, key_hash))
+        return None
+
+    def setdefault_entry(self, key, key_hash, value):
+        """Return the entry with the given key, or append (key, value, hash)
+        and return None if there is no such entry"""
+        found = self.find_entry(key, key_hash)
+        if found is None:
+            self.append((key, value, key_hash))
+        return found
+
+    def replace_entry(self, key, key_hash, expected, value):
+        """Replace the value of the entry with the given key only if it is
+        equal to expected. Return True if the entry was replaced, or False."""
+        current = self.head
+        while current is not None:
+            data = current.data
+            if data[2] == key_hash and data[0] == key:
+                if data[1] != expected:
+                    return False
+                current.data = (key, value, key_hash)
+                return True
+            current = current.next
+        return False
+
+    def pop_entry(self, key, key_hash):
+        """Remove and return the entry with the given key, or return None.
+        Unlinks the node found during the walk instead of searching again."""
+        current = self.head
+        while current is not None:
+            data = current.data
+            if data[2] == key_hash and data[0] == key:
+                self.remove_node(current)
+                return data
+            current = current.next
+        return None
+
     def replace(self, quality, new_data):
         """replace an item from this linked list satisfying the given quality
         Best case running time: Omega(1) if item is near the head of the list.
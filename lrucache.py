@@ -0,0 +1,184 @@
+#!python
+
+import functools
+import sys
+import time
+
+from hashtable import HashTable
+from linkedlist import LinkedList
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+# Separates positional from keyword arguments in memoize keys, and marks a
+# result that was not cached
+_MARKER = object()
+
+
+class LRUCache(object):
+    """Bounded cache evicting the least recently used entry first.
+    A HashTable maps each key to its node in a doubly-linked LinkedList kept
+    in recency order, most recent at the head, so get, put, moving an entry
+    to the front and evicting from the tail are all O(1).
+
+    Entries may also expire after ttl seconds, and the cache may be bounded
+    by the total size of its values in bytes as well as by entry count."""
+
+    def __init__(self, capacity=128, ttl=None, max_bytes=None, sizeof=None,
+                 clock=time.monotonic):
+        """Initialize an empty cache holding at most capacity entries.
+        ttl is the default number of seconds an entry lives (None for no
+        expiry). max_bytes bounds the sum of sizeof(value) over all entries,
+        where sizeof defaults to sys.getsizeof."""
+        if capacity is not None and capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self.clock = clock
+        self.table = HashTable()
+        # Node data is (key, value, expiry time or None, size in bytes)
+        self.order = LinkedList()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __repr__(self):
+        """Return a string representation of this cache"""
+        return 'LRUCache({})'.format(repr(self.items()))
+
+    def __len__(self):
+        """Return the number of entries, including expired ones that have
+        not been noticed yet"""
+        return self.table.size
+
+    def __contains__(self, key):
+        """Return True if the cache holds an unexpired entry for the given
+        key, without counting it as a use"""
+        node = self.table.get(key, None)
+        return node is not None and not self._expired(node)
+
+    def _expired(self, node):
+        """Return True if the node's entry has expired"""
+        expires = node.data[2]
+        return expires is not None and self.clock() >= expires
+
+    def _remove(self, node):
+        """Remove the node's entry from the cache"""
+        self.order.remove_node(node)
+        self.table.delete(node.data[0])
+        self.total_bytes -= node.data[3]
+
+    def _evict(self):
+        """Evict least recently used entries until the cache is in bounds"""
+        while self.order.tail is not None and (
+                (self.capacity is not None and
+                 self.table.size > self.capacity) or
+                (self.max_bytes is not None and
+                 self.total_bytes > self.max_bytes)):
+            node = self.order.tail
+            if self._expired(node):
+                self.expirations += 1
+            else:
+                self.evictions += 1
+            self._remove(node)
+
+    def get(self, key, default=_MISSING):
+        """Return the cached value of the given key and mark it as most
+        recently used. If it is missing or expired, return default if given,
+        or raise KeyError."""
+        node = self.table.get(key, None)
+        if node is not None:
+            if not self._expired(node):
+                self.hits += 1
+                self.order.move_to_front(node)
+                return node.data[1]
+            self.expirations += 1
+            self._remove(node)
+        self.misses += 1
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def put(self, key, value, ttl=_MISSING):
+        """Cache value for the given key as the most recently used entry,
+        evicting others if needed. ttl overrides the cache's default."""
+        if ttl is _MISSING:
+            ttl = self.ttl
+        expires = None if ttl is None else self.clock() + ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        node = self.table.get(key, None)
+        if node is None:
+            node = self.order.prepend((key, value, expires, size))
+            self.table.set(key, node)
+        else:
+            self.total_bytes -= node.data[3]
+            node.data = (key, value, expires, size)
+            self.order.move_to_front(node)
+        self.total_bytes += size
+        self._evict()
+
+    def delete(self, key):
+        """Remove the given key from the cache, or raise KeyError"""
+        self._remove(self.table.get(key))
+
+    def expire(self):
+        """Remove every expired entry and return how many were removed.
+        Running time: O(n), unlike the lazy checks done on each access."""
+        removed = 0
+        current = self.order.head
+        while current is not None:
+            following = current.next
+            if self._expired(current):
+                self._remove(current)
+                removed += 1
+            current = following
+        self.expirations += removed
+        return removed
+
+    def clear(self):
+        """Remove every entry, keeping the counters"""
+        self.table.clear()
+        self.order = LinkedList()
+        self.total_bytes = 0
+
+    def items(self):
+        """Return a list of (key, value) pairs, most recently used first"""
+        return [(data[0], data[1]) for data in self.order]
+
+    def stats(self):
+        """Return the hit, miss, eviction and expiry counters as a dict"""
+        lookups = self.hits + self.misses
+        return {
+            'size': self.table.size,
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+def memoize(capacity=128, ttl=None, max_bytes=None, sizeof=None):
+    """Decorator caching a function's results in an LRUCache, keyed by its
+    arguments, which must be hashable. The cache is available as the
+    wrapper's cache attribute."""
+    def decorator(function):
+        cache = LRUCache(capacity, ttl, max_bytes, sizeof)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key = args
+            if kwargs:
+                key += (_MARKER,) + tuple(sorted(kwargs.items()))
+            result = cache.get(key, _MARKER)
+            if result is _MARKER:
+                result = function(*args, **kwargs)
+                cache.put(key, result)
+            return result
+        wrapper.cache = cache
+        return wrapper
+    return decorator
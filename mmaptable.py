@@ -0,0 +1,237 @@
+#!python
+
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+from collections.abc import Mapping
+
+from hashing import encode_key
+
+# File layout, all integers little-endian:
+#   header        magic, version, bucket count, entry count
+#   bucket index  bucket count + 1 offsets into the entry region; bucket i
+#                 holds the entries between offsets i and i + 1
+#   entry region  entries grouped by bucket, each one a key hash, key length
+#                 and value length followed by the pickled key and value
+# The key hash is taken over the key's encode_key bytes rather than its
+# pickle, which is not canonical: equal keys, e.g. tuples of shared or
+# distinct but equal strs, or frozensets in another process, may pickle
+# differently, but always encode alike.
+MAGIC = b'HTMM'
+VERSION = 2
+HEADER = struct.Struct('<4sIQQ')
+OFFSET = struct.Struct('<Q')
+ENTRY = struct.Struct('<QII')
+PICKLE_PROTOCOL = 4
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+
+
+def serialize_key(key):
+    """Return the pickled bytes a key is stored as"""
+    return pickle.dumps(key, protocol=PICKLE_PROTOCOL)
+
+
+def key_hash(key_bytes):
+    """Return a 64-bit hash of the given bytes that, unlike hash(), is the
+    same in every process"""
+    digest = hashlib.blake2b(key_bytes, digest_size=8).digest()
+    return OFFSET.unpack(digest)[0]
+
+
+def _type_bytes(key):
+    """Return bytes naming the type of a key that encode_key cannot encode
+    by value"""
+    key_type = type(key)
+    return 'o{}.{}'.format(key_type.__module__,
+                           key_type.__qualname__).encode('utf-8')
+
+
+def stable_hash(key):
+    """Return a 64-bit hash of the given key that is the same in every
+    process and equal for equal keys. Keys that encode_key cannot encode by
+    value (other than None, numbers, str, bytes, and tuples and frozensets
+    of those) all hash alike within their type, so they can be stored and
+    found, but lookups among many of them are O(n)."""
+    return key_hash(encode_key(key, _type_bytes))
+
+
+def save_table(items, path):
+    """Write the given (key, value) pairs to path in the snapshot format.
+    The file is written next to path and renamed over it when complete."""
+    entries = []
+    for key, value in items:
+        entries.append((stable_hash(key), serialize_key(key),
+                        pickle.dumps(value, protocol=PICKLE_PROTOCOL)))
+    bucket_count = 1
+    while bucket_count < len(entries):
+        bucket_count *= 2
+    entries.sort(key=lambda entry: entry[0] % bucket_count)
+
+    temp_path = '{}.tmp'.format(path)
+    with open(temp_path, 'wb') as output:
+        output.write(HEADER.pack(MAGIC, VERSION, bucket_count, len(entries)))
+        # Bucket offsets are relative to the start of the entry region
+        offsets = []
+        offset = 0
+        position = 0
+        for bucket in range(bucket_count):
+            offsets.append(offset)
+            while (position < len(entries) and
+                   entries[position][0] % bucket_count == bucket):
+                offset += (ENTRY.size + len(entries[position][1]) +
+                           len(entries[position][2]))
+                position += 1
+        offsets.append(offset)
+        output.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+        for entry_hash, key_bytes, value_bytes in entries:
+            output.write(ENTRY.pack(entry_hash, len(key_bytes),
+                                    len(value_bytes)))
+            output.write(key_bytes)
+            output.write(value_bytes)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(temp_path, path)
+
+
+class MmapHashTable(Mapping):
+    """Read-only hash table served straight from a snapshot file written by
+    HashTable.save. The file is memory-mapped, so opening it is O(1), pages
+    are only read as lookups touch them, and processes that open the same
+    file share one copy in the page cache.
+
+    Keys are found by stable_hash and then compared with ==, like HashTable
+    does, so they are best kept to the types encode_key encodes by value."""
+
+    def __init__(self, path):
+        """Open the snapshot file at path"""
+        with open(path, 'rb') as snapshot:
+            self._mmap = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, self.bucket_count, self.size = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('Not a HashTable snapshot: {}'.format(path))
+        if version != VERSION:
+            self.close()
+            raise ValueError('Unsupported snapshot version: {}'.format(version))
+        self._index_offset = HEADER.size
+        self._data_offset = HEADER.size + OFFSET.size * (self.bucket_count + 1)
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'MmapHashTable({} entries)'.format(self.size)
+
+    def __enter__(self):
+        """Return this hash table for use in a with statement"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close this hash table at the end of a with statement"""
+        self.close()
+
+    def close(self):
+        """Unmap the snapshot file"""
+        if self._mmap is not None:
+            self._view.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __len__(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def __iter__(self):
+        """Iterate over the keys in file order"""
+        return self.keys()
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self._find_value(key) is not None
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self.get(key)
+
+    def _bucket_range(self, bucket):
+        """Return the start and end file offsets of the given bucket"""
+        start, end = struct.unpack_from(
+            '<QQ', self._mmap, self._index_offset + OFFSET.size * bucket)
+        return self._data_offset + start, self._data_offset + end
+
+    def _find_value(self, key):
+        """Return the (start, end) offsets of the pickled value of the given
+        key, or None if the key is not in the file"""
+        wanted_hash = stable_hash(key)
+        position, end = self._bucket_range(wanted_hash % self.bucket_count)
+        view = self._view
+        key_bytes = None
+        while position < end:
+            entry_hash, key_length, value_length = \
+                ENTRY.unpack_from(self._mmap, position)
+            key_start = position + ENTRY.size
+            value_start = key_start + key_length
+            # The hash rules out most entries before any key is compared.
+            # Identical pickles are equal keys, so the key is only unpickled
+            # when they differ; comparing the memoryview does not copy it.
+            if entry_hash == wanted_hash:
+                if key_bytes is None:
+                    key_bytes = serialize_key(key)
+                stored = view[key_start:value_start]
+                if stored == key_bytes or pickle.loads(stored) == key:
+                    return value_start, value_start + value_length
+            position = value_start + value_length
+        return None
+
+    def _entries(self):
+        """Iterate over (key start, value start, value end) file offsets"""
+        position = self._data_offset
+        end = self._bucket_range(self.bucket_count - 1)[1]
+        while position < end:
+            entry_hash, key_length, value_length = \
+                ENTRY.unpack_from(self._mmap, position)
+            key_start = position + ENTRY.size
+            value_start = key_start + key_length
+            position = value_start + value_length
+            yield key_start, value_start, position
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        found = self._find_value(key)
+        if found is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return pickle.loads(self._view[found[0]:found[1]])
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def keys(self):
+        """Iterate over all keys, loading one at a time"""
+        view = self._view
+        for key_start, value_start, end in self._entries():
+            yield pickle.loads(view[key_start:value_start])
+
+    def values(self):
+        """Iterate over all values, loading one at a time"""
+        view = self._view
+        for key_start, value_start, end in self._entries():
+            yield pickle.loads(view[value_start:end])
+
+    def items(self):
+        """Iterate over all (key, value) pairs, loading one at a time"""
+        view = self._view
+        for key_start, value_start, end in self._entries():
+            yield (pickle.loads(view[key_start:value_start]),
+                   pickle.loads(view[value_start:end]))
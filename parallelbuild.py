@@ -0,0 +1,198 @@
+#!python
+
+import os
+import pickle
+from collections.abc import MutableMapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from hashing import fibonacci_index
+from hashtable import HashTable
+from mmaptable import MmapHashTable, save_table, stable_hash
+
+# Marks an argument that was not passed, since None is a valid value
+_MISSING = object()
+
+
+class PartitionedHashTable(MutableMapping):
+    """Hash table made of independent partition tables, such as the
+    snapshots parallel_build returns. Each key lives in the partition picked
+    by the high bits of its hash, so lookups go straight to one partition's
+    table. Changes need partitions that allow them, e.g. HashTables."""
+
+    def __init__(self, partitions, stable=False):
+        """Initialize this hash table from a power-of-two number of
+        partition tables, which must already be split by partition_index
+        with the same stable argument"""
+        self.partition_bits = len(partitions).bit_length() - 1
+        if len(partitions) != 1 << self.partition_bits:
+            raise ValueError('The number of partitions must be a power of two')
+        self.partitions = partitions
+        self.stable = stable
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'PartitionedHashTable({} partitions, {} entries)'.format(
+            len(self.partitions), len(self))
+
+    def _partition(self, key):
+        """Return the partition table the given key belongs to"""
+        return self.partitions[partition_index(key, self.partition_bits,
+                                               self.stable)]
+
+    def __len__(self):
+        """Return the number of entries in every partition"""
+        return sum(len(table) for table in self.partitions)
+
+    def __iter__(self):
+        """Iterate over the keys of every partition"""
+        for table in self.partitions:
+            for key in table:
+                yield key
+
+    def __contains__(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self._partition(key).contains(key)
+
+    def __getitem__(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        return self._partition(key).get(key)
+
+    def __setitem__(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self._partition(key).set(key, value)
+
+    def __delitem__(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        self._partition(key).delete(key)
+
+    def get(self, key, default=_MISSING):
+        """Return the value associated with the given key. If the key is
+        missing, return default if given, or raise KeyError"""
+        return self._partition(key).get(key, default)
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return key in self
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value"""
+        self[key] = value
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError"""
+        del self[key]
+
+    def length(self):
+        """Return the number of entries in this hash table"""
+        return len(self)
+
+    def merge(self, **table_options):
+        """Return a single HashTable holding every entry"""
+        table = HashTable(**table_options)
+        table.reserve(len(self))
+        for partition in self.partitions:
+            table.set_many(partition.items())
+        return table
+
+
+def partition_index(key, bits, stable=False):
+    """Return the partition of the given key among 2 ** bits partitions.
+    If stable is True, the partition is the same in every process, at the
+    cost of encoding the key to hash it with stable_hash."""
+    if stable:
+        return fibonacci_index(stable_hash(key), bits)
+    return fibonacci_index(hash(key), bits)
+
+
+def _route_chunk(pairs, bits, snapshot_dir, chunk):
+    """Worker: split one chunk of (key, value) pairs by the partition of
+    their keys, and write each partition's share to a run file"""
+    routed = [[] for i in range(1 << bits)]
+    for pair in pairs:
+        routed[partition_index(pair[0], bits, True)].append(pair)
+    for index, run in enumerate(routed):
+        with open(_run_path(snapshot_dir, index, chunk), 'wb') as output:
+            pickle.dump(run, output, pickle.HIGHEST_PROTOCOL)
+
+
+def _build_partition(snapshot_dir, index, chunks):
+    """Worker: merge the run files of one partition, in chunk order so
+    later pairs win, and save them as the partition's snapshot"""
+    # A dict dedupes with the same hash and == as HashTable, at a fraction
+    # of the cost, and the snapshot does not depend on the table it came
+    # from
+    entries = {}
+    for chunk in range(chunks):
+        path = _run_path(snapshot_dir, index, chunk)
+        with open(path, 'rb') as run:
+            entries.update(pickle.load(run))
+        os.remove(path)
+    save_table(entries.items(), _snapshot_path(snapshot_dir, index))
+
+
+def parallel_build(items, snapshot_dir, workers=None, partitions=None):
+    """Build a partitioned snapshot of the given (key, value) pairs with a
+    process pool, and return a read-only PartitionedHashTable serving it.
+    Later pairs for the same key win, as with set_many. Keys and values
+    must be picklable.
+
+    The parent only cuts items into one contiguous chunk per worker and
+    pickles it over. Each worker routes its chunk by the stable_hash of the
+    keys and writes one run file per partition; then each partition's runs
+    are merged and saved by a worker as snapshot_dir/partition-<n>.snapshot.
+    Nothing is sent back, so hashing, routing and building all run in the
+    workers, and any process can open the same files with open_partitioned.
+    Call merge() on the result for a single HashTable, at the cost of one
+    pass over every entry in the parent."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if partitions is None:
+        partitions = workers
+    count = 1
+    while count < partitions:
+        count *= 2
+    bits = count.bit_length() - 1
+
+    if not isinstance(items, Sequence):
+        items = list(items)
+    chunks = max(1, min(workers, len(items)))
+    ranges = [items[chunk * len(items) // chunks:
+                    (chunk + 1) * len(items) // chunks]
+              for chunk in range(chunks)]
+    try:
+        if workers <= 1:
+            for chunk, pairs in enumerate(ranges):
+                _route_chunk(pairs, bits, snapshot_dir, chunk)
+            for index in range(count):
+                _build_partition(snapshot_dir, index, chunks)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # list() waits for every task and raises the first error
+                list(pool.map(_route_chunk, ranges, [bits] * chunks,
+                              [snapshot_dir] * chunks, range(chunks)))
+                list(pool.map(_build_partition, [snapshot_dir] * count,
+                              range(count), [chunks] * count))
+    finally:
+        # Runs are only left behind by a build that failed
+        for index in range(count):
+            for chunk in range(chunks):
+                path = _run_path(snapshot_dir, index, chunk)
+                if os.path.exists(path):
+                    os.remove(path)
+    return open_partitioned(snapshot_dir, count)
+
+
+def _run_path(directory, index, chunk):
+    return os.path.join(directory, 'partition-{}.run-{}'.format(index, chunk))
+
+
+def _snapshot_path(directory, index):
+    return os.path.join(directory, 'partition-{}.snapshot'.format(index))
+
+
+def open_partitioned(snapshot_dir, partitions):
+    """Return a read-only PartitionedHashTable serving the partition
+    snapshots that parallel_build wrote to snapshot_dir"""
+    return PartitionedHashTable(
+        [MmapHashTable(_snapshot_path(snapshot_dir, index))
+         for index in range(partitions)], stable=True)
@@ -0,0 +1,208 @@
+#!python
+
+from hashing import fibonacci_index
+
+# Slot distance marking a free slot in the distances array
+EMPTY = -1
+
+
+class RobinHoodHashTable(object):
+    """Hash table using open addressing with Robin Hood displacement.
+    Has the same interface as HashTable, but keeps its entries in flat
+    parallel arrays instead of LinkedList buckets, so there are no per-entry
+    nodes or tuples and each probe is a step to the neighbouring slot.
+
+    A key's home slot is picked by Fibonacci hashing of its hash, not by its
+    low bits, since ints hash to themselves and keys with a power-of-two
+    stride would otherwise all share a few home slots."""
+
+    def __init__(self, init_size=8, max_load_factor=0.85):
+        """Initialize this hash table with room for at least init_size slots"""
+        if init_size < 1:
+            raise ValueError('init_size must be at least 1')
+        if not 0 < max_load_factor < 1:
+            raise ValueError('max_load_factor must be between 0 and 1')
+        self.max_load_factor = max_load_factor
+        self.size = 0
+        self._allocate(self._capacity_for(init_size))
+
+    def __str__(self):
+        """Return a formatted string representation of this hash table"""
+        items = ['{}: {}'.format(repr(k), repr(v)) for k, v in self.items()]
+        return '{' + ', '.join(items) + '}'
+
+    def __repr__(self):
+        """Return a string representation of this hash table"""
+        return 'RobinHoodHashTable({})'.format(repr(self.items()))
+
+    @staticmethod
+    def _capacity_for(slots):
+        """Return the smallest power of two that is at least slots"""
+        capacity = 1
+        while capacity < slots:
+            capacity *= 2
+        return capacity
+
+    def _allocate(self, capacity):
+        """Replace the slot arrays with capacity empty slots"""
+        # Slot i holds hashes[i], slot_keys[i] and slot_values[i], and
+        # distances[i] is how far the entry sits from its home slot
+        self.hashes = [0] * capacity
+        self.slot_keys = [None] * capacity
+        self.slot_values = [None] * capacity
+        self.distances = [EMPTY] * capacity
+        self.mask = capacity - 1
+        self.bits = capacity.bit_length() - 1
+
+    def _find_slot(self, key):
+        """Return the slot index holding the given key, or -1 if not found.
+        Stops as soon as it reaches a slot whose entry is closer to its home
+        than the key would be, since Robin Hood insertion would have placed
+        the key there."""
+        key_hash = hash(key)
+        mask = self.mask
+        distances = self.distances
+        hashes = self.hashes
+        slot_keys = self.slot_keys
+        index = fibonacci_index(key_hash, self.bits)
+        distance = 0
+        while distances[index] >= distance:
+            if hashes[index] == key_hash and slot_keys[index] == key:
+                return index
+            distance += 1
+            index = (index + 1) & mask
+        return -1
+
+    def _insert_new(self, key_hash, key, value, index, distance):
+        """Place an entry known to be absent, starting the probe at index.
+        Whenever the entry is further from home than the slot's occupant it
+        takes the slot, and the displaced occupant continues the probe."""
+        mask = self.mask
+        distances = self.distances
+        hashes = self.hashes
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        while True:
+            current = distances[index]
+            if current == EMPTY:
+                hashes[index] = key_hash
+                slot_keys[index] = key
+                slot_values[index] = value
+                distances[index] = distance
+                return
+            if current < distance:
+                hashes[index], key_hash = key_hash, hashes[index]
+                slot_keys[index], key = key, slot_keys[index]
+                slot_values[index], value = value, slot_values[index]
+                distances[index], distance = distance, current
+            distance += 1
+            index = (index + 1) & mask
+
+    def resize(self, new_size):
+        """Rebuild this hash table with at least new_size slots.
+        Running time: O(n + m) for n entries and m slots."""
+        capacity = self._capacity_for(new_size)
+        if self.size > self.max_load_factor * capacity:
+            raise ValueError('new_size is too small to hold every entry')
+        old_entries = zip(self.distances, self.hashes,
+                          self.slot_keys, self.slot_values)
+        self._allocate(capacity)
+        bits = self.bits
+        # Stored hashes mean no key is hashed again
+        for distance, key_hash, key, value in old_entries:
+            if distance != EMPTY:
+                self._insert_new(key_hash, key, value,
+                                 fibonacci_index(key_hash, bits), 0)
+
+    def reserve(self, count):
+        """Grow this hash table so it can hold count entries without resizing"""
+        capacity = self._capacity_for(int(count / self.max_load_factor) + 1)
+        if capacity > len(self.distances):
+            self.resize(capacity)
+
+    def load_factor(self):
+        """Return the fraction of slots that hold an entry"""
+        return self.size / len(self.distances)
+
+    def keys(self):
+        """Return a list of all keys in this hash table"""
+        # O(m) for m slots
+        return [key for key, distance in zip(self.slot_keys, self.distances)
+                if distance != EMPTY]
+
+    def values(self):
+        """Return a list of all values in this hash table"""
+        return [value for value, distance
+                in zip(self.slot_values, self.distances) if distance != EMPTY]
+
+    def items(self):
+        """Return a list of all items (key-value pairs) in this hash table"""
+        return [(key, value) for key, value, distance
+                in zip(self.slot_keys, self.slot_values, self.distances)
+                if distance != EMPTY]
+
+    def length(self):
+        """Return the number of entries in this hash table: O(1)"""
+        return self.size
+
+    def contains(self, key):
+        """Return True if this hash table contains the given key, or False"""
+        return self._find_slot(key) != -1
+
+    def get(self, key):
+        """Return the value associated with the given key, or raise KeyError"""
+        index = self._find_slot(key)
+        if index == -1:
+            raise KeyError(key)
+        return self.slot_values[index]
+
+    def set(self, key, value):
+        """Insert or update the given key with its associated value.
+        Average case running time: O(1); a resize is O(n)."""
+        key_hash = hash(key)
+        mask = self.mask
+        distances = self.distances
+        index = fibonacci_index(key_hash, self.bits)
+        distance = 0
+        # Probe for an existing entry up to the point it would have been
+        # placed; the new entry then goes in from there
+        while distances[index] >= distance:
+            if (self.hashes[index] == key_hash and
+                    self.slot_keys[index] == key):
+                self.slot_values[index] = value
+                return
+            distance += 1
+            index = (index + 1) & mask
+        if self.size + 1 > self.max_load_factor * len(distances):
+            self.resize(len(distances) * 2)
+            index = fibonacci_index(key_hash, self.bits)
+            distance = 0
+        self._insert_new(key_hash, key, value, index, distance)
+        self.size += 1
+
+    def delete(self, key):
+        """Delete the given key from this hash table, or raise KeyError.
+        Uses backward-shift deletion: the entries after the removed one are
+        moved one slot back towards home, so no tombstones are left behind."""
+        index = self._find_slot(key)
+        if index == -1:
+            raise KeyError(key)
+        mask = self.mask
+        distances = self.distances
+        hashes = self.hashes
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        following = (index + 1) & mask
+        # Shift back until an empty slot or an entry already in its home slot
+        while distances[following] > 0:
+            hashes[index] = hashes[following]
+            slot_keys[index] = slot_keys[following]
+            slot_values[index] = slot_values[following]
+            distances[index] = distances[following] - 1
+            index = following
+            following = (following + 1) & mask
+        hashes[index] = 0
+        slot_keys[index] = None
+        slot_values[index] = None
+        distances[index] = EMPTY
+        self.size -= 1
@@ -0,0 +1,53 @@
+#!python
+
+import random
+
+
+class KeySampler(object):
+    """Dense index of a HashTable's keys for O(1) uniform random sampling.
+    Keys live in a list, and a second table maps each key to its position,
+    so a deleted key is replaced by the last key instead of leaving a gap."""
+
+    def __init__(self, keys=(), seed=None):
+        """Initialize this index with the given keys and a random number
+        generator seeded with seed, so samples can be reproduced"""
+        # Imported here, since HashTable itself imports this module
+        from hashtable import HashTable
+        self.rng = random.Random(seed)
+        self.keys = []
+        self.positions = HashTable()
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        """Return the number of indexed keys"""
+        return len(self.keys)
+
+    def add(self, key):
+        """Index a key that was just inserted: O(1)"""
+        self.positions.set(key, len(self.keys))
+        self.keys.append(key)
+
+    def remove(self, key):
+        """Drop a key that was just deleted, moving the last key into its
+        position: O(1)"""
+        position = self.positions.pop(key)
+        last = self.keys.pop()
+        if position < len(self.keys):
+            self.keys[position] = last
+            self.positions.set(last, position)
+
+    def clear(self):
+        """Drop every key"""
+        self.keys = []
+        self.positions.clear()
+
+    def choice(self):
+        """Return a uniformly random key: O(1)"""
+        return self.keys[self.rng.randrange(len(self.keys))]
+
+    def sample(self, count, replace=False):
+        """Return count random keys, distinct unless replace is True: O(count)"""
+        if replace:
+            return self.rng.choices(self.keys, k=count)
+        return self.rng.sample(self.keys, count)
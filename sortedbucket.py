@@ -0,0 +1,179 @@
+#!python
+
+from bisect import bisect_left
+
+# Key types whose ordering agrees with equality, so a bucket holding only
+# these can be binary searched. Keys of other types, e.g. tuples that may
+# hold anything or frozensets that are only partially ordered, are compared
+# one by one instead.
+ORDERED_TYPES = frozenset([int, float, str, bytes, bool])
+
+
+def orderable(key):
+    """Return True if the given key can be binary searched for"""
+    # NaN is not equal to itself, so it has no place in a sorted order
+    return type(key) in ORDERED_TYPES and key == key
+
+
+class SortedBucket(object):
+    """HashTable bucket keeping its (key, value, hash) entries sorted by key
+    in an array, so a key is found by binary search in O(log n) comparisons
+    rather than by walking a chain. HashTable turns a bucket into one of
+    these when it grows past TREEIFY_THRESHOLD entries, like Java 8 treeifies
+    its bins.
+
+    Once it holds a key that is not orderable, or keys that cannot be
+    compared with each other (e.g. ints and strs), the bucket falls back to
+    scanning a parallel list of the stored hashes, and only compares the
+    keys whose hash matches. That scan runs in C over a list, which is
+    still much faster than walking a linked list."""
+
+    __slots__ = ('keys', 'hashes', 'entries', 'ordered')
+
+    def __init__(self, iterable=None):
+        """Initialize this bucket with the given entries, if any, whose keys
+        must be distinct"""
+        self.keys = []
+        self.hashes = []
+        self.entries = []
+        self.ordered = True
+        if iterable is not None:
+            entries = list(iterable)
+            keys = [entry[0] for entry in entries]
+            if all(orderable(key) for key in keys):
+                # Sorting a copy, since a sort that fails partway (e.g. on
+                # ints and strs) leaves its list partly reordered
+                try:
+                    entries = sorted(entries, key=lambda entry: entry[0])
+                except TypeError:
+                    self.ordered = False
+                else:
+                    keys = [entry[0] for entry in entries]
+            else:
+                self.ordered = False
+            self.keys = keys
+            self.hashes = [entry[2] for entry in entries]
+            self.entries = entries
+
+    def __repr__(self):
+        """Return a string representation of this bucket"""
+        return 'SortedBucket({})'.format(repr(self.entries))
+
+    def __iter__(self):
+        """Iterate over the entries of this bucket, in key order"""
+        return iter(self.entries)
+
+    def _find(self, key, key_hash):
+        """Return the index of the entry with the given key, or -1.
+        Running time: O(log n) for orderable keys, otherwise O(n)."""
+        keys = self.keys
+        if self.ordered and orderable(key):
+            try:
+                index = bisect_left(keys, key)
+            except TypeError:
+                # Keys of an orderable type never equal keys of a type they
+                # cannot be compared with
+                return -1
+            if index < len(keys) and keys[index] == key:
+                return index
+            return -1
+        hashes = self.hashes
+        index = -1
+        while True:
+            try:
+                index = hashes.index(key_hash, index + 1)
+            except ValueError:
+                return -1
+            if keys[index] == key:
+                return index
+
+    def _insert(self, entry):
+        """Add an entry whose key is not in this bucket yet"""
+        key = entry[0]
+        if self.ordered:
+            if orderable(key):
+                try:
+                    index = bisect_left(self.keys, key)
+                except TypeError:
+                    self.ordered = False
+                else:
+                    self.keys.insert(index, key)
+                    self.hashes.insert(index, entry[2])
+                    self.entries.insert(index, entry)
+                    return
+            else:
+                self.ordered = False
+        self.keys.append(key)
+        self.hashes.append(entry[2])
+        self.entries.append(entry)
+
+    def items(self):
+        """Return a list of all entries in this bucket: O(n)"""
+        return list(self.entries)
+
+    def length(self):
+        """Return the number of entries in this bucket: O(1)"""
+        return len(self.entries)
+
+    def append(self, entry):
+        """Add an entry whose key is not in this bucket yet, keeping the
+        entries sorted: O(log n) comparisons plus an O(n) array insert"""
+        self._insert(entry)
+
+    def find_entry(self, key, key_hash):
+        """Return the (key, value, hash) entry with the given key, or None"""
+        index = self._find(key, key_hash)
+        if index < 0:
+            return None
+        return self.entries[index]
+
+    def set_entry(self, key, key_hash, value):
+        """Replace the value of the entry with the given key in place, or
+        add a new entry. Return the replaced entry, or None if added."""
+        index = self._find(key, key_hash)
+        if index < 0:
+            self._insert((key, value, key_hash))
+            return None
+        old_entry = self.entries[index]
+        self.entries[index] = (key, value, key_hash)
+        return old_entry
+
+    def merge_entry(self, key, key_hash, value, function):
+        """Replace the value of the entry with the given key by
+        function(old value, value) in place, or add (key, value, hash) if
+        there is no such entry. Return the updated entry, or None if added."""
+        index = self._find(key, key_hash)
+        if index < 0:
+            self._insert((key, value, key_hash))
+            return None
+        entries = self.entries
+        entries[index] = entry = (key, function(entries[index][1], value),
+                                  key_hash)
+        return entry
+
+    def setdefault_entry(self, key, key_hash, value):
+        """Return the entry with the given key, or add (key, value, hash) and
+        return None if there is no such entry"""
+        index = self._find(key, key_hash)
+        if index < 0:
+            self._insert((key, value, key_hash))
+            return None
+        return self.entries[index]
+
+    def replace_entry(self, key, key_hash, expected, value):
+        """Replace the value of the entry with the given key only if it is
+        equal to expected. Return True if the entry was replaced, or False."""
+        index = self._find(key, key_hash)
+        if index < 0 or self.entries[index][1] != expected:
+            return False
+        self.entries[index] = (key, value, key_hash)
+        return True
+
+    def pop_entry(self, key, key_hash):
+        """Remove and return the entry with the given key, or return None"""
+        index = self._find(key, key_hash)
+        if index < 0:
+            return None
+        del self.keys[index]
+        del self.hashes[index]
+        return self.entries.pop(index)
@@ -0,0 +1,69 @@
+#!python
+
+from aggregate import (aggregate, chunks, count, count_words, read_words,
+                       top_k)
+from hashtable import HashTable
+import io
+import os
+import tempfile
+import unittest
+
+
+class AggregateTest(unittest.TestCase):
+
+    def test_chunks(self):
+        assert list(chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+        assert list(chunks([], 2)) == []
+
+    def test_count(self):
+        counts = count(iter('abracadabra'), chunk_size=3)
+        assert dict(counts.items()) == {'a': 5, 'b': 2, 'r': 2, 'c': 1,
+                                        'd': 1}
+        count('aa', counts)  # Adds to the existing counts
+        assert counts.get('a') == 7
+
+    def test_aggregate(self):
+        pairs = [('x', 3), ('y', 1), ('x', 7), ('y', 2)]
+        assert dict(aggregate(pairs).items()) == {'x': 10, 'y': 3}
+        assert dict(aggregate(pairs, max).items()) == {'x': 7, 'y': 2}
+
+    def test_aggregate_failing_partway(self):
+        table = HashTable()
+        with self.assertRaises(TypeError):
+            aggregate([('x', 1), ('y', 2), ('x', 'x')], table=table)
+        assert len(table) == 2
+        # The table is still whole, so the stream can be resumed into it
+        count('xz', table)
+        assert dict(table.items()) == {'x': 2, 'y': 2, 'z': 1}
+
+    def test_read_words(self):
+        text = 'one two  three\nfour\tfive six '
+        words = ['one', 'two', 'three', 'four', 'five', 'six']
+        for block_size in (1, 3, 4, 100):
+            chunks = read_words(io.StringIO(text), block_size)
+            assert [word for chunk in chunks for word in chunk] == words
+        chunks = read_words(io.BytesIO(b'a bc d'), 3)
+        assert [word for chunk in chunks for word in chunk] == [b'a', b'bc',
+                                                               b'd']
+        lines = ['one two', 'three']
+        assert list(read_words(lines)) == [['one', 'two', 'three']]
+
+    def test_count_words_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'words.txt')
+            with open(path, 'w') as file:
+                file.write('to be or not to be\n' * 100)
+            counts = count_words(path, block_size=7)
+        assert dict(counts.items()) == {'to': 200, 'be': 200, 'or': 100,
+                                        'not': 100}
+
+    def test_top_k(self):
+        table = HashTable()
+        table.update({'a': 5, 'b': 9, 'c': 1, 'd': 7})
+        assert top_k(table, 2) == [('b', 9), ('d', 7)]
+        assert top_k(table, 10) == [('b', 9), ('d', 7), ('a', 5), ('c', 1)]
+        assert top_k(table, 1, key=lambda value: -value) == [('c', 1)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+#!python
+
+from benchmark import BACKENDS, WORKLOADS, compare, run_suite, run_workload
+import json
+import unittest
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_every_workload_runs_on_every_backend(self):
+        results = run_suite(BACKENDS, sorted(WORKLOADS), ['int', 'str'], [50])
+        assert len(results['results']) == len(BACKENDS) * len(WORKLOADS) * 2
+        for result in results['results']:
+            assert result['ops_per_sec'] > 0
+            assert result['peak_memory_bytes'] > 0
+        json.dumps(results)  # Results are machine-readable
+
+    def test_latency_percentiles(self):
+        result = run_workload(BACKENDS[1], 'read', 'int', 100, memory=False)
+        latency = result['latency_ns']
+        assert latency['p50'] <= latency['p90'] <= latency['p99']
+        assert latency['p99'] <= latency['max']
+        assert 'peak_memory_bytes' not in result
+
+    def test_compare(self):
+        old = {'results': [{'backend': 'dict', 'workload': 'read',
+                            'key_type': 'int', 'size': 10,
+                            'ops_per_sec': 100.0}]}
+        new = {'results': [dict(old['results'][0], ops_per_sec=95.0)]}
+        assert compare(old, new, threshold=0.10) == []
+        new['results'][0]['ops_per_sec'] = 80.0
+        assert compare(old, new, threshold=0.10) == [
+            (('dict', 'read', 'int', 10), 100.0, 80.0)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!python
+
+from bloomfilter import CountingBloomFilter
+import unittest
+
+
+class CountingBloomFilterTest(unittest.TestCase):
+
+    def test_init(self):
+        bloom = CountingBloomFilter(1000, 0.01)
+        assert len(bloom) == 0
+        assert bloom.hash_count == 7
+        assert 9000 < len(bloom.counters) < 10000  # About 9.6 per key
+        with self.assertRaises(ValueError):
+            CountingBloomFilter(0)
+        with self.assertRaises(ValueError):
+            CountingBloomFilter(10, 1.5)
+
+    def test_no_false_negatives(self):
+        hash_codes = [hash('key{}'.format(n)) for n in range(1000)]
+        bloom = CountingBloomFilter(1000, 0.01, hash_codes)
+        assert len(bloom) == 1000
+        assert all(bloom.might_contain(code) for code in hash_codes)
+        bloom.add(-12345)  # hash() may be negative
+        assert bloom.might_contain(-12345)
+
+    def test_false_positive_rate(self):
+        bloom = CountingBloomFilter(2000, 0.05, range(2000))
+        passed = sum(bloom.might_contain(code)
+                     for code in range(10000, 30000))
+        assert passed / 20000 < 0.08
+        assert 0.03 < bloom.expected_false_positive_rate() < 0.07
+        stats = bloom.stats()
+        assert stats['checks'] == 20000
+        assert stats['rejections'] == 20000 - passed
+
+    def test_remove(self):
+        bloom = CountingBloomFilter(100, 0.01, range(100))
+        for code in range(50):
+            bloom.remove(code)
+        assert len(bloom) == 50
+        assert all(bloom.might_contain(code) for code in range(50, 100))
+        rejected = sum(not bloom.might_contain(code) for code in range(50))
+        assert rejected > 40
+        bloom.clear()
+        assert len(bloom) == 0
+        assert not any(bloom.might_contain(code) for code in range(100))
+        assert not any(bloom.counters)
+
+    def test_saturated_counters_are_kept(self):
+        bloom = CountingBloomFilter(10, 0.5)
+        for i in range(300):
+            bloom.add(7)
+        for i in range(300):
+            bloom.remove(7)
+        assert bloom.might_contain(7)  # Stuck counters never give a miss
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+#!python
+
+from chainbench import KEY_SETS, STRATEGIES, chain_lengths, run
+from hashing import BuiltinHash, SipHash
+import unittest
+
+
+class ChainBenchTest(unittest.TestCase):
+
+    def test_every_key_set_runs_with_every_strategy(self):
+        results = run(sorted(STRATEGIES), sorted(KEY_SETS), [100])
+        assert len(results) == len(STRATEGIES) * len(KEY_SETS)
+        for result in results:
+            assert result['max_chain_length'] >= 1
+            assert result['mean_successful_probes'] >= 1
+
+    def test_equal_hash_keys(self):
+        keys = KEY_SETS['equal-hash'](200, None)
+        assert chain_lengths(BuiltinHash(), keys)['max_chain_length'] == 200
+        assert chain_lengths(SipHash(0), keys)['max_chain_length'] < 10
+
+
+if __name__ == '__main__':
+    unittest.main()
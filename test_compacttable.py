@@ -0,0 +1,125 @@
+#!python
+
+from compacttable import CompactHashTable, index_typecode
+import pickle
+import random
+import unittest
+
+
+class CompactHashTableTest(unittest.TestCase):
+
+    def test_init(self):
+        ht = CompactHashTable()
+        assert len(ht.indices) == 16  # Room for 8 entries
+        assert ht.usable == 10
+        assert ht.indices.typecode == 'b'
+        assert ht.length() == 0
+        ht = CompactHashTable(100)
+        assert ht.usable >= 100
+
+    def test_index_typecode(self):
+        assert index_typecode(8) == 'b'
+        assert index_typecode(128) == 'b'
+        assert index_typecode(256) == 'h'
+        assert index_typecode(1 << 16) in ('i', 'q')
+
+    def test_set_get_delete(self):
+        ht = CompactHashTable()
+        ht.set('I', 1)
+        ht['V'] = 5
+        ht.set('X', 10)
+        assert ht.get('I') == 1
+        assert ht['V'] == 5
+        assert ht.get('A', None) is None
+        with self.assertRaises(KeyError):
+            ht.get('A')
+        ht.set('I', 2)
+        assert ht.get('I') == 2
+        assert len(ht) == 3
+        ht.delete('V')
+        assert 'V' not in ht
+        assert ht.contains('X')
+        with self.assertRaises(KeyError):
+            ht.delete('V')
+        assert ht.pop('V', None) is None
+        assert ht.setdefault('L', 50) == 50
+        assert ht.setdefault('L', 0) == 50
+
+    def test_insertion_order(self):
+        ht = CompactHashTable()
+        keys = ['k{}'.format(i) for i in range(100)]
+        for key in keys:
+            ht.set(key, key.upper())
+        assert list(ht) == keys
+        ht.set('k0', 'updated')  # Updates keep their position
+        ht.delete('k1')
+        ht.set('k1', 'back')  # Re-inserted keys go to the end
+        assert list(ht.keys()) == keys[:1] + keys[2:] + ['k1']
+        assert list(ht.values())[0] == 'updated'
+        assert list(ht.items())[-1] == ('k1', 'back')
+
+    def test_index_widens(self):
+        ht = CompactHashTable()
+        for i in range(1000):
+            ht.set(i, i)
+        assert ht.indices.typecode == 'h'
+        assert all(ht.get(i) == i for i in range(1000))
+
+    def test_compaction(self):
+        ht = CompactHashTable()
+        for i in range(100):
+            ht.set(i, i)
+        capacity = len(ht.indices)
+        for i in range(50):
+            ht.delete(i)
+        assert ht.deleted == 50
+        ht.delete(50)  # Holes now outnumber live entries
+        assert ht.deleted == 0
+        assert len(ht.entry_keys) == 49
+        assert len(ht.indices) < capacity
+        assert list(ht) == list(range(51, 100))
+        ht.compact()
+        assert list(ht.values()) == list(range(51, 100))
+
+    def test_random_operations(self):
+        rng = random.Random(0)
+        ht = CompactHashTable()
+        expected = {}
+        for step in range(5000):
+            key = rng.randrange(300)
+            if rng.random() < 0.4:
+                assert ht.pop(key, None) == expected.pop(key, None)
+            else:
+                ht.set(key, step)
+                expected[key] = step
+        assert list(ht.items()) == list(expected.items())
+        assert len(ht) == len(expected)
+
+    def test_colliding_hashes(self):
+        ht = CompactHashTable()
+        keys = [-1, -2] + [i << 40 for i in range(20)]  # hash(-1) == hash(-2)
+        for key in keys:
+            ht.set(key, key)
+        assert [ht.get(key) for key in keys] == keys
+
+    def test_modified_during_iteration(self):
+        ht = CompactHashTable()
+        ht.update({'a': 1, 'b': 2})
+        with self.assertRaises(RuntimeError):
+            for key in ht:
+                ht.set(key + '!', 0)
+
+    def test_clear_and_pickle(self):
+        ht = CompactHashTable()
+        ht.update((i, str(i)) for i in range(50))
+        copy = pickle.loads(pickle.dumps(ht))
+        assert list(copy.items()) == list(ht.items())
+        ht.clear()
+        assert len(ht) == 0
+        assert list(ht) == []
+        ht.set('a', 1)
+        assert ht.get('a') == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
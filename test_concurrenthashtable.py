@@ -0,0 +1,167 @@
+#!python
+
+from concurrenthashtable import ConcurrentHashTable
+import sys
+import threading
+import unittest
+
+
+class CollidingKey(object):
+    """Key whose instances all share one hash, and which cannot be ordered,
+    so they fill a SortedBucket that is scanned by hash"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return 7
+
+    def __eq__(self, other):
+        return (isinstance(other, CollidingKey) and
+                self.value == other.value)
+
+
+class ConcurrentHashTableTest(unittest.TestCase):
+
+    def test_init(self):
+        ht = ConcurrentHashTable(stripes=5)
+        assert len(ht.stripes) == 8  # Rounded up to a power of two
+        assert len(ht) == 0
+
+    def test_set_get_delete(self):
+        ht = ConcurrentHashTable()
+        ht.set('I', 1)
+        ht['V'] = 5
+        assert ht.get('I') == 1
+        assert ht['V'] == 5
+        assert ht.contains('V') is True
+        assert 'A' not in ht
+        assert ht.get('A', None) is None
+        with self.assertRaises(KeyError):
+            ht.get('A')
+        ht.delete('I')
+        assert ht.pop('V') == 5
+        assert ht.pop('V', 0) == 0
+        with self.assertRaises(KeyError):
+            del ht['V']
+        assert len(ht) == 0
+
+    def test_keys_spread_over_stripes(self):
+        ht = ConcurrentHashTable(stripes=8)
+        for i in range(800):
+            ht.set(i, i)
+        assert len(ht) == 800
+        sizes = [stripe.table.size for stripe in ht.stripes]
+        assert min(sizes) > 50
+        self.assertCountEqual(ht.keys(), range(800))
+        self.assertCountEqual(ht.values(), range(800))
+        assert dict(ht.items()) == dict((i, i) for i in range(800))
+
+    def test_atomic_operations(self):
+        ht = ConcurrentHashTable()
+        assert ht.setdefault('I', 1) == 1
+        assert ht.setdefault('I', 2) == 1
+        assert ht.increment('count') == 1
+        assert ht.increment('count', 5) == 6
+        assert ht.compare_and_set('count', 6, 10) is True
+        assert ht.compare_and_set('count', 6, 11) is False
+        assert ht.get('count') == 10
+        ht.clear()
+        assert len(ht) == 0
+
+    def test_concurrent_increments(self):
+        ht = ConcurrentHashTable(stripes=4)
+        threads = 8
+        rounds = 500
+
+        def work():
+            for i in range(rounds):
+                ht.increment(i % 50)
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert sum(ht.values()) == threads * rounds
+        assert all(ht.get(i) == threads * rounds // 50 for i in range(50))
+
+    def test_reads_during_writes(self):
+        ht = ConcurrentHashTable(stripes=2)
+        for i in range(100):
+            ht.set(i, i)
+        errors = []
+        done = threading.Event()
+
+        def write():
+            # Grows and shrinks the stripes while readers run
+            for i in range(100, 3000):
+                ht.set(i, i)
+            for i in range(100, 3000):
+                ht.delete(i)
+            done.set()
+
+        def read():
+            while not done.is_set():
+                for i in range(100):
+                    if ht.get(i, None) != i:
+                        errors.append(i)
+
+        workers = [threading.Thread(target=write)]
+        workers += [threading.Thread(target=read) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert errors == []
+        assert len(ht) == 100
+
+    def test_reads_during_writes_to_sorted_bucket(self):
+        ht = ConcurrentHashTable(stripes=1, min_load_factor=0)
+        keys = [CollidingKey(i) for i in range(40)]
+        for key in keys[:20]:
+            ht.set(key, key.value)
+        errors = []
+        done = threading.Event()
+
+        def write():
+            # Inserting and removing keys resizes the SortedBucket's
+            # parallel lists while readers scan them
+            try:
+                for _ in range(300):
+                    for i in range(20, 40):
+                        ht.set(CollidingKey(i), i)
+                    for i in range(20, 40):
+                        ht.delete(CollidingKey(i))
+            finally:
+                done.set()
+
+        def read():
+            try:
+                while not done.is_set():
+                    # Looking up the keys that come and go scans to the
+                    # end of the lists, where they change
+                    for key in keys:
+                        value = ht.get(key, None)
+                        if value != key.value and key.value < 20:
+                            errors.append(key.value)
+            except Exception as error:
+                errors.append(error)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            workers = [threading.Thread(target=write)]
+            workers += [threading.Thread(target=read) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert errors == []
+        assert len(ht) == 20
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!python
+
+import durable
+from durable import DurableHashTable, encode_record, read_records
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+
+class DurableHashTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def files(self, prefix):
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith(prefix))
+
+    def test_replay_on_open(self):
+        with DurableHashTable(self.directory) as table:
+            table.set('I', 1)
+            table['V'] = [5, 'five']
+            table.set(('X', 10), None)
+            table.set('I', 2)
+            table.delete('V')
+            assert table.pop('V', None) is None
+            with self.assertRaises(KeyError):
+                table.delete('V')
+            assert len(table) == 2
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'I': 2, ('X', 10): None}
+            assert table.get('V', 0) == 0
+            with self.assertRaises(KeyError):
+                table.get('V')
+            table.clear()
+            table.update({'L': 50}, C=100)
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'L': 50, 'C': 100}
+
+    def test_policies(self):
+        with self.assertRaises(ValueError):
+            DurableHashTable(self.directory, fsync='sometimes')
+        for policy in durable.FSYNC_POLICIES:
+            directory = os.path.join(self.directory, policy)
+            table = DurableHashTable(directory, fsync=policy,
+                                     fsync_interval=0.01)
+            table.set_many((n, n * n) for n in range(100))
+            table.sync()
+            table.close()
+            with self.assertRaises(ValueError):
+                table.set(1, 1)
+            with DurableHashTable(directory) as table:
+                assert table[9] == 81
+                assert len(table) == 100
+
+    def test_unpicklable_value_changes_nothing(self):
+        with DurableHashTable(self.directory) as table:
+            with self.assertRaises(Exception):
+                table.set('lock', threading.Lock())
+            assert 'lock' not in table
+
+    def test_closed_table_changes_nothing(self):
+        table = DurableHashTable(self.directory)
+        table.set('I', 1)
+        table.close()
+        for change in (lambda: table.set('V', 5),
+                       lambda: table.pop('I'),
+                       lambda: table.set_many([('X', 10)]),
+                       lambda: table.update(L=50),
+                       table.clear):
+            with self.assertRaises(ValueError):
+                change()
+        assert dict(table.items()) == {'I': 1}
+
+    def test_failed_write_refuses_changes(self):
+        table = DurableHashTable(self.directory)
+        table.set('I', 1)
+
+        def write_half(descriptor, data):
+            # Leaves a torn record at the end of the log, like a full disk
+            os.write(descriptor, data[:len(data) // 2])
+            raise OSError(28, 'No space left on device')
+        table._write = write_half
+        with self.assertRaises(OSError):
+            table.set('V', 5)
+        for change in (lambda: table.set('X', 10),
+                       lambda: table.pop('I'),
+                       table.clear, table.sync):
+            with self.assertRaises(OSError):
+                change()
+        assert 'X' not in table and 'I' in table
+        table.close()
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'I': 1}
+            table.set('X', 10)  # The torn record was cut off on opening
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'I': 1, 'X': 10}
+
+    def test_torn_record_is_cut_off(self):
+        with DurableHashTable(self.directory) as table:
+            table.set('I', 1)
+            table.set('V', 5)
+        log, = self.files('log.')
+        path = os.path.join(self.directory, log)
+        size = os.path.getsize(path)
+        # The process stopped halfway through writing a third record
+        with open(path, 'ab') as file:
+            file.write(encode_record(durable.SET, b'partial', b'record')[:9])
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'I': 1, 'V': 5}
+            assert os.path.getsize(path) == size
+            table.set('X', 10)
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'I': 1, 'V': 5, 'X': 10}
+
+    def test_corrupt_record_ends_the_log(self):
+        records = [encode_record(durable.SET, b'k%d' % n, b'v')
+                   for n in range(3)]
+        data = bytearray(durable.LOG_HEADER.pack(durable.LOG_MAGIC, 1) +
+                         b''.join(records))
+        assert len(list(read_records(data))) == 3
+        data[-1] ^= 0xff
+        assert len(list(read_records(data))) == 2
+
+    def test_compaction(self):
+        with DurableHashTable(self.directory) as table:
+            for n in range(100):
+                table.set(n, str(n))
+            table.compact()
+            assert self.files('snapshot.') == ['snapshot.00000001']
+            assert self.files('log.') == ['log.00000002']
+            for n in range(50):
+                table.delete(n)
+            table.set('after', True)
+            table.compact()
+            assert self.files('snapshot.') == ['snapshot.00000002']
+            assert self.files('log.') == ['log.00000003']
+            table.set('last', True)
+            assert table.stats()['compactions'] == 2
+        with DurableHashTable(self.directory) as table:
+            expected = {n: str(n) for n in range(50, 100)}
+            expected.update(after=True, last=True)
+            assert dict(table.items()) == expected
+
+    def test_leftover_files_are_cleaned_up(self):
+        with DurableHashTable(self.directory) as table:
+            table.set('I', 1)
+            table.compact()
+            table.set('V', 5)
+        # As if the process stopped after writing a snapshot but before
+        # removing the files it replaced, and while writing another one
+        open(os.path.join(self.directory, 'log.00000001'), 'wb').close()
+        open(os.path.join(self.directory, 'snapshot.00000002.tmp'),
+             'wb').close()
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {'I': 1, 'V': 5}
+        assert sorted(os.listdir(self.directory)) == \
+            ['log.00000002', 'snapshot.00000001']
+
+    def test_background_compaction(self):
+        with DurableHashTable(self.directory, fsync='never',
+                              max_log_bytes=4096) as table:
+            for n in range(2000):
+                table.set(n % 300, n)
+            table.compactor.join()
+            assert table.stats()['compactions'] >= 1
+        with DurableHashTable(self.directory) as table:
+            assert dict(table.items()) == {n % 300: n
+                                           for n in range(2000 - 300, 2000)}
+
+    def test_group_commit(self):
+        with DurableHashTable(self.directory) as table:
+            def worker(start):
+                for n in range(start, start + 200):
+                    table.set(n, n)
+            threads = [threading.Thread(target=worker, args=(n * 1000,))
+                       for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            stats = table.stats()
+            assert stats['records'] == 1600
+            assert stats['commits'] <= 1600
+        with DurableHashTable(self.directory) as table:
+            assert len(table) == 1600
+
+
+if __name__ == '__main__':
+    unittest.main()
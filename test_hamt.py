@@ -0,0 +1,207 @@
+#!python
+
+from hamt import (BitmapNode, CollisionNode, PersistentHashTable,
+                  TransientHashTable)
+import pickle
+import random
+import unittest
+
+
+class Collider(object):
+    """Key whose hash is chosen by the test, to force collisions"""
+
+    def __init__(self, name, key_hash):
+        self.name = name
+        self.key_hash = key_hash
+
+    def __hash__(self):
+        return self.key_hash
+
+    def __eq__(self, other):
+        return isinstance(other, Collider) and self.name == other.name
+
+    def __repr__(self):
+        return 'Collider({!r})'.format(self.name)
+
+
+def depth(node):
+    """Return the number of levels of nodes under and including node"""
+    children = [item for item in node.items if type(item) is not tuple]
+    return 1 + max((depth(child) for child in children), default=0)
+
+
+class PersistentHashTableTest(unittest.TestCase):
+
+    def test_init(self):
+        table = PersistentHashTable()
+        assert table.length() == 0
+        assert list(table) == []
+        table = PersistentHashTable({'I': 1, 'V': 5})
+        assert len(table) == 2
+        table = PersistentHashTable([('I', 1), ('I', 2)])
+        assert dict(table.items()) == {'I': 2}
+
+    def test_set_returns_new_versions(self):
+        empty = PersistentHashTable()
+        one = empty.set('I', 1)
+        two = one.set('V', 5)
+        updated = two.set('I', 10)
+        assert len(empty) == 0 and 'I' not in empty
+        assert dict(one.items()) == {'I': 1}
+        assert dict(two.items()) == {'I': 1, 'V': 5}
+        assert dict(updated.items()) == {'I': 10, 'V': 5}
+        assert updated.get('I') == 10
+        assert two.get('I') == 1
+        assert two.set('V', two['V']) is two  # Same value: no new version
+        assert two.get('X', None) is None
+        with self.assertRaises(KeyError):
+            two.get('X')
+        with self.assertRaises(TypeError):
+            two['X'] = 10
+
+    def test_delete(self):
+        table = PersistentHashTable({'I': 1, 'V': 5, 'X': 10})
+        smaller = table.delete('V')
+        assert dict(smaller.items()) == {'I': 1, 'X': 10}
+        assert 'V' in table
+        with self.assertRaises(KeyError):
+            smaller.delete('V')
+        assert smaller.discard('V') is smaller
+        empty = smaller.delete('I').delete('X')
+        assert len(empty) == 0
+        assert list(empty.items()) == []
+
+    def test_structural_sharing(self):
+        table = PersistentHashTable((n, n) for n in range(10000))
+        updated = table.set(5, 'five')
+        # Only the nodes on the path to the key are new
+        shared = sum(1 for old, new in zip(table.root.items,
+                                           updated.root.items)
+                     if old is new)
+        assert shared == len(table.root.items) - 1
+        assert depth(table.root) <= 4  # log32(10000) levels, plus a few
+        assert table[5] == 5 and updated[5] == 'five'
+
+    def test_matches_dict(self):
+        rng = random.Random(0)
+        table = PersistentHashTable()
+        model = {}
+        versions = []
+        for i in range(3000):
+            key = rng.randrange(500)
+            if rng.random() < 0.6:
+                table = table.set(key, i)
+                model[key] = i
+            else:
+                table = table.discard(key)
+                model.pop(key, None)
+            if i % 300 == 0:
+                versions.append((table, dict(model)))
+        assert dict(table.items()) == model
+        assert len(table) == len(model)
+        for version, expected in versions:
+            assert dict(version.items()) == expected
+            assert len(version) == len(expected)
+
+    def test_collisions(self):
+        keys = [Collider(name, 42) for name in 'abcd']
+        table = PersistentHashTable()
+        for n, key in enumerate(keys):
+            table = table.set(key, n)
+        assert [table[key] for key in keys] == [0, 1, 2, 3]
+        assert Collider('e', 42) not in table
+        table = table.set(Collider('other', 42 + 32), 'x')  # Same first level
+        assert table[Collider('other', 74)] == 'x'
+        for key in keys[:3]:
+            table = table.delete(key)
+        assert dict(table.items()) == {keys[3]: 3, Collider('other', 74): 'x'}
+        # The last colliding key is pulled back up out of its CollisionNode
+        assert not any(isinstance(item, CollisionNode)
+                       for item in table.root.items)
+
+    def test_update_and_equality(self):
+        table = PersistentHashTable({'I': 1})
+        updated = table.update({'V': 5, 'X': 10})
+        assert len(table) == 1
+        assert updated == {'I': 1, 'V': 5, 'X': 10}
+        assert updated == PersistentHashTable([('X', 10), ('V', 5), ('I', 1)])
+
+    def test_pickle(self):
+        table = PersistentHashTable((n, str(n)) for n in range(100))
+        copy = pickle.loads(pickle.dumps(table))
+        assert copy == table
+        assert isinstance(copy, PersistentHashTable)
+
+
+class TransientHashTableTest(unittest.TestCase):
+
+    def test_mutation(self):
+        table = TransientHashTable()
+        table.set('I', 1)
+        table['V'] = 5
+        assert table.get('I') == 1
+        assert table['V'] == 5
+        assert table.length() == 2
+        table.delete('I')
+        assert 'I' not in table
+        with self.assertRaises(KeyError):
+            table.delete('I')
+        assert table.pop('V') == 5
+        assert table.pop('V', None) is None
+        assert len(table) == 0
+
+    def test_changes_in_place_until_snapshot(self):
+        table = TransientHashTable((n, n) for n in range(1000))
+        root = table.root
+        table.set(1, 'one')
+        assert table.root is root  # No copy: the transient owns its nodes
+        snapshot = table.snapshot()
+        table.set(2, 'two')
+        assert table.root is not root  # Shared with the snapshot: copied
+        assert snapshot[1] == 'one' and snapshot[2] == 2
+        assert table[2] == 'two'
+
+    def test_snapshots_are_isolated(self):
+        rng = random.Random(1)
+        table = TransientHashTable()
+        model = {}
+        snapshots = []
+        for i in range(3000):
+            key = rng.randrange(400)
+            if rng.random() < 0.6:
+                table[key] = i
+                model[key] = i
+            elif key in model:
+                del table[key]
+                del model[key]
+            if i % 250 == 0:
+                snapshots.append((table.snapshot(), dict(model)))
+        assert dict(table.items()) == model
+        for snapshot, expected in snapshots:
+            assert dict(snapshot.items()) == expected
+        table.clear()
+        assert len(table) == 0
+        assert len(snapshots[-1][0]) == len(snapshots[-1][1])
+
+    def test_iteration_sees_a_snapshot(self):
+        table = TransientHashTable((n, n) for n in range(100))
+        for key in table:
+            table.delete(key)
+            table.set(key + 1000, key)
+        assert len(table) == 100
+        assert min(table) == 1000
+
+    def test_transient_of_persistent(self):
+        table = PersistentHashTable((n, n) for n in range(100))
+        transient = table.transient()
+        for n in range(50):
+            del transient[n]
+        assert len(table) == 100
+        assert table[0] == 0
+        assert dict(transient.snapshot().items()) == \
+            {n: n for n in range(50, 100)}
+        assert isinstance(table.root, BitmapNode)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!python
+
+from hashing import (BuiltinHash, FibonacciHash, SipHash, encode_key,
+                     fibonacci_index, key_bytes, siphash24)
+import unittest
+
+
+class HashingTest(unittest.TestCase):
+
+    def test_fibonacci_index(self):
+        assert fibonacci_index(12345, 0) == 0
+        assert all(0 <= fibonacci_index(n, 4) < 16 for n in range(100))
+        # Strided values spread over every index
+        assert len(set(fibonacci_index(n << 12, 3) for n in range(64))) == 8
+
+    def test_siphash24(self):
+        # Test vectors from the SipHash paper's reference implementation
+        k0, k1 = 0x0706050403020100, 0x0f0e0d0c0b0a0908
+        assert siphash24(k0, k1, b'') == 0x726fdb47dd0e0e31
+        assert siphash24(k0, k1, bytes(range(15))) == 0xa129ca6149be45e5
+
+    def test_key_bytes(self):
+        assert key_bytes('a') == b'a'
+        assert key_bytes(b'a') == b'a'
+        assert key_bytes(1) == key_bytes(1.0) == key_bytes(True)
+        assert key_bytes(-1) != key_bytes(-2)  # Unlike hash()
+        assert key_bytes(0.5) != key_bytes(0)
+        assert key_bytes((1, 2)) == key_bytes((1.0, 2))
+        assert key_bytes((-1,)) != key_bytes((-2,))  # Items by value too
+        assert key_bytes(frozenset('ab')) == key_bytes(frozenset('ba'))
+        assert key_bytes(frozenset([-1])) != key_bytes(frozenset([-2]))
+
+    def test_encode_key(self):
+        assert encode_key(1) == encode_key(1.0) == encode_key(True)
+        assert encode_key(0.5) != encode_key(0)
+        assert encode_key('a') != encode_key(b'a')
+        assert encode_key(('ab', 'c')) != encode_key(('a', 'bc'))
+        assert encode_key((1, ('x', None))) == encode_key((1.0, ('x', None)))
+        assert encode_key(frozenset('abc')) == encode_key(frozenset('cba'))
+        with self.assertRaises(TypeError):
+            encode_key(object())
+        def other(key):
+            return b'?'
+        assert encode_key((object(), 1), other) == \
+            encode_key((object(), 1.0), other)
+
+    def test_table_size(self):
+        assert BuiltinHash().table_size(10) == 10
+        assert FibonacciHash().table_size(10) == 16
+        assert FibonacciHash().table_size(16) == 16
+        assert FibonacciHash().table_size(1) == 1
+
+    def test_index_in_range(self):
+        for strategy in (BuiltinHash(), FibonacciHash(), SipHash()):
+            for count in (1, 8, 64):
+                for key in range(-50, 50):
+                    assert 0 <= strategy.index(key, count) < count
+
+    def test_index_is_slot_of_hash_code(self):
+        for strategy in (BuiltinHash(), FibonacciHash(), SipHash()):
+            for key in ['a', (1, 'b'), -3, 2 ** 70]:
+                key_hash = strategy.hash_code(key)
+                assert (strategy.slot(key_hash, 64) ==
+                        strategy.index(key, 64))
+
+    def test_siphash_seed(self):
+        assert SipHash(1).index('key', 1 << 30) == SipHash(1).index('key', 1 << 30)
+        assert SipHash(1).seed != SipHash(2).seed
+        assert SipHash().seed != SipHash().seed
+        assert SipHash(bytes(16)).seed == bytes(16)
+        with self.assertRaises(ValueError):
+            SipHash(b'short')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!python
+
+from hashjoin import Partitions, group_by, hash_join
+import operator
+import os
+import random
+import tempfile
+import unittest
+
+
+def nested_loop_join(build, probe, key, probe_key):
+    return [(left, right) for right in probe for left in build
+            if key(left) == probe_key(right)]
+
+
+class HashJoinTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.users = [(n, 'user{}'.format(n)) for n in range(300)]
+        self.orders = [(rng.randrange(400), order) for order in range(2000)]
+        self.expected = sorted(nested_loop_join(
+            self.users, self.orders, operator.itemgetter(0),
+            operator.itemgetter(0)))
+
+    def test_partitions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            partitions = Partitions(4, directory=directory)
+            pairs = [(n % 10, n) for n in range(3000)]
+            for key, value in pairs:
+                partitions.add(key, value)
+            assert len(os.listdir(directory)) == 4
+            read = [list(partitions.read(index)) for index in range(4)]
+            assert sorted(pair for part in read for pair in part) == \
+                sorted(pairs)
+            for index, part in enumerate(read):
+                assert all(partitions.index(key) == index for key, value in
+                           part)
+            partitions.discard(0)
+            assert len(os.listdir(directory)) == 3
+            partitions.close()
+            assert os.listdir(directory) == []
+
+    def test_join_in_memory(self):
+        joined = hash_join(self.users, self.orders, operator.itemgetter(0))
+        assert sorted(joined) == self.expected
+        # Probe records keep their order when nothing is spilled
+        joined = list(hash_join(self.users, self.orders,
+                                operator.itemgetter(0)))
+        probes = [order for user, order in joined]
+        assert probes == [order for order in self.orders
+                          if order[0] < 300]
+
+    def test_join_spills(self):
+        with tempfile.TemporaryDirectory() as directory:
+            joined = hash_join(self.users, self.orders,
+                               operator.itemgetter(0), memory_budget=2000,
+                               partitions=4, directory=directory)
+            first = next(joined)
+            assert os.listdir(directory)  # Partitions are on disk
+            assert sorted([first] + list(joined)) == self.expected
+            assert os.listdir(directory) == []
+
+    def test_join_probe_key_and_duplicates(self):
+        build = [('a', 1), ('b', 2), ('a', 3)]
+        probe = [{'name': 'a'}, {'name': 'c'}, {'name': 'a'}]
+        for budget in (1 << 20, 0):
+            joined = list(hash_join(build, probe, operator.itemgetter(0),
+                                    operator.itemgetter('name'),
+                                    memory_budget=budget))
+            assert len(joined) == 4
+            assert sorted(left for left, right in joined) == \
+                [('a', 1), ('a', 1), ('a', 3), ('a', 3)]
+
+    def test_skewed_key_stops_splitting(self):
+        build = [('same', n) for n in range(500)]
+        probe = [('same', 'x'), ('other', 'y')]
+        joined = list(hash_join(build, probe, operator.itemgetter(0),
+                                memory_budget=100, partitions=2))
+        assert len(joined) == 500
+
+    def test_closing_early_removes_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            joined = hash_join(self.users, self.orders,
+                               operator.itemgetter(0), memory_budget=2000,
+                               directory=directory)
+            next(joined)
+            joined.close()
+            assert os.listdir(directory) == []
+
+
+class GroupByTest(unittest.TestCase):
+
+    def test_group_lists(self):
+        words = 'the cat and the hat and the bat'.split() * 50
+        for budget in (1 << 20, 500):
+            groups = dict(group_by(words, len, memory_budget=budget,
+                                   partitions=2))
+            assert sorted(groups) == [3]
+            assert sorted(groups[3]) == sorted(words)
+            groups = dict(group_by(words, lambda word: word[0],
+                                   value=str.upper, memory_budget=budget))
+            assert groups['t'] == ['THE'] * 150
+            assert sorted(groups['b']) == ['BAT'] * 50
+
+    def test_group_reduce(self):
+        rng = random.Random(1)
+        sales = [('store{}'.format(rng.randrange(200)), rng.randrange(100))
+                 for i in range(5000)]
+        expected = {}
+        for store, amount in sales:
+            expected[store] = expected.get(store, 0) + amount
+        with tempfile.TemporaryDirectory() as directory:
+            for budget in (1 << 20, 3000):
+                totals = group_by(sales, operator.itemgetter(0),
+                                  operator.itemgetter(1), operator.add,
+                                  memory_budget=budget, partitions=4,
+                                  directory=directory)
+                totals = list(totals)
+                assert len(totals) == len(expected)
+                assert dict(totals) == expected
+            assert os.listdir(directory) == []
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,35 @@
 #!python
 
+from hashing import FibonacciHash, SipHash
 from hashtable import HashTable
+from linkedlist import LinkedList
+from sortedbucket import SortedBucket
+from unrolledlist import UnrolledLinkedList
+import operator
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
 
 
+class CountedKey(object):
+    """Key that counts how often it is hashed"""
+
+    hashes = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        CountedKey.hashes += 1
+        return hash(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, CountedKey) and self.value == other.value
+
+
 class HashTableTest(unittest.TestCase):
 
     def test_init(self):
@@ -72,9 +98,9 @@ class HashTableTest(unittest.TestCase):
 
     def test_keys(self):
         ht = HashTable()
-        assert ht.keys() == []
+        assert list(ht.keys()) == []
         ht.set('I', 1)
-        assert ht.keys() == ['I']
+        assert list(ht.keys()) == ['I']
         ht.set('V', 5)
         self.assertCountEqual(ht.keys(), ['I', 'V'])  # Ignore item order
         ht.set('X', 10)
@@ -82,9 +108,9 @@ class HashTableTest(unittest.TestCase):
 
     def test_values(self):
         ht = HashTable()
-        assert ht.values() == []
+        assert list(ht.values()) == []
         ht.set('I', 1)
-        assert ht.values() == [1]
+        assert list(ht.values()) == [1]
         ht.set('V', 5)
         self.assertCountEqual(ht.values(), [1, 5])  # Ignore item order
         ht.set('X', 10)
@@ -92,14 +118,642 @@ class HashTableTest(unittest.TestCase):
 
     def test_items(self):
         ht = HashTable()
-        assert ht.items() == []
+        assert list(ht.items()) == []
         ht.set('I', 1)
-        assert ht.items() == [('I', 1)]
+        assert list(ht.items()) == [('I', 1)]
         ht.set('V', 5)
         self.assertCountEqual(ht.items(), [('I', 1), ('V', 5)])
         ht.set('X', 10)
         self.assertCountEqual(ht.items(), [('I', 1), ('V', 5), ('X', 10)])
 
+    def test_grows_past_max_load_factor(self):
+        ht = HashTable(4)
+        for i in range(100):
+            ht.set(i, i * i)
+        assert ht.length() == 100
+        assert ht.load_factor() <= ht.max_load_factor
+        for i in range(100):
+            assert ht.get(i) == i * i
+
+    def test_shrinks_below_min_load_factor(self):
+        ht = HashTable(4)
+        for i in range(200):
+            ht.set(i, i)
+        grown = len(ht.buckets)
+        for i in range(195):
+            ht.delete(i)
+        ht._finish_rehash()
+        assert len(ht.buckets) < grown
+        assert len(ht.buckets) >= 4
+        self.assertCountEqual(ht.keys(), [195, 196, 197, 198, 199])
+
+    def test_incremental_rehash(self):
+        ht = HashTable(64)
+        for i in range(48):
+            ht.set(i, str(i))
+        ht.set(48, '48')  # Crosses the max load factor and starts a resize
+        assert ht.old_buckets is not None
+        assert len(ht.buckets) == 128
+        # Every entry stays reachable while the resize is in progress
+        assert ht.get(3) == '3'
+        ht.set(3, 'three')
+        ht.delete(5)
+        assert ht.contains(5) is False
+        assert ht.length() == 48
+        assert ht.old_buckets is not None
+        ht._finish_rehash()
+        assert ht.old_buckets is None
+        assert ht.get(3) == 'three'
+        self.assertCountEqual(ht.keys(), [i for i in range(49) if i != 5])
+
+    def test_resize(self):
+        ht = HashTable(4)
+        ht.set('I', 1)
+        ht.set('V', 5)
+        ht.resize(32)
+        assert len(ht.buckets) == 32
+        assert ht.old_buckets is None
+        assert ht.get('I') == 1
+        assert ht.get('V') == 5
+        with self.assertRaises(ValueError):
+            ht.resize(0)
+
+    def test_reserve(self):
+        ht = HashTable(4)
+        ht.reserve(1000)
+        size = len(ht.buckets)
+        assert size * ht.max_load_factor >= 1000
+        for i in range(1000):
+            ht.set(i, i)
+        assert len(ht.buckets) == size  # No resize needed during the load
+        ht.delete(0)
+        assert len(ht.buckets) == size  # Reserved size is kept as the floor
+
+    def test_invalid_load_factors(self):
+        with self.assertRaises(ValueError):
+            HashTable(max_load_factor=0)
+        with self.assertRaises(ValueError):
+            HashTable(max_load_factor=1.0, min_load_factor=0.5)
+
+    def test_mapping_protocol(self):
+        ht = HashTable()
+        ht['I'] = 1
+        ht['V'] = 5
+        assert len(ht) == 2
+        assert ht['I'] == 1
+        assert 'V' in ht
+        assert 'X' not in ht
+        self.assertCountEqual(list(ht), ['I', 'V'])
+        del ht['I']
+        assert len(ht) == 1
+        with self.assertRaises(KeyError):
+            ht['I']
+        with self.assertRaises(KeyError):
+            del ht['I']
+        assert ht == {'V': 5}
+        assert dict(ht) == {'V': 5}
+
+    def test_get_with_default(self):
+        ht = HashTable()
+        ht.set('I', 1)
+        assert ht.get('I', 0) == 1
+        assert ht.get('A', None) is None
+        assert ht.get('A', 0) == 0
+
+    def test_setdefault(self):
+        ht = HashTable()
+        assert ht.setdefault('I', 1) == 1
+        assert ht.setdefault('I', 2) == 1
+        assert ht.setdefault('V') is None
+        assert ht.length() == 2
+
+    def test_pop(self):
+        ht = HashTable()
+        ht.set('I', 1)
+        assert ht.pop('I') == 1
+        assert ht.length() == 0
+        assert ht.pop('I', 'gone') == 'gone'
+        with self.assertRaises(KeyError):
+            ht.pop('I')
+
+    def test_update(self):
+        ht = HashTable()
+        ht.update({'I': 1, 'V': 4})
+        ht.update([('V', 5), ('X', 10)], L=50)
+        ht.update(HashTable())
+        assert ht.length() == 4
+        assert dict(ht.items()) == {'I': 1, 'V': 5, 'X': 10, 'L': 50}
+
+    def test_compare_and_set(self):
+        ht = HashTable()
+        ht.set('I', 1)
+        assert ht.compare_and_set('I', 1, 2) is True
+        assert ht.get('I') == 2
+        assert ht.compare_and_set('I', 1, 3) is False
+        assert ht.get('I') == 2
+        assert ht.compare_and_set('A', None, 1) is False
+        assert ht.contains('A') is False
+
+    def test_clear(self):
+        ht = HashTable(4)
+        for i in range(50):
+            ht.set(i, i)
+        ht.clear()
+        assert len(ht) == 0
+        assert len(ht.buckets) == 4
+        assert list(ht.items()) == []
+
+    def test_unrolled_buckets(self):
+        ht = HashTable(4, bucket_type=UnrolledLinkedList)
+        for i in range(100):
+            ht.set(i, i)
+        ht.set(7, 'seven')
+        for i in range(0, 100, 2):
+            ht.delete(i)
+        assert ht.length() == 50
+        assert ht.get(7) == 'seven'
+        assert ht.contains(8) is False
+        assert isinstance(ht.buckets[ht._bucket_index(7)], UnrolledLinkedList)
+
+    def test_set_many(self):
+        ht = HashTable(4)
+        ht.set_many([('I', 1), ('V', 4), ('V', 5)])  # Later pair wins
+        assert ht.length() == 2
+        assert ht.get('V') == 5
+        ht.set_many((i, i) for i in range(100))  # Iterable without a length
+        assert ht.length() == 102
+        assert ht.load_factor() <= ht.max_load_factor
+        assert ht.get_many(range(100)) == list(range(100))
+
+    def test_set_many_failing_partway(self):
+        ht = HashTable()
+        with self.assertRaises(TypeError):
+            ht.set_many([(1, 1), (2, 2), ([], 3)])  # Unhashable key
+        assert len(ht) == len(list(ht.items())) == 2
+
+        def pairs():
+            yield 3, 3
+            raise ValueError('stream failed')
+        with self.assertRaises(ValueError):
+            ht.set_many(pairs())
+        assert len(ht) == len(list(ht.items())) == 3
+
+    def test_get_many(self):
+        ht = HashTable()
+        ht.set_many([('I', 1), ('V', 5), ('X', 10)])
+        assert ht.get_many(['X', 'I', 'V', 'I']) == [10, 1, 5, 1]
+        assert ht.get_many(['X', 'A'], None) == [10, None]
+        with self.assertRaises(KeyError):
+            ht.get_many(['I', 'A'])
+
+    def test_contains_many(self):
+        ht = HashTable()
+        ht.set_many([('I', 1), ('V', 5)])
+        assert ht.contains_many(['V', 'A', 'I']) == [True, False, True]
+        assert ht.contains_many([]) == []
+
+    def test_delete_many(self):
+        ht = HashTable(4)
+        ht.set_many((i, i) for i in range(100))
+        assert ht.delete_many(range(0, 100, 2)) == 50
+        assert ht.delete_many([0, 1, 1]) == 1  # Missing keys are skipped
+        assert ht.length() == 49
+        assert ht.contains_many([1, 2, 3]) == [False, False, True]
+
+    def test_delete_many_failing_partway(self):
+        ht = HashTable()
+        ht.set_many((i, i) for i in range(5))
+        with self.assertRaises(TypeError):
+            ht.delete_many([0, 1, []])
+        assert len(ht) == len(list(ht.items())) == 3
+
+    def test_bulk_during_resize(self):
+        ht = HashTable(64)
+        for i in range(49):
+            ht.set(i, i)
+        assert ht.old_buckets is not None
+        assert ht.get_many([0, 48]) == [0, 48]
+        assert ht.contains_many([1, 100]) == [True, False]
+        ht.set_many(iter([(100, 100)]))
+        assert ht.delete_many([100, 101]) == 1
+        assert ht.length() == 49
+
+    def test_views_are_live(self):
+        ht = HashTable()
+        keys = ht.keys()
+        values = ht.values()
+        items = ht.items()
+        assert len(keys) == 0
+        ht.set('I', 1)
+        ht.set('V', 5)
+        assert len(keys) == 2
+        assert 'I' in keys
+        assert 'A' not in keys
+        assert 5 in values
+        assert ('V', 5) in items
+        assert ('V', 4) not in items
+        self.assertCountEqual(values, [1, 5])
+        self.assertCountEqual(items, [('I', 1), ('V', 5)])
+        assert keys == {'I', 'V'}  # Keys and items views are set-like
+
+    def test_str_and_repr(self):
+        ht = HashTable()
+        ht.set('I', 1)
+        assert str(ht) == "{'I': 1}"
+        assert repr(ht) == "HashTable([('I', 1)])"
+
+    def test_modified_during_iteration(self):
+        ht = HashTable()
+        ht.set_many([('I', 1), ('V', 5), ('X', 10)])
+        with self.assertRaises(RuntimeError):
+            for key in ht:
+                ht.set(key + key, 0)
+        with self.assertRaises(RuntimeError):
+            for key, value in ht.items():
+                ht.delete(key)
+        # Updating the values of existing keys is allowed
+        for key in ht:
+            ht.set(key, 0)
+            ht.get(key)
+
+    def test_stats_shape(self):
+        ht = HashTable(4)
+        stats = ht.stats()
+        assert stats['size'] == 0
+        assert stats['chain_length_histogram'] == {0: 4}
+        assert stats['max_chain_length'] == 0
+        assert 'operations' not in stats  # Counters are opt-in
+        for i in range(10):
+            ht.set(i, i)
+        stats = ht.stats()
+        assert stats['resize_count'] == 2
+        assert sum(stats['chain_length_histogram'].values()) == stats['buckets']
+        assert sum(length * count for length, count
+                   in stats['chain_length_histogram'].items()) == 10
+        assert stats['load_factor'] == 10 / stats['buckets']
+
+    def test_stats_counters(self):
+        ht = HashTable(1, max_load_factor=4, min_load_factor=0)  # One chain
+        ht.enable_stats()
+        ht.set('I', 1)
+        ht.set('V', 5)
+        ht['X'] = 10
+        assert ht.get('X') == 10  # Third entry in the chain
+        assert ht.contains('A') is False
+        ht.delete('I')
+        ht.get_many(['V'])
+        stats = ht.stats()
+        assert stats['operations']['set'] == 3
+        assert stats['operations']['get'] == 1
+        assert stats['operations']['contains'] == 1
+        assert stats['operations']['pop'] == 1
+        assert stats['operations']['get_many'] == 1
+        assert stats['hits'] == 3  # The get, the delete and the get_many
+        assert stats['misses'] == 4  # The three new keys and the contains
+        assert stats['mean_successful_probes'] == (3 + 1 + 1) / 3
+        assert stats['mean_failed_probes'] == (0 + 1 + 2 + 3) / 4
+
+    def test_stats_walk_buckets_once(self):
+        keys = [CountedKey(i) for i in range(5)]
+        plain = HashTable(4, min_load_factor=0)
+        ht = HashTable(4, min_load_factor=0)
+        ht.enable_stats()
+        for table in (plain, ht):
+            for key in keys:
+                table.set(key, key.value)
+        assert type(ht.buckets[0]) is not LinkedList  # Counting subclass
+        # The same incremental rehash steps run with and without stats
+        assert ht.rehash_index == plain.rehash_index
+        CountedKey.hashes = 0
+        assert ht.get(keys[3]) == 3
+        assert CountedKey.hashes == 1
+        assert ht.get('b', default=5) == 5
+        assert ht.pop('b', default=5) == 5
+        assert ht.setdefault('b', 2) == 2
+        assert ht.compare_and_set('b', 2, 3)
+        assert ht.contains_many(['b', 'c', 'd']) == [True, False, False]
+        stats = ht.stats()
+        assert stats['operations']['setdefault'] == 1
+        assert stats['operations']['compare_and_set'] == 1
+        assert stats['hits'] == 3
+        assert stats['misses'] == 5 + 5
+        ht.disable_stats()
+        assert type(ht.buckets[0]) is LinkedList
+        assert ht.bucket_type is LinkedList
+        assert 'sorted_bucket_type' not in vars(ht)
+
+    def test_stats_sorted_bucket_probes(self):
+        keys = [i * 64 for i in range(64)]  # One bucket
+        for bucket_type in (LinkedList, UnrolledLinkedList):
+            ht = HashTable(64, bucket_type=bucket_type, max_load_factor=100,
+                           min_load_factor=0)
+            ht.set_many((key, key) for key in keys)
+            ht.enable_stats()
+            assert type(ht.buckets[0]).__name__ == 'CountingSortedBucket'
+            ht.get_many(keys)
+            stats = ht.stats()
+            assert stats['hits'] == 64
+            assert stats['mean_successful_probes'] == 7  # Binary search
+            ht.set(64 * 64, 0)
+            copy = pickle.loads(pickle.dumps(ht))
+            assert type(copy.buckets[0]) is SortedBucket
+            assert copy.bucket_type is bucket_type
+            ht.disable_stats()
+            assert type(ht.buckets[0]) is SortedBucket
+
+    def test_stats_callback(self):
+        calls = []
+        ht = HashTable()
+        ht.enable_stats(lambda name, key, seconds: calls.append((name, key)))
+        ht.set('I', 1)
+        ht.get('I')
+        assert calls == [('set', 'I'), ('get', 'I')]
+        ht.disable_stats()
+        ht.get('I')
+        assert len(calls) == 2
+        assert 'get' not in vars(ht)  # Back to the plain method
+        assert 'operations' not in ht.stats()
+
+    def test_pickle(self):
+        ht = HashTable(4, bucket_type=UnrolledLinkedList)
+        ht.set_many((i, str(i)) for i in range(100))
+        ht.enable_stats()
+        copy = pickle.loads(pickle.dumps(ht))
+        assert dict(copy.items()) == dict(ht.items())
+        assert copy.bucket_type is UnrolledLinkedList
+        assert len(copy.buckets) == len(ht.buckets)
+        assert 'operations' not in copy.stats()
+        copy.set(100, '100')
+        assert copy.get(100) == '100'
+
+    def test_random_key(self):
+        ht = HashTable()
+        with self.assertRaises(KeyError):
+            ht.get_random_key()
+        ht.set_many((i, i * i) for i in range(10))
+        assert ht.get_random_key() in range(10)
+        key, value = ht.random_item()
+        assert value == key * key
+        assert sorted(ht.sample(10)) == list(range(10))
+        with self.assertRaises(ValueError):
+            ht.sample(11)
+        assert len(ht.sample(20, replace=True)) == 20
+
+    def test_sampling_index(self):
+        ht = HashTable()
+        ht.set_many((i, i) for i in range(50))
+        ht.enable_sampling(seed=7)
+        ht.set(50, 50)
+        ht.setdefault(51, 51)
+        ht.delete(0)
+        ht.pop(1)
+        ht.set_many([(52, 52), (2, 2)])
+        assert ht.delete_many([3, 4, 99]) == 2
+        expected = set(range(5, 53)) | {2}
+        assert set(ht._sampler.keys) == expected
+        assert set(ht.sample(len(ht))) == expected
+        assert all(ht.get_random_key() in expected for i in range(100))
+        ht.clear()
+        assert ht._sampler.keys == []
+        with self.assertRaises(KeyError):
+            ht.get_random_key()
+
+    def test_sampling_seed(self):
+        first = HashTable()
+        second = HashTable()
+        for ht in (first, second):
+            ht.set_many((i, i) for i in range(100))
+            ht.enable_sampling(seed=42)
+        assert first.sample(10) == second.sample(10)
+        assert (first.sample(10, replace=True) ==
+                second.sample(10, replace=True))
+        assert ([first.get_random_key() for i in range(10)] ==
+                [second.get_random_key() for i in range(10)])
+
+    def test_hash_strategy(self):
+        for strategy in (FibonacciHash(), SipHash(0)):
+            ht = HashTable(5, hash_strategy=strategy)
+            ht.set_many((i << 12, i) for i in range(100))
+            for i in range(100, 120):
+                ht.set(i << 12, i)
+            assert ht.get_many([0, 5 << 12]) == [0, 5]
+            assert ht.contains_many([1 << 12, 1]) == [True, False]
+            assert ht.delete_many([0, 1]) == 1
+            ht.delete(1 << 12)
+            assert len(ht) == 118
+            assert sorted(ht.values()) == list(range(2, 120))
+            assert ht.stats()['max_chain_length'] < 10
+            copy = pickle.loads(pickle.dumps(ht))
+            assert copy.get(119 << 12) == 119
+
+    def test_siphash_tuple_keys_do_not_collide(self):
+        # These tuples all have the same hash(), as their only items do
+        modulus = sys.hash_info.modulus
+        keys = [(i * modulus,) for i in range(300)]
+        ht = HashTable(hash_strategy=SipHash(0), min_load_factor=0)
+        ht.set_many((key, i) for i, key in enumerate(keys))
+        assert ht.stats()['max_chain_length'] < 10
+        assert ht.get_many(keys) == list(range(300))
+
+    def test_fibonacci_power_of_two(self):
+        ht = HashTable(5, hash_strategy=FibonacciHash())
+        assert len(ht.buckets) == 8
+        ht.reserve(100)
+        assert len(ht.buckets) == 256
+        ht.resize(300)
+        assert len(ht.buckets) == 512
+
+    def test_merge_and_increment(self):
+        ht = HashTable()
+        assert ht.increment('a') == 1
+        assert ht.increment('a', 5) == 6
+        assert ht.merge('b', [1], list.__add__) == [1]
+        assert ht.merge('b', [2], list.__add__) == [1, 2]
+        assert len(ht) == 2
+        ht.enable_sampling(seed=0)
+        ht.increment('c')
+        assert sorted(ht._sampler.keys) == ['a', 'b', 'c']
+
+    def test_merge_many(self):
+        ht = HashTable(4)
+        words = 'the cat and the hat and the bat'.split() * 20
+        ht.increment_many(words)
+        assert dict(ht.items()) == {'the': 60, 'cat': 20, 'and': 40,
+                                    'hat': 20, 'bat': 20}
+        ht.merge_many([('cat', 1), ('dog', 1)], max)
+        assert ht.get('cat') == 20
+        assert ht.get('dog') == 1
+        # While a resize is in progress the batch merges key by key
+        ht = HashTable(4)
+        ht.set_many((i, 0) for i in range(3))
+        ht.set(3, 0)
+        assert ht.old_buckets is not None
+        ht.increment_many([0, 1, 4])
+        assert ht.get_many([0, 1, 2, 4]) == [1, 1, 0, 1]
+
+    def test_merge_many_failing_partway(self):
+        ht = HashTable()
+        with self.assertRaises(TypeError):
+            ht.merge_many([('y', 1), ('x', 1), ('x', 'x')], operator.add)
+        assert len(ht) == len(list(ht.items())) == 2
+        with self.assertRaises(TypeError):
+            ht.increment_many(['z', 'x', [], 'w'])
+        assert len(ht) == len(list(ht.items())) == 3
+        assert ht.get('x') == 2
+
+    def test_treeify(self):
+        ht = HashTable(8, max_load_factor=4, min_load_factor=0)
+        keys = [i * 8 for i in range(9)]  # Same bucket
+        for key in keys[:-1]:
+            ht.set(key, key)
+        assert type(ht.buckets[0]) is not SortedBucket
+        ht.set(keys[-1], keys[-1])
+        assert type(ht.buckets[0]) is SortedBucket
+        assert ht.get(64) == 64
+        assert ht.setdefault(72, None) is None
+        assert ht.compare_and_set(72, None, 72)
+        assert ht.get(72) == 72
+        for key in [0, 8, 16, 24]:
+            ht.delete(key)
+        assert type(ht.buckets[0]) is SortedBucket  # Above the lower bound
+        ht.delete(32)
+        assert type(ht.buckets[0]) is ht.bucket_type
+        assert sorted(ht) == [40, 48, 56, 64, 72]
+
+    def test_treeify_colliding_keys(self):
+        # Distinct ints with equal hash() values collide at every size
+        modulus = sys.hash_info.modulus
+        keys = [i * modulus for i in range(100)]
+        ht = HashTable(min_load_factor=0)
+        ht.set_many((key, i) for i, key in enumerate(keys))
+        assert ht.get_many(keys) == list(range(100))
+        bucket = ht.buckets[0]
+        assert type(bucket) is SortedBucket
+        assert ht.delete_many(keys[:95]) == 95
+        assert type(ht.buckets[0]) is ht.bucket_type
+        ht.set_many((key, i) for i, key in enumerate(keys))
+        ht.resize(1024)  # Rebuilt buckets are treeified again
+        assert type(ht.buckets[0]) is SortedBucket
+        copy = pickle.loads(pickle.dumps(ht))
+        assert type(copy.buckets[0]) is SortedBucket
+        assert copy.get(keys[50]) == 50
+
+    def test_treeify_int_and_str_keys(self):
+        ht = HashTable(1, max_load_factor=100, min_load_factor=0)
+        keys = [9, 3, 7, 1, 5, 8, 2, 6, 's']
+        for key in keys:
+            ht.set(key, str(key))
+        assert type(ht.buckets[0]) is SortedBucket
+        for key in keys:
+            assert ht.get(key) == str(key)
+
+    def test_resize_reuses_stored_hashes(self):
+        keys = [CountedKey(i) for i in range(200)]
+        ht = HashTable(4)
+        CountedKey.hashes = 0
+        for key in keys:
+            ht.set(key, key.value)
+        assert CountedKey.hashes == 200  # Once per set, never on resizes
+        ht.resize(1000)
+        ht.set_many((key, 0) for key in keys)
+        assert CountedKey.hashes == 400
+        assert ht.get(CountedKey(7)) == 0
+        for strategy in (FibonacciHash(), SipHash(0)):
+            ht = HashTable(4, hash_strategy=strategy)
+            ht.set_many(((i, 'composite', str(i)), i) for i in range(100))
+            ht.resize(512)
+            assert ht.get((42, 'composite', '42')) == 42
+            assert all(entry[2] == strategy.hash_code(entry[0])
+                       for entry in ht._iter_entries())
+
+    def test_bloom_filter(self):
+        ht = HashTable()
+        ht.set_many(('key{}'.format(i), i) for i in range(500))
+        ht.enable_bloom_filter(0.01)
+        for i in range(500, 2000):
+            ht.set('key{}'.format(i), i)  # Outgrows and rebuilds the filter
+        ht.setdefault('extra', 0)
+        ht.increment('extra')
+        assert ht.stats()['bloom_filter']['count'] == 2001
+        assert all(ht.contains('key{}'.format(i)) for i in range(2000))
+        assert ht.get_many(['key5', 'missing'], None) == [5, None]
+        assert ht.contains_many(['key5', 'missing']) == [True, False]
+        for i in range(3000):
+            assert ht.get('missing{}'.format(i), None) is None
+        with self.assertRaises(KeyError):
+            ht.get('missing')
+        with self.assertRaises(KeyError):
+            ht.pop('missing')
+        stats = ht.stats()['bloom_filter']
+        assert stats['rejections'] > 2900
+        assert stats['false_positive_rate'] < 0.03
+        assert ht.pop('key0') == 0
+        assert ht.delete_many(['key1', 'key2', 'missing']) == 2
+        assert 'key0' not in ht and 'key3' in ht
+        assert ht.stats()['bloom_filter']['count'] == 1998
+        copy = pickle.loads(pickle.dumps(ht))
+        assert copy.get('key9') == 9 and 'key1' not in copy
+        ht.clear()
+        assert 'key3' not in ht
+        ht.set('key3', 3)
+        assert ht['key3'] == 3
+        ht.disable_bloom_filter()
+        assert 'bloom_filter' not in ht.stats()
+
+    def test_bloom_filter_counts_pop_misses(self):
+        ht = HashTable()
+        ht.set_many((i, i) for i in range(100))
+        ht.enable_bloom_filter(0.5)
+        for i in range(100, 1100):
+            assert ht.pop(i, None) is None
+        stats = ht.stats()['bloom_filter']
+        # Every missing key is either rejected or let through by mistake
+        assert stats['false_positives'] > 0
+        assert stats['rejections'] + stats['false_positives'] == 1000
+        assert ht.pop(5) == 5  # Found, so not a false positive
+        after = ht.stats()['bloom_filter']
+        assert after['false_positives'] == stats['false_positives']
+
+    def test_pickle_across_hash_seeds(self):
+        # Save a table holding str keys under one hash seed, load it under
+        # another, then print what the loaded table finds
+        script = """if True:
+            import pickle, sys
+            from hashing import FibonacciHash
+            from hashtable import HashTable
+            path, mode = sys.argv[1:]
+            if mode == 'save':
+                tables = [HashTable(),
+                          HashTable(hash_strategy=FibonacciHash())]
+                for ht in tables:
+                    ht.update({'alpha': 1, 'beta': 2, ('gamma', 3): 3})
+                    ht.set_many(('key{}'.format(i), i) for i in range(100))
+                tables[1].enable_bloom_filter()
+                with open(path, 'wb') as file:
+                    pickle.dump(tables, file)
+            else:
+                with open(path, 'rb') as file:
+                    tables = pickle.load(file)
+                assert all(entry[2] == hash(entry[0])
+                           for entry in tables[0]._iter_entries())
+                for ht in tables:
+                    print(ht.get('alpha', 'MISSING'), 'beta' in ht,
+                          ht.get(('gamma', 3), 'MISSING'),
+                          ht.get_many(['key{}'.format(i) for i in range(100)])
+                          == list(range(100)), len(ht))
+        """
+        directory = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, 'table.pickle')
+            output = []
+            for seed, mode in (('1', 'save'), ('2', 'load')):
+                env = dict(os.environ, PYTHONHASHSEED=seed,
+                           PYTHONPATH=directory)
+                output.append(subprocess.check_output(
+                    [sys.executable, '-c', script, path, mode], env=env,
+                    universal_newlines=True))
+        assert output[1].splitlines() == ['1 True 3 True 103'] * 2
+
 
 if __name__ == '__main__':
     # import pdb; pdb.set_trace()
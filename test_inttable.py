@@ -0,0 +1,205 @@
+#!python
+
+import inttable
+from inttable import IntHashTable
+from hashtable import HashTable
+import random
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class IntHashTableTest(unittest.TestCase):
+
+    def test_init(self):
+        ht = IntHashTable()
+        assert len(ht.states) == 16  # Room for 8 entries
+        assert ht.length() == 0
+        ht = IntHashTable(100)
+        assert len(ht.states) * ht.max_load_factor >= 100
+        with self.assertRaises(ValueError):
+            IntHashTable(value_type='s')
+
+    def test_set_get_delete(self):
+        ht = IntHashTable()
+        ht.set(1, 10)
+        ht[-5] = 50
+        ht.set(1 << 62, 7)
+        assert ht.get(1) == 10
+        assert ht[-5] == 50
+        assert ht[1 << 62] == 7
+        assert ht.get(2, None) is None
+        with self.assertRaises(KeyError):
+            ht.get(2)
+        ht.set(1, 11)
+        assert ht.get(1) == 11
+        assert len(ht) == 3
+        ht.delete(-5)
+        assert -5 not in ht
+        assert ht.contains(1)
+        with self.assertRaises(KeyError):
+            ht.delete(-5)
+        assert ht.pop(-5, None) is None
+        assert ht.pop(1) == 11
+        assert len(ht) == 1
+
+    def test_key_and_value_types(self):
+        ht = IntHashTable()
+        with self.assertRaises(TypeError):
+            ht.set('one', 1)
+        with self.assertRaises(TypeError):
+            ht.set(1.5, 1)
+        with self.assertRaises(OverflowError):
+            ht.set(1 << 63, 1)
+        with self.assertRaises(TypeError):
+            ht.set(1, 2.5)
+        assert 'one' not in ht
+        assert (1 << 64) not in ht
+        ht.set(True, 3)
+        assert ht[1] == 3
+        assert type(ht[1]) is int
+        floats = IntHashTable(value_type='d')
+        floats.set(1, 2.5)
+        floats.set(2, 3)
+        assert floats[1] == 2.5
+        assert type(floats[2]) is float
+        floats.set_many([3, 4], [1, 2.5])  # Ints are stored as floats
+        assert list(floats.get_many([3, 4, 5], 0)) == [1.0, 2.5, 0.0]
+
+    def test_resize_and_clear(self):
+        ht = IntHashTable()
+        for key in range(1000):
+            ht.set(key * 7, key)
+        assert len(ht) == 1000
+        assert ht.load_factor() <= ht.max_load_factor
+        assert all(ht[key * 7] == key for key in range(1000))
+        ht.clear()
+        assert len(ht) == 0
+        assert len(ht.states) == 8
+        assert 7 not in ht
+
+    def test_delete_shifts_entries_back(self):
+        ht = IntHashTable(init_size=4, max_load_factor=0.9)
+        rng = random.Random(1)
+        model = {}
+        for i in range(5000):
+            key = rng.randrange(-20, 20)
+            if rng.random() < 0.5:
+                ht.set(key, i)
+                model[key] = i
+            else:
+                assert ht.pop(key, None) == model.pop(key, None)
+            assert len(ht) == len(model)
+        assert dict(ht.items()) == model
+        # No tombstones: every slot is full or empty
+        full = sum(1 for state in ht.states if state)
+        assert full == len(model)
+
+    def test_iteration(self):
+        ht = IntHashTable()
+        for key in range(10):
+            ht.set(key, key * key)
+        assert sorted(ht) == list(range(10))
+        assert sorted(ht.values()) == [key * key for key in range(10)]
+        assert dict(ht.items()) == {key: key * key for key in range(10)}
+        assert sorted(ht.keys_array()) == list(range(10))
+        assert sorted(ht.values_array()) == sorted(ht.values())
+        with self.assertRaises(RuntimeError):
+            for key in ht:
+                ht.delete(key)
+
+    def test_many(self):
+        ht = IntHashTable()
+        ht.set_many([1, 2, 3, 2], [10, 20, 30, 40])
+        assert len(ht) == 3
+        assert ht[2] == 40  # The last pair for a key wins
+        assert list(ht.get_many([3, 1])) == [30, 10]
+        assert list(ht.get_many([3, 9], -1)) == [30, -1]
+        with self.assertRaises(KeyError):
+            ht.get_many([3, 9])
+        with self.assertRaises(TypeError):
+            ht.get_many([5], default=None)  # Cannot be stored as an int64
+        with self.assertRaises(TypeError):
+            ht.get_many([5], default=1.5)
+        with self.assertRaises(TypeError):
+            ht.set_many([4, 5], [1.5, 2.7])  # Rejected as set rejects them
+        assert 4 not in ht
+        ht.set_many([], [])
+        assert list(ht.contains_many([1, 9, 2])) == [True, False, True]
+        assert ht.delete_many([1, 9, 2]) == 2
+        assert dict(ht.items()) == {3: 30}
+
+    def test_many_resizes(self):
+        ht = IntHashTable()
+        keys = list(range(0, 30000, 3))
+        ht.set_many(keys, [key + 1 for key in keys])
+        assert len(ht) == len(keys)
+        assert ht.load_factor() <= ht.max_load_factor
+        assert list(ht.get_many(keys)) == [key + 1 for key in keys]
+        assert ht[2997] == 2998
+        assert 2998 not in ht
+
+    def test_table_interop(self):
+        table = HashTable()
+        for key in range(100):
+            table.set(key, -key)
+        ht = IntHashTable.from_table(table)
+        assert len(ht) == 100
+        assert ht[42] == -42
+        back = ht.to_table()
+        assert isinstance(back, HashTable)
+        assert sorted(back.items()) == sorted(table.items())
+        assert len(IntHashTable.from_table(HashTable())) == 0
+
+
+@unittest.skipUnless(numpy, 'requires NumPy')
+class IntHashTableNumPyTest(unittest.TestCase):
+
+    def test_arrays(self):
+        ht = IntHashTable(value_type='d')
+        assert ht.slot_keys.dtype == numpy.int64
+        assert ht.slot_values.dtype == numpy.float64
+        keys = numpy.arange(-500, 500, dtype=numpy.int64)
+        ht.set_many(keys, keys * 0.5)
+        values = ht.get_many(keys)
+        assert isinstance(values, numpy.ndarray)
+        assert numpy.array_equal(values, keys * 0.5)
+        assert type(ht[3]) is float
+        found = ht.contains_many(numpy.array([0, 499, 500]))
+        assert found.dtype == bool
+        assert found.tolist() == [True, True, False]
+        assert numpy.array_equal(numpy.sort(ht.keys_array()), keys)
+
+    def test_vectorized_matches_scalar(self):
+        rng = numpy.random.default_rng(0)
+        vectorized = IntHashTable()
+        scalar = IntHashTable()
+        # Keys drawn from a small range, so batches hold many duplicates
+        for round in range(20):
+            keys = rng.integers(-2000, 2000, 500)
+            values = rng.integers(-10 ** 12, 10 ** 12, 500)
+            vectorized.set_many(keys, values)
+            for key, value in zip(keys.tolist(), values.tolist()):
+                scalar.set(key, value)
+            deleted = rng.integers(-2000, 2000, 100)
+            assert vectorized.delete_many(deleted) == \
+                scalar.delete_many(deleted.tolist())
+        assert dict(vectorized.items()) == dict(scalar.items())
+        probe = numpy.arange(-2100, 2100)
+        assert numpy.array_equal(vectorized.contains_many(probe),
+                                 [key in scalar for key in probe.tolist()])
+
+    def test_extreme_keys(self):
+        ht = IntHashTable()
+        keys = numpy.array([inttable.INT64_MIN, -1, 0, inttable.INT64_MAX])
+        ht.set_many(keys, [1, 2, 3, 4])
+        assert ht[inttable.INT64_MIN] == 1
+        assert ht[inttable.INT64_MAX] == 4
+        assert ht.get_many(keys).tolist() == [1, 2, 3, 4]
+
+
+if __name__ == '__main__':
+    unittest.main()
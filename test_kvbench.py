@@ -0,0 +1,52 @@
+#!python
+
+from kvbench import main, run_load
+from kvclient import KeyValueClient
+from kvserver import KeyValueServer
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+
+class KeyValueBenchTest(unittest.TestCase):
+
+    def test_run_load(self):
+        async def run():
+            server = KeyValueServer()
+            await server.start('127.0.0.1', 0)
+            client = KeyValueClient(*server.address, pool_size=4)
+            try:
+                result = await run_load(client, requests=500, concurrency=4,
+                                        pipeline=8, keys=50)
+            finally:
+                await client.close()
+                await server.close()
+            return server, result
+        server, result = asyncio.run(run())
+        assert server.commands == 501  # Plus the MSET filling the keys
+        assert len(server.table) == 50
+        assert result['requests_per_sec'] > 0
+        latency = result['latency_ns']
+        assert latency['p50'] <= latency['p99'] <= latency['max']
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix sockets')
+    def test_local_unix_server(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'bench.sock')
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(['--local', '--unix', path, '--requests', '100',
+                      '--concurrency', '2', '--keys', '10'])
+            assert output.getvalue().startswith('100 requests')
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!python
+
+from kvclient import (KeyValueClient, ResponseError, encode_command,
+                      parse_reply)
+from kvserver import KeyValueServer
+import asyncio
+import unittest
+
+
+def with_server(test):
+    """Run the coroutine test(server, client) against a local server"""
+    async def run():
+        server = KeyValueServer()
+        await server.start('127.0.0.1', 0)
+        client = KeyValueClient(*server.address, pool_size=2)
+        try:
+            return await test(server, client)
+        finally:
+            await client.close()
+            await server.close()
+    return asyncio.run(run())
+
+
+class ParseReplyTest(unittest.TestCase):
+
+    def test_encode_command(self):
+        assert encode_command(['SET', b'k', 5]) == (
+            b'*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\n5\r\n')
+
+    def test_replies(self):
+        assert parse_reply(b'+OK\r\n') == ('OK', 5)
+        assert parse_reply(b':12\r\n') == (12, 5)
+        assert parse_reply(b'$-1\r\n') == (None, 5)
+        assert parse_reply(b'$2\r\nab\r\n') == (b'ab', 8)
+        assert parse_reply(b'*2\r\n$1\r\na\r\n$-1\r\n') == ([b'a', None], 16)
+        error, end = parse_reply(b'-ERR nope\r\n')
+        assert isinstance(error, ResponseError)
+        assert str(error) == 'ERR nope'
+
+    def test_incomplete(self):
+        reply, end = parse_reply(b'*2\r\n$1\r\na\r\n$1\r')
+        assert end == 0
+        assert reply not in (None, [b'a'])
+
+
+class KeyValueClientTest(unittest.TestCase):
+
+    def test_commands(self):
+        async def test(server, client):
+            assert await client.ping() == 'PONG'
+            await client.set('a', 'one')
+            assert await client.get('a') == b'one'
+            assert await client.get('missing') is None
+            await client.mset({'b': 2, 'c': 3})
+            assert await client.mget('a', 'b', 'x') == [b'one', b'2', None]
+            assert await client.exists('a', 'b', 'x') == 2
+            assert await client.delete('a', 'x') == 1
+            with self.assertRaises(ResponseError):
+                await client.execute('NOPE')
+            return server.table.get(b'c')
+        assert with_server(test) == b'3'
+
+    def test_pipeline(self):
+        async def test(server, client):
+            commands = [('SET', 'k{}'.format(i), i) for i in range(100)]
+            commands.append(('NOPE',))
+            commands.extend(('GET', 'k{}'.format(i)) for i in range(100))
+            return await client.pipeline(commands)
+        replies = with_server(test)
+        assert replies[:100] == ['OK'] * 100
+        assert isinstance(replies[100], ResponseError)
+        assert replies[101:] == [str(i).encode() for i in range(100)]
+
+    def test_pool(self):
+        async def test(server, client):
+            keys = ['k{}'.format(i) for i in range(20)]
+            await asyncio.gather(*[client.set(key, key) for key in keys])
+            values = await asyncio.gather(*[client.get(key) for key in keys])
+            # The pool never opened more than its size
+            return values, len(client.pool.idle), len(server.connections)
+        values, idle, connections = with_server(test)
+        assert values == [('k{}'.format(i)).encode() for i in range(20)]
+        assert idle == 2
+        assert connections == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
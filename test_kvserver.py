@@ -0,0 +1,143 @@
+#!python
+
+from kvserver import (MAX_INLINE_LENGTH, KeyValueServer, ProtocolError,
+                      parse_command)
+import asyncio
+import os
+import tempfile
+import unittest
+
+
+class ParseCommandTest(unittest.TestCase):
+
+    def test_resp(self):
+        buffer = b'*2\r\n$3\r\nGET\r\n$1\r\nk\r\n*1\r\n$4\r\nPING\r\n'
+        command, end = parse_command(buffer)
+        assert command == [b'GET', b'k']
+        assert parse_command(buffer, end) == ([b'PING'], len(buffer))
+
+    def test_binary_values(self):
+        buffer = b'*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$4\r\na\r\nb\r\n'
+        assert parse_command(buffer)[0] == [b'SET', b'k', b'a\r\nb']
+
+    def test_incomplete(self):
+        buffer = b'*2\r\n$3\r\nGET\r\n$5\r\nab'
+        for end in range(len(buffer)):
+            assert parse_command(buffer[:end]) == (None, 0)
+
+    def test_inline(self):
+        assert parse_command(b'SET k  v\r\n') == ([b'SET', b'k', b'v'], 10)
+        assert parse_command(b'GET foo\n') == ([b'GET', b'foo'], 8)
+        assert parse_command(b'GET foo') == (None, 0)
+
+    def test_line_length_limit(self):
+        line = b'GET ' + b'k' * (MAX_INLINE_LENGTH - 4)
+        assert parse_command(line) == (None, 0)
+        assert parse_command(line + b'\r\n')[0] == [b'GET', line[4:]]
+        with self.assertRaises(ProtocolError):
+            parse_command(line + b'k')  # Still no end in sight
+        with self.assertRaises(ProtocolError):
+            parse_command(line + b'kkk\n')
+        with self.assertRaises(ProtocolError):
+            parse_command(b'*' + b'1' * MAX_INLINE_LENGTH)
+
+    def test_invalid(self):
+        with self.assertRaises(ProtocolError):
+            parse_command(b'*x\r\n')
+        with self.assertRaises(ProtocolError):
+            parse_command(b'*1\r\n+GET\r\n')
+
+
+class KeyValueServerTest(unittest.TestCase):
+
+    def test_commands(self):
+        server = KeyValueServer()
+        assert server.execute([b'SET', b'a', b'1']) == b'+OK\r\n'
+        assert server.execute([b'get', b'a']) == b'$1\r\n1\r\n'
+        assert server.execute([b'GET', b'b']) == b'$-1\r\n'
+        assert server.execute([b'MSET', b'b', b'2', b'c', b'3']) == b'+OK\r\n'
+        assert server.execute([b'MGET', b'a', b'x', b'c']) == (
+            b'*3\r\n$1\r\n1\r\n$-1\r\n$1\r\n3\r\n')
+        assert server.execute([b'EXISTS', b'a', b'b', b'x']) == b':2\r\n'
+        assert server.execute([b'DEL', b'a', b'x']) == b':1\r\n'
+        assert server.execute([b'PING']) == b'+PONG\r\n'
+        assert server.table.get(b'b') == b'2'
+
+    def test_errors(self):
+        server = KeyValueServer()
+        assert server.execute([b'NOPE']).startswith(b'-ERR unknown command')
+        assert server.execute([b'GET']).startswith(b'-ERR wrong number')
+        assert server.execute([b'MSET', b'a']).startswith(b'-ERR wrong number')
+
+    def test_batch(self):
+        server = KeyValueServer()
+        replies = server.execute_batch([
+            [b'SET', b'a', b'1'], [b'SET', b'b', b'2'], [b'GET', b'a'],
+            [b'GET', b'b'], [b'GET', b'c'], [b'SET', b'a'], [b'DEL', b'a']])
+        assert replies == (b'+OK\r\n+OK\r\n$1\r\n1\r\n$1\r\n2\r\n$-1\r\n' +
+                           b"-ERR wrong number of arguments for 'set' "
+                           b'command\r\n:1\r\n')
+        assert server.commands == 7
+
+    def test_pipelined_connection(self):
+        async def run():
+            server = KeyValueServer()
+            await server.start('127.0.0.1', 0)
+            reader, writer = await asyncio.open_connection(*server.address)
+            # Split a pipeline in the middle of a command
+            writer.write(b'SET a 1\r\n*2\r\n$3\r\nGET\r\n$1\r')
+            await writer.drain()
+            await asyncio.sleep(0.01)
+            writer.write(b'\na\r\nEXISTS a b\r\n')
+            replies = await reader.readexactly(16)
+            writer.close()
+            await server.close()
+            return replies
+        assert asyncio.run(run()) == b'+OK\r\n$1\r\n1\r\n:1\r\n'
+
+    def test_protocol_error_closes_connection(self):
+        async def run():
+            server = KeyValueServer()
+            await server.start('127.0.0.1', 0)
+            reader, writer = await asyncio.open_connection(*server.address)
+            writer.write(b'PING\r\n*1\r\n!\r\n')
+            replies = await reader.read()
+            writer.close()
+            await server.close()
+            return replies
+        replies = asyncio.run(run())
+        assert replies.startswith(b'+PONG\r\n-ERR Protocol error')
+
+    def test_newline_terminated_commands(self):
+        async def run():
+            server = KeyValueServer()
+            await server.start('127.0.0.1', 0)
+            reader, writer = await asyncio.open_connection(*server.address)
+            writer.write(b'SET foo bar\nGET foo\n')
+            replies = await reader.readexactly(14)
+            writer.write(b'x' * (MAX_INLINE_LENGTH + 1))
+            error = await reader.read()
+            writer.close()
+            await server.close()
+            return replies, error
+        replies, error = asyncio.run(run())
+        assert replies == b'+OK\r\n$3\r\nbar\r\n'
+        assert error.startswith(b'-ERR Protocol error: too big inline')
+
+    def test_unix_socket(self):
+        async def run(path):
+            server = KeyValueServer()
+            await server.start_unix(path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b'PING\r\n')
+            reply = await reader.readexactly(7)
+            writer.close()
+            await server.close()
+            return reply
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'server.sock')
+            assert asyncio.run(run(path)) == b'+PONG\r\n'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ class NodeTest(unittest.TestCase):
         node = Node(data)
         assert node.data is data
         assert node.next is None
+        assert not hasattr(node, '__dict__')
 
 
 class LinkedListTest(unittest.TestCase):
@@ -35,6 +36,13 @@ class LinkedListTest(unittest.TestCase):
         ll.append('C')
         assert ll.items() == ['A', 'B', 'C']
 
+    def test_iter(self):
+        ll = LinkedList()
+        assert list(ll) == []
+        ll.append('A')
+        ll.append('B')
+        assert list(ll) == ['A', 'B']
+
     def test_length(self):
         ll = LinkedList()
         assert ll.length() == 0
@@ -86,6 +94,13 @@ class LinkedListTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             ll.delete('D')
 
+    def test_delete_middle(self):
+        ll = LinkedList(['A', 'B', 'C'])
+        ll.delete('B')
+        assert ll.items() == ['A', 'C']
+        assert ll.head.data == 'A'
+        assert ll.tail.data == 'C'
+
     def test_find(self):
         ll = LinkedList()
         ll.append('A')
@@ -96,6 +111,105 @@ class LinkedListTest(unittest.TestCase):
         assert ll.find(lambda item: item > 'B') == 'C'
         assert ll.find(lambda item: item == 'D') is None
 
+    def test_length_after_prepend_and_delete(self):
+        ll = LinkedList()
+        ll.prepend('B')
+        ll.prepend('A')
+        ll.append('C')
+        assert ll.length() == 3
+        ll.delete('B')
+        assert ll.length() == 2
+        ll.delete('A')
+        ll.delete('C')
+        assert ll.length() == 0
+
+    def test_entries(self):
+        ll = LinkedList()
+        h = hash
+        assert ll.find_entry('I', h('I')) is None
+        assert ll.set_entry('I', h('I'), 1) is None
+        assert ll.set_entry('V', h('V'), 5) is None
+        # Replaced in place
+        assert ll.set_entry('I', h('I'), 2) == ('I', 1, h('I'))
+        assert ll.items() == [('I', 2, h('I')), ('V', 5, h('V'))]
+        assert ll.find_entry('V', h('V')) == ('V', 5, h('V'))
+        assert ll.setdefault_entry('V', h('V'), 0) == ('V', 5, h('V'))
+        assert ll.setdefault_entry('X', h('X'), 10) is None
+        assert ll.replace_entry('X', h('X'), 10, 11) is True
+        assert ll.replace_entry('X', h('X'), 10, 12) is False
+        assert ll.merge_entry('X', h('X'), 4, max) == ('X', 11, h('X'))
+        assert ll.merge_entry('A', h('A'), 4, max) is None
+        assert ll.pop_entry('A', h('A')) == ('A', 4, h('A'))
+        assert ll.length() == 3
+        assert ll.pop_entry('V', h('V')) == ('V', 5, h('V'))
+        assert ll.pop_entry('X', h('X')) == ('X', 11, h('X'))
+        assert ll.pop_entry('A', h('A')) is None
+        assert ll.items() == [('I', 2, h('I'))]
+        assert ll.head is ll.tail
+        assert ll.length() == 1
+
+    def test_entries_compare_hashes_first(self):
+        compared = []
+
+        class Key(object):
+            def __init__(self, name):
+                self.name = name
+
+            def __eq__(self, other):
+                compared.append(self.name)
+                return self.name == other.name
+
+            __hash__ = None
+
+        ll = LinkedList()
+        a, b = Key('a'), Key('b')
+        ll.set_entry(a, 1, 'A')
+        ll.set_entry(b, 2, 'B')
+        assert compared == []  # Different hashes: no __eq__ call
+        assert ll.find_entry(Key('b'), 2) == (b, 'B', 2)
+        assert compared == ['b']
+        assert ll.find_entry(Key('b'), 3) is None
+        assert compared == ['b']
+
+    def test_previous_links(self):
+        ll = LinkedList()
+        ll.append('B')
+        ll.prepend('A')
+        ll.append('C')
+        assert ll.head.previous is None
+        assert ll.tail.previous.data == 'B'
+        assert ll.tail.previous.previous is ll.head
+        ll.delete('B')
+        assert ll.tail.previous is ll.head
+        assert ll.head.next is ll.tail
+
+    def test_remove_node(self):
+        ll = LinkedList()
+        a = ll.append('A')
+        b = ll.append('B')
+        c = ll.append('C')
+        ll.remove_node(b)
+        assert ll.items() == ['A', 'C']
+        ll.remove_node(c)
+        assert ll.tail is a
+        ll.remove_node(a)
+        assert ll.head is None
+        assert ll.tail is None
+        assert ll.length() == 0
+
+    def test_move_to_front(self):
+        ll = LinkedList()
+        a = ll.append('A')
+        ll.append('B')
+        c = ll.append('C')
+        ll.move_to_front(c)
+        assert ll.items() == ['C', 'A', 'B']
+        assert ll.tail.data == 'B'
+        ll.move_to_front(c)
+        ll.move_to_front(a)
+        assert ll.items() == ['A', 'C', 'B']
+        assert ll.length() == 3
+
 
 if __name__ == '__main__':
     unittest.main()
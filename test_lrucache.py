@@ -0,0 +1,105 @@
+#!python
+
+from lrucache import LRUCache, memoize
+import unittest
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_put_and_get(self):
+        cache = LRUCache(2)
+        cache.put('I', 1)
+        cache.put('V', 5)
+        assert cache.get('I') == 1
+        assert cache.get('A', None) is None
+        with self.assertRaises(KeyError):
+            cache.get('A')
+        cache.put('I', 2)  # Update value
+        assert cache.get('I') == 2
+        assert len(cache) == 2
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('I', 1)
+        cache.put('V', 5)
+        cache.get('I')  # V is now the least recently used
+        cache.put('X', 10)
+        assert 'V' not in cache
+        assert cache.items() == [('X', 10), ('I', 1)]
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(10, ttl=5, clock=clock)
+        cache.put('I', 1)
+        cache.put('V', 5, ttl=None)  # Never expires
+        cache.put('X', 10, ttl=20)
+        clock.now = 5
+        assert 'I' not in cache
+        assert cache.get('I', None) is None
+        assert cache.get('V') == 5
+        assert cache.get('X') == 10
+        clock.now = 30
+        assert cache.expire() == 1
+        assert cache.items() == [('V', 5)]
+        assert cache.stats()['expirations'] == 2
+
+    def test_max_bytes(self):
+        cache = LRUCache(None, max_bytes=10, sizeof=len)
+        cache.put('a', 'xxxx')
+        cache.put('b', 'yyyy')
+        assert cache.stats()['bytes'] == 8
+        cache.put('c', 'zzzz')  # Evicts a to get back under 10 bytes
+        assert cache.items() == [('c', 'zzzz'), ('b', 'yyyy')]
+        cache.put('b', 'y')
+        assert cache.stats()['bytes'] == 5
+
+    def test_delete_and_clear(self):
+        cache = LRUCache()
+        cache.put('I', 1)
+        cache.put('V', 5)
+        cache.delete('I')
+        assert cache.items() == [('V', 5)]
+        with self.assertRaises(KeyError):
+            cache.delete('I')
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.items() == []
+
+    def test_stats(self):
+        cache = LRUCache()
+        cache.put('I', 1)
+        cache.get('I')
+        cache.get('A', None)
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_memoize(self):
+        calls = []
+
+        @memoize(capacity=2)
+        def square(number, offset=0):
+            calls.append(number)
+            return number * number + offset
+
+        assert square(3) == 9
+        assert square(3) == 9
+        assert square(3, offset=1) == 10
+        assert calls == [3, 3]
+        assert square.cache.stats()['hits'] == 1
+        assert square.__name__ == 'square'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!python
+
+from hashtable import HashTable
+from mmaptable import MmapHashTable
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class Point(object):
+    """Key type that encode_key cannot encode by value"""
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return (isinstance(other, Point) and
+                (self.x, self.y) == (other.x, other.y))
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+
+class MmapHashTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'table.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_and_open(self):
+        ht = HashTable()
+        ht.set('I', 1)
+        ht.set('V', [5, 'five'])
+        ht.set(('X', 10), None)
+        ht.save(self.path)
+        with HashTable.open_mmap(self.path) as table:
+            assert len(table) == 3
+            assert table.length() == 3
+            assert table.get('I') == 1
+            assert table['V'] == [5, 'five']
+            assert table.get(('X', 10)) is None
+            assert table.contains(('X', 10)) is True
+            assert 'A' not in table
+            assert table.get('A', 0) == 0
+            with self.assertRaises(KeyError):
+                table.get('A')
+            self.assertCountEqual(table.keys(), ['I', 'V', ('X', 10)])
+            self.assertCountEqual(table.values(), [1, [5, 'five'], None])
+            assert dict(table.items()) == dict(ht.items())
+
+    def test_empty(self):
+        HashTable().save(self.path)
+        with MmapHashTable(self.path) as table:
+            assert len(table) == 0
+            assert list(table.items()) == []
+            assert table.contains('A') is False
+
+    def test_many_entries(self):
+        ht = HashTable()
+        ht.set_many(('key{}'.format(i), i) for i in range(2000))
+        ht.save(self.path)
+        with MmapHashTable(self.path) as table:
+            for i in range(2000):
+                assert table.get('key{}'.format(i)) == i
+            assert sorted(table.values()) == list(range(2000))
+            assert table.contains('key2000') is False
+
+    def test_equal_keys_that_pickle_differently(self):
+        shared = 'abc'
+        distinct = ''.join(['ab', 'c'])
+        ht = HashTable()
+        ht.set((shared, distinct), 'tuple')
+        ht.set(frozenset(['x', 'y', 'z']), 'set')
+        ht.set(1, 'one')
+        ht.save(self.path)
+        with MmapHashTable(self.path) as table:
+            # A tuple holding the same object twice pickles a memo reference
+            assert table.get((shared, shared)) == 'tuple'
+            assert table.get(frozenset(['z', 'y', 'x'])) == 'set'
+            assert table.get(1.0) == 'one'
+            assert table.get(True) == 'one'
+            assert table.get(('abc', 'abd'), None) is None
+
+    def test_keys_without_value_encoding(self):
+        ht = HashTable()
+        ht.set_many((Point(i, -i), i) for i in range(50))
+        ht.set(Point(0, 1), 'near')
+        ht.save(self.path)
+        with MmapHashTable(self.path) as table:
+            assert all(table.get(Point(i, -i)) == i for i in range(50))
+            assert table.get(Point(0, 1)) == 'near'
+            assert Point(1, 1) not in table
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as output:
+            output.write(b'not a snapshot' * 4)
+        with self.assertRaises(ValueError):
+            MmapHashTable(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
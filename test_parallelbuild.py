@@ -0,0 +1,87 @@
+#!python
+
+from hashtable import HashTable
+from mmaptable import MmapHashTable
+from parallelbuild import (PartitionedHashTable, open_partitioned,
+                           parallel_build, partition_index)
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class ParallelBuildTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [('key{}'.format(i), i) for i in range(500)]
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def close(self, *tables):
+        for table in tables:
+            for partition in table.partitions:
+                partition.close()
+
+    def test_in_process(self):
+        ht = parallel_build(iter(self.items), self.directory, workers=1,
+                            partitions=3)
+        assert isinstance(ht, PartitionedHashTable)
+        assert len(ht.partitions) == 4  # Rounded up to a power of two
+        assert all(isinstance(table, MmapHashTable)
+                   for table in ht.partitions)
+        assert len(ht) == 500
+        assert ht.get('key42') == 42
+        assert 'key500' not in ht
+        assert dict(ht.items()) == dict(self.items)
+        # Every key sits in the partition it is routed to
+        for index, table in enumerate(ht.partitions):
+            for key in table:
+                assert partition_index(key, 2, stable=True) == index
+        # Only the snapshots are left, not the run files they came from
+        assert sorted(os.listdir(self.directory)) == [
+            'partition-{}.snapshot'.format(i) for i in range(4)]
+        self.close(ht)
+
+    def test_process_pool(self):
+        items = [('key1', 'first')] + self.items + [('key1', 'last')]
+        ht = parallel_build(items, self.directory, workers=2, partitions=2)
+        assert len(ht) == 500
+        assert ht.get('key1') == 'last'  # Later pairs win across chunks
+        assert ht.get('key7') == 7
+        reopened = open_partitioned(self.directory, 2)
+        assert dict(reopened.items()) == dict(ht.items())
+        self.close(ht, reopened)
+
+    def test_merge(self):
+        ht = parallel_build(self.items, self.directory, workers=1,
+                            partitions=4)
+        table = ht.merge(init_size=16)
+        assert isinstance(table, HashTable)
+        assert table.min_size >= 16
+        assert dict(table.items()) == dict(self.items)
+        self.close(ht)
+
+    def test_empty_input(self):
+        ht = parallel_build([], self.directory, workers=2)
+        assert len(ht) == 0
+        assert 'key1' not in ht
+        self.close(ht)
+
+    def test_partitioned_tables(self):
+        partitions = [HashTable() for i in range(4)]
+        for key, value in self.items:
+            partitions[partition_index(key, 2)].set(key, value)
+        ht = PartitionedHashTable(partitions)
+        ht.set('new', 1)
+        ht.delete('key2')
+        assert ht.get('new') == 1
+        assert ht.contains('key2') is False
+        assert len(ht) == 500
+        with self.assertRaises(ValueError):
+            PartitionedHashTable(partitions[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
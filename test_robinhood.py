@@ -0,0 +1,131 @@
+#!python
+
+from hashing import fibonacci_index
+from robinhood import RobinHoodHashTable, EMPTY
+import random
+import sys
+import unittest
+
+
+class RobinHoodHashTableTest(unittest.TestCase):
+
+    def test_init(self):
+        ht = RobinHoodHashTable(4)
+        assert len(ht.distances) == 4
+        assert ht.length() == 0
+        ht = RobinHoodHashTable(5)
+        assert len(ht.distances) == 8  # Rounded up to a power of two
+
+    def test_set_and_get(self):
+        ht = RobinHoodHashTable()
+        ht.set('I', 1)
+        ht.set('V', 5)
+        ht.set('X', 10)
+        assert ht.get('I') == 1
+        assert ht.get('V') == 5
+        assert ht.get('X') == 10
+        assert ht.length() == 3
+        with self.assertRaises(KeyError):
+            ht.get('A')  # Key does not exist
+
+    def test_set_twice_and_get(self):
+        ht = RobinHoodHashTable()
+        ht.set('I', 1)
+        ht.set('V', 4)
+        ht.set('V', 5)  # Update value
+        assert ht.get('V') == 5
+        assert ht.length() == 2
+
+    def test_contains(self):
+        ht = RobinHoodHashTable()
+        ht.set('I', 1)
+        assert ht.contains('I') is True
+        assert ht.contains('A') is False
+
+    def test_delete(self):
+        ht = RobinHoodHashTable()
+        ht.set('I', 1)
+        ht.set('V', 5)
+        ht.set('X', 10)
+        ht.delete('I')
+        ht.delete('X')
+        assert ht.length() == 1
+        assert ht.items() == [('V', 5)]
+        with self.assertRaises(KeyError):
+            ht.delete('X')  # Key no longer exists
+        with self.assertRaises(KeyError):
+            ht.delete('A')  # Key does not exist
+
+    def test_keys_values_items(self):
+        ht = RobinHoodHashTable()
+        assert ht.items() == []
+        ht.set('I', 1)
+        ht.set('V', 5)
+        ht.set('X', 10)
+        self.assertCountEqual(ht.keys(), ['I', 'V', 'X'])
+        self.assertCountEqual(ht.values(), [1, 5, 10])
+        self.assertCountEqual(ht.items(), [('I', 1), ('V', 5), ('X', 10)])
+
+    def test_grows(self):
+        ht = RobinHoodHashTable(4)
+        for i in range(1000):
+            ht.set(i, -i)
+        assert ht.length() == 1000
+        assert ht.load_factor() <= ht.max_load_factor
+        for i in range(1000):
+            assert ht.get(i) == -i
+
+    def test_colliding_keys_and_backward_shift(self):
+        ht = RobinHoodHashTable(16)
+        # Multiples of the hash modulus all hash to 0, so share a home slot
+        keys = [i * sys.hash_info.modulus for i in range(8)]
+        for key in keys:
+            ht.set(key, key)
+        ht.delete(keys[0])
+        # Remaining entries shifted back, so no gaps or tombstones are left
+        assert ht.distances[:7] == list(range(7))
+        assert ht.distances[7] == EMPTY
+        for key in keys[1:]:
+            assert ht.get(key) == key
+
+    def test_matches_dict_under_churn(self):
+        rng = random.Random(7)
+        ht = RobinHoodHashTable()
+        expected = {}
+        for _ in range(5000):
+            key = rng.randrange(300)
+            if rng.random() < 0.4 and key in expected:
+                ht.delete(key)
+                del expected[key]
+            else:
+                ht.set(key, rng.random())
+                expected[key] = ht.get(key)
+        self.assertCountEqual(ht.items(), expected.items())
+        assert ht.length() == len(expected)
+        # Every entry sits at its recorded distance from its home slot
+        for index, distance in enumerate(ht.distances):
+            if distance != EMPTY:
+                home = fibonacci_index(hash(ht.slot_keys[index]), ht.bits)
+                assert (home + distance) & ht.mask == index
+
+    def test_strided_keys_spread_out(self):
+        # Ints hash to themselves, so these share their low bits
+        ht = RobinHoodHashTable()
+        keys = [i << 12 for i in range(2000)]
+        for key in keys:
+            ht.set(key, key)
+        assert max(ht.distances) < 32
+        for key in keys:
+            assert ht.get(key) == key
+
+    def test_reserve(self):
+        ht = RobinHoodHashTable()
+        ht.reserve(1000)
+        capacity = len(ht.distances)
+        for i in range(1000):
+            ht.set(i, i)
+        assert len(ht.distances) == capacity
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+#!python
+
+from sampling import KeySampler
+import unittest
+
+
+class KeySamplerTest(unittest.TestCase):
+
+    def test_init(self):
+        sampler = KeySampler(['A', 'B', 'C'])
+        assert len(sampler) == 3
+        assert sampler.keys == ['A', 'B', 'C']
+        assert sampler.positions.get('C') == 2
+
+    def test_remove(self):
+        sampler = KeySampler(['A', 'B', 'C', 'D'])
+        sampler.remove('B')  # The last key moves into the gap
+        assert sampler.keys == ['A', 'D', 'C']
+        assert sampler.positions.get('D') == 1
+        sampler.remove('C')  # Already last, nothing moves
+        assert sampler.keys == ['A', 'D']
+        with self.assertRaises(KeyError):
+            sampler.remove('B')
+        sampler.clear()
+        assert len(sampler) == 0
+
+    def test_sample(self):
+        sampler = KeySampler(range(20), seed=1)
+        assert sampler.choice() in range(20)
+        assert sorted(sampler.sample(20)) == list(range(20))
+        assert len(set(sampler.sample(5))) == 5
+        assert len(sampler.sample(50, replace=True)) == 50
+        other = KeySampler(range(20), seed=1)
+        again = KeySampler(range(20), seed=1)
+        assert other.sample(5) == again.sample(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
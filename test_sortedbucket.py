@@ -0,0 +1,84 @@
+#!python
+
+from sortedbucket import SortedBucket, orderable
+import unittest
+
+
+class SortedBucketTest(unittest.TestCase):
+
+    def test_init(self):
+        bucket = SortedBucket([(3, 'c', 3), (1, 'a', 1), (2, 'b', 2)])
+        assert bucket.ordered
+        assert bucket.keys == [1, 2, 3]
+        assert bucket.hashes == [1, 2, 3]
+        assert bucket.items() == [(1, 'a', 1), (2, 'b', 2), (3, 'c', 3)]
+        assert bucket.length() == 3
+        assert SortedBucket().length() == 0
+
+    def test_orderable(self):
+        assert orderable(1)
+        assert orderable('a')
+        assert orderable(2.5)
+        assert not orderable(float('nan'))
+        assert not orderable((1, 2))
+        assert not orderable(frozenset())
+
+    def test_entries(self):
+        bucket = SortedBucket()
+        for key in [5, 1, 4, 2, 3]:
+            assert bucket.set_entry(key, hash(key), str(key)) is None
+        assert bucket.keys == [1, 2, 3, 4, 5]
+        assert bucket.find_entry(3, 3) == (3, '3', 3)
+        assert bucket.find_entry(3.0, 3) == (3, '3', 3)
+        assert bucket.find_entry(6, 6) is None
+        # Not comparable with ints
+        assert bucket.find_entry('3', hash('3')) is None
+        assert bucket.set_entry(3, 3, 'three') == (3, '3', 3)
+        assert bucket.setdefault_entry(3, 3, 'x') == (3, 'three', 3)
+        assert bucket.setdefault_entry(0, 0, '0') is None
+        assert bucket.replace_entry(0, 0, 'x', 'zero') is False
+        assert bucket.replace_entry(0, 0, '0', 'zero') is True
+        assert bucket.pop_entry(0, 0) == (0, 'zero', 0)
+        assert bucket.pop_entry(0, 0) is None
+        assert bucket.merge_entry(1, 1, '!', str.__add__) == (1, '1!', 1)
+        assert bucket.merge_entry(0, 0, '0', str.__add__) is None
+        assert bucket.pop_entry(0, 0) == (0, '0', 0)
+        assert bucket.keys == [1, 2, 3, 4, 5]
+        assert bucket.hashes == [1, 2, 3, 4, 5]
+
+    def test_unorderable_keys(self):
+        bucket = SortedBucket([(2, 'b', 2), ('a', 'x', hash('a'))])
+        assert not bucket.ordered
+        assert bucket.find_entry('a', hash('a')) == ('a', 'x', hash('a'))
+        bucket = SortedBucket([(2, 'b', 2), (1, 'a', 1)])
+        # Cannot be compared with the ints
+        bucket.append(('a', 'x', hash('a')))
+        assert not bucket.ordered
+        bucket.append(((1, 2), 'y', hash((1, 2))))
+        assert bucket.find_entry(1, 1) == (1, 'a', 1)
+        assert bucket.find_entry('a', hash('a')) == ('a', 'x', hash('a'))
+        assert bucket.find_entry((1, 2), hash((1, 2)))[1] == 'y'
+        assert bucket.pop_entry(2, 2) == (2, 'b', 2)
+        assert bucket.length() == 3
+        assert bucket.hashes == [1, hash('a'), hash((1, 2))]
+
+    def test_init_with_uncomparable_keys(self):
+        # The sort fails partway through, after reordering some entries
+        bucket = SortedBucket([(k, 'v{}'.format(k), 0)
+                               for k in [3, 1, 2, 's', 0]])
+        assert not bucket.ordered
+        assert bucket.keys == [entry[0] for entry in bucket.entries]
+        for key in [3, 1, 2, 's', 0]:
+            assert bucket.find_entry(key, 0) == (key, 'v{}'.format(key), 0)
+
+    def test_unordered_scan_matches_hashes(self):
+        # Keys with equal hashes are told apart by comparing them
+        bucket = SortedBucket([((n,), n, 7) for n in range(10)])
+        assert not bucket.ordered
+        assert bucket.find_entry((4,), 7) == ((4,), 4, 7)
+        assert bucket.find_entry((4,), 8) is None
+        assert bucket.find_entry((10,), 7) is None
+
+
+if __name__ == '__main__':
+    unittest.main()
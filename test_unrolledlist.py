@@ -0,0 +1,103 @@
+#!python
+
+from unrolledlist import UnrolledLinkedList, UnrolledNode
+import unittest
+
+
+class UnrolledLinkedListTest(unittest.TestCase):
+
+    def test_init(self):
+        ll = UnrolledLinkedList()
+        assert ll.head is None
+        assert ll.tail is None
+        assert ll.is_empty() is True
+
+    def test_init_with_list(self):
+        ll = UnrolledLinkedList(['A', 'B', 'C'])
+        assert ll.items() == ['A', 'B', 'C']
+        assert ll.length() == 3
+
+    def test_nodes_hold_several_items(self):
+        ll = UnrolledLinkedList(range(UnrolledLinkedList.CAPACITY + 1))
+        assert ll.head is not ll.tail
+        assert len(ll.head.items) == UnrolledLinkedList.CAPACITY
+        assert ll.tail.items == [UnrolledLinkedList.CAPACITY]
+        assert not hasattr(ll.head, '__dict__')
+
+    def test_append_and_prepend(self):
+        ll = UnrolledLinkedList()
+        ll.append('B')
+        ll.prepend('A')
+        ll.append('C')
+        assert ll.items() == ['A', 'B', 'C']
+        for i in range(20):
+            ll.prepend(i)
+        assert ll.items() == list(range(19, -1, -1)) + ['A', 'B', 'C']
+        assert list(ll) == ll.items()
+        assert ll.length() == 23
+
+    def test_delete(self):
+        ll = UnrolledLinkedList(range(20))
+        ll.delete(0)
+        ll.delete(10)
+        ll.delete(19)
+        assert ll.items() == [i for i in range(1, 19) if i != 10]
+        for i in range(20):
+            if i not in (0, 10, 19):
+                ll.delete(i)
+        assert ll.head is None
+        assert ll.tail is None
+        assert ll.length() == 0
+        with self.assertRaises(ValueError):
+            ll.delete('D')
+
+    def test_freed_nodes_are_reused(self):
+        del UnrolledLinkedList.node_pool[:]
+        ll = UnrolledLinkedList(['A'])
+        node = ll.head
+        ll.delete('A')
+        assert UnrolledLinkedList.node_pool == [node]
+        ll.append('B')
+        assert ll.head is node
+        assert node.items == ['B']
+        assert UnrolledLinkedList.node_pool == []
+
+    def test_find_and_replace(self):
+        ll = UnrolledLinkedList(['A', 'B', 'C'])
+        assert ll.find(lambda item: item > 'A') == 'B'
+        assert ll.find(lambda item: item == 'D') is None
+        ll.replace('B', 'M')
+        assert ll.items() == ['A', 'M', 'C']
+        with self.assertRaises(ValueError):
+            ll.replace('B', 'N')
+
+    def test_entries(self):
+        ll = UnrolledLinkedList()
+        for i in range(20):
+            assert ll.set_entry(i, hash(i), str(i)) is None
+        assert ll.set_entry(12, hash(12), 'twelve') == (12, '12', 12)
+        assert ll.find_entry(12, hash(12)) == (12, 'twelve', 12)
+        assert ll.find_entry(20, hash(20)) is None
+        assert ll.find_entry(12, 13) is None  # Hash mismatch
+        assert ll.setdefault_entry(3, hash(3), 'x') == (3, '3', 3)
+        assert ll.replace_entry(3, hash(3), '3', 'three') is True
+        assert ll.replace_entry(3, hash(3), '3', 'x') is False
+        assert ll.pop_entry(3, hash(3)) == (3, 'three', 3)
+        assert ll.pop_entry(3, hash(3)) is None
+        assert ll.length() == 19
+        assert ll.merge_entry(19, hash(19), '!', str.__add__) == \
+            (19, '19!', 19)
+        assert ll.merge_entry(20, hash(20), '20', str.__add__) is None
+        assert ll.find_entry(20, hash(20)) == (20, '20', 20)
+
+
+class UnrolledNodeTest(unittest.TestCase):
+
+    def test_init(self):
+        node = UnrolledNode()
+        assert node.items == []
+        assert node.next is None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,18 @@
+#!python
+
+from walbench import format_result, run
+import unittest
+
+
+class WalBenchTest(unittest.TestCase):
+
+    def test_run(self):
+        result = run('never', operations=400, threads=4, keys=50)
+        assert result['operations'] == 400
+        assert result['operations_per_sec'] > 0
+        assert result['records_per_commit'] >= 1
+        assert 'never' in format_result(result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+#!python
+
+
+class UnrolledNode(object):
+    """Node of an UnrolledLinkedList holding up to CAPACITY items"""
+
+    __slots__ = ('items', 'next')
+
+    def __init__(self):
+        """Initialize this node with no items"""
+        self.items = []
+        self.next = None
+
+    def __repr__(self):
+        """Return a string representation of this node"""
+        return 'UnrolledNode({})'.format(repr(self.items))
+
+
+class UnrolledLinkedList(object):
+    """Linked list storing several items per node, so walking it touches
+    far fewer node objects than LinkedList. Nodes emptied by delete are kept
+    in a shared pool and handed out again instead of being reallocated.
+    Supports the same *_entry methods as LinkedList, so it can be used as
+    the bucket type of a HashTable."""
+
+    __slots__ = ('head', 'tail', 'nodeCount')
+
+    # Maximum number of items stored in one node
+    CAPACITY = 8
+    # Free nodes shared by every list, and how many of them to keep around
+    node_pool = []
+    POOL_LIMIT = 1024
+
+    def __init__(self, iterable=None):
+        """Initialize this linked list; append the given items, if any"""
+        self.head = None
+        self.tail = None
+        self.nodeCount = 0
+        if iterable:
+            for item in iterable:
+                self.append(item)
+
+    def __repr__(self):
+        """Return a string representation of this linked list"""
+        return 'UnrolledLinkedList({})'.format(repr(self.items()))
+
+    def __iter__(self):
+        """Iterate over the items of this linked list"""
+        current = self.head
+        while current is not None:
+            for item in current.items:
+                yield item
+            current = current.next
+
+    def _new_node(self):
+        """Return an empty node, reusing one from the pool if possible"""
+        if self.node_pool:
+            return self.node_pool.pop()
+        return UnrolledNode()
+
+    def _release_node(self, node, previous):
+        """Unlink the given empty node and return it to the pool"""
+        if previous is None:
+            self.head = node.next
+        else:
+            previous.next = node.next
+        if node is self.tail:
+            self.tail = previous
+        node.next = None
+        if len(self.node_pool) < self.POOL_LIMIT:
+            self.node_pool.append(node)
+
+    def _remove_at(self, node, previous, index):
+        """Remove and return the item at index within the given node"""
+        item = node.items.pop(index)
+        self.nodeCount -= 1
+        if not node.items:
+            self._release_node(node, previous)
+        return item
+
+    def items(self):
+        """Return a list of all items in this linked list: O(n)"""
+        result = []
+        current = self.head
+        while current is not None:
+            result.extend(current.items)
+            current = current.next
+        return result
+
+    def is_empty(self):
+        """Return True if this linked list is empty, or False"""
+        return self.head is None
+
+    def length(self):
+        """Return the length of this linked list: O(1)"""
+        return self.nodeCount
+
+    def append(self, item):
+        """Insert the given item at the tail of this linked list: O(1)"""
+        tail = self.tail
+        if tail is None or len(tail.items) >= self.CAPACITY:
+            node = self._new_node()
+            if tail is None:
+                self.head = node
+            else:
+                tail.next = node
+            self.tail = tail = node
+        tail.items.append(item)
+        self.nodeCount += 1
+
+    def prepend(self, item):
+        """Insert the given item at the head of this linked list.
+        Running time: O(CAPACITY) to shift the items of the head node."""
+        head = self.head
+        if head is None or len(head.items) >= self.CAPACITY:
+            node = self._new_node()
+            node.next = head
+            if head is None:
+                self.tail = node
+            self.head = head = node
+        head.items.insert(0, item)
+        self.nodeCount += 1
+
+    def find(self, quality):
+        """Return an item from this linked list satisfying the given quality,
+        or None. Worst case running time: O(n) if it is near the tail."""
+        current = self.head
+        while current is not None:
+            for item in current.items:
+                if quality(item):
+                    return item
+            current = current.next
+        return None
+
+    def delete(self, item):
+        """Delete the given item from this linked list, or raise ValueError"""
+        previous = None
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                if items[index] == item:
+                    self._remove_at(current, previous, index)
+                    return
+            previous = current
+            current = current.next
+        raise ValueError('Item not found: {}'.format(item))
+
+    def replace(self, item, new_item):
+        """Replace the first item equal to item with new_item, or raise
+        ValueError. Worst case running time: O(n)."""
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                if items[index] == item:
+                    items[index] = new_item
+                    return
+            current = current.next
+        raise ValueError('Item not found: {}'.format(item))
+
+    def find_entry(self, key, key_hash):
+        """Return the (key, value, hash) entry with the given key, or None"""
+        current = self.head
+        while current is not None:
+            for entry in current.items:
+                if entry[2] == key_hash and entry[0] == key:
+                    return entry
+            current = current.next
+        return None
+
+    def set_entry(self, key, key_hash, value):
+        """Replace the value of the entry with the given key in place, or
+        append a new entry. Return the replaced entry, or None if appended."""
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                entry = items[index]
+                if entry[2] == key_hash and entry[0] == key:
+                    items[index] = (key, value, key_hash)
+                    return entry
+            current = current.next
+        self.append((key, value, key_hash))
+        return None
+
+    def merge_entry(self, key, key_hash, value, function):
+        """Replace the value of the entry with the given key by
+        function(old value, value) in place, or append (key, value, hash)
+        if there is no such entry. Return the updated entry, or None if
+        appended."""
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                entry = items[index]
+                if entry[2] == key_hash and entry[0] == key:
+                    items[index] = entry = (key, function(entry[1], value),
+                                            key_hash)
+                    return entry
+            current = current.next
+        self.append((key, value, key_hash))
+        return None
+
+    def setdefault_entry(self, key, key_hash, value):
+        """Return the entry with the given key, or append (key, value, hash)
+        and return None if there is no such entry"""
+        found = self.find_entry(key, key_hash)
+        if found is None:
+            self.append((key, value, key_hash))
+        return found
+
+    def replace_entry(self, key, key_hash, expected, value):
+        """Replace the value of the entry with the given key only if it is
+        equal to expected. Return True if the entry was replaced, or False."""
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                entry = items[index]
+                if entry[2] == key_hash and entry[0] == key:
+                    if entry[1] != expected:
+                        return False
+                    items[index] = (key, value, key_hash)
+                    return True
+            current = current.next
+        return False
+
+    def pop_entry(self, key, key_hash):
+        """Remove and return the entry with the given key, or return None"""
+        previous = None
+        current = self.head
+        while current is not None:
+            items = current.items
+            for index in range(len(items)):
+                entry = items[index]
+                if entry[2] == key_hash and entry[0] == key:
+                    return self._remove_at(current, previous, index)
+            previous = current
+            current = current.next
+        return None
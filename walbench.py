@@ -0,0 +1,93 @@
+#!python
+
+"""Measure the write throughput of DurableHashTable under each fsync policy.
+
+Threads set random keys concurrently, so the 'always' policy can group
+commit their records under one fsync:
+
+    python walbench.py --operations 20000 --threads 1 4 16
+    python walbench.py --policies always --directory /mnt/ssd/walbench
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from durable import FSYNC_POLICIES, DurableHashTable
+
+
+def run(policy, operations=10000, threads=1, keys=1000, value_size=32,
+        directory=None, seed=0):
+    """Set operations random keys from threads threads on a new durable
+    table under the given fsync policy, in a temporary directory inside
+    directory if given. Return the throughput and log counters as a dict."""
+    rng = random.Random(seed)
+    value = b'x' * value_size
+    per_thread = [[rng.randrange(keys) for i in range(operations // threads)]
+                  for thread in range(threads)]
+    path = tempfile.mkdtemp(prefix='walbench-', dir=directory)
+    try:
+        table = DurableHashTable(path, fsync=policy)
+
+        def worker(thread_keys):
+            for key in thread_keys:
+                table.set(key, value)
+
+        workers = [threading.Thread(target=worker, args=(thread_keys,))
+                   for thread_keys in per_thread]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        table.close()
+        seconds = time.perf_counter() - start
+        stats = table.stats()
+    finally:
+        shutil.rmtree(path)
+    done = sum(len(thread_keys) for thread_keys in per_thread)
+    return {
+        'policy': policy,
+        'operations': done,
+        'threads': threads,
+        'seconds': seconds,
+        'operations_per_sec': done / seconds if seconds else float('inf'),
+        'records_per_commit': stats['records_per_commit'],
+        'log_bytes': stats['log_bytes'],
+    }
+
+
+def format_result(result):
+    """Return a one line summary of a result"""
+    return ('{policy:<10} {threads:>3} threads  {operations_per_sec:>12,.0f} '
+            'sets/s  {records_per_commit:>6.1f} records/commit'
+            .format(**result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--policies', nargs='+', choices=FSYNC_POLICIES,
+                        default=list(FSYNC_POLICIES))
+    parser.add_argument('--operations', type=int, default=10000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--value-size', type=int, default=32)
+    parser.add_argument('--directory',
+                        help='put the logs here rather than in the system '
+                             'temporary directory')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for policy in args.policies:
+        for threads in args.threads:
+            print(format_result(run(policy, args.operations, threads,
+                                    args.keys, args.value_size,
+                                    args.directory, args.seed)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())